@@ -3,21 +3,36 @@ import os
 import tempfile
 import pytesseract
 from PIL import Image
-import pdf2image
-import numpy as np
-import torch
-from fastapi import FastAPI, File, UploadFile, HTTPException, status
+from fastapi import FastAPI, File, Form, UploadFile, HTTPException, Request, Depends, status
+from fastapi.security import APIKeyHeader
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Callable
 import json
 from datetime import datetime
 import logging
 import traceback
 import asyncio
+import time
+import sys
+import threading
 from pathlib import Path
 import aiofiles
+import hashlib
+import hmac
+import io
+import zipfile
+import ocr_pool
+import ocr_engine
+import ocr_languages
+import lab_engine
+import keyword_matcher
+import ner_batcher
+import image_preprocess
+import report_cache as report_cache_module
+import report_store as report_store_module
+import job_queue as job_queue_module
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
@@ -45,6 +60,58 @@ app.add_middleware(
 UPLOAD_FOLDER = 'temp_uploads'
 ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'tiff', 'bmp'}
 MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB max file size
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "100"))
+# Total size of the files in one batch, both as uploaded and once zip archives are unpacked
+MAX_BATCH_BYTES = int(os.getenv("MAX_BATCH_MB", "256")) * 1024 * 1024
+# Bytes read from an upload at a time while checking batch limits
+UPLOAD_READ_CHUNK = 1024 * 1024
+# Files of one batch analyzed at the same time
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", str(max(1, ocr_pool.OCR_POOL_WORKERS))))
+# Background analysis jobs processed at the same time, and how often idle runners poll the queue
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "0.5"))
+# Key clients must send in the X-API-Key header to read patient data; the
+# /reports and lab trend endpoints stay closed while it is unset
+REPORTS_API_KEY = os.getenv("REPORTS_API_KEY")
+# Maximum patients (values per analyte column) in one cohort classification request
+MAX_COHORT_ROWS = int(os.getenv("MAX_COHORT_ROWS", "200000"))
+
+# PDF rasterization: "fixed" renders every page at PDF_DPI, "adaptive" starts at
+# PDF_LOW_DPI and re-renders low-confidence pages in PDF_DPI_STEP increments up to PDF_MAX_DPI
+PDF_DPI_MODE = os.getenv("PDF_DPI_MODE", "fixed").lower()
+PDF_DPI = int(os.getenv("PDF_DPI", "200"))
+PDF_LOW_DPI = int(os.getenv("PDF_LOW_DPI", "150"))
+PDF_MAX_DPI = int(os.getenv("PDF_MAX_DPI", "300"))
+PDF_DPI_STEP = int(os.getenv("PDF_DPI_STEP", "75"))
+if PDF_DPI_STEP <= 0 or PDF_LOW_DPI > PDF_MAX_DPI:
+    # A non-positive step never reaches PDF_MAX_DPI and would re-render an unconfident page forever
+    logger.warning(f"Invalid adaptive DPI settings (PDF_LOW_DPI={PDF_LOW_DPI}, PDF_MAX_DPI={PDF_MAX_DPI}, "
+                   f"PDF_DPI_STEP={PDF_DPI_STEP}), using 150/300/75")
+    PDF_LOW_DPI, PDF_MAX_DPI, PDF_DPI_STEP = 150, 300, 75
+# Maximum number of PDF pages rendered/OCRed at once per request
+PDF_PAGE_WINDOW = int(os.getenv("PDF_PAGE_WINDOW", str(ocr_pool.OCR_POOL_WORKERS)))
+# Use the embedded text layer of born-digital PDF pages instead of OCRing them
+PDF_TEXT_LAYER = os.getenv("PDF_TEXT_LAYER", "true").lower() in ("1", "true", "yes")
+PDF_TEXT_LAYER_MIN_CHARS = int(os.getenv("PDF_TEXT_LAYER_MIN_CHARS", "40"))
+# Transformer models: "background" warms them in a thread after startup,
+# "lazy" loads each on first use, "off" never loads them
+MODEL_LOADING = os.getenv("MODEL_LOADING", "background").lower()
+# Only models the analysis uses; warming anything else just costs memory and startup time
+MODEL_SPECS = {
+    'ner_pipeline': {
+        'task': "ner",
+        'model': "d4data/biomedical-ner-all",
+        'aggregation_strategy': "simple",
+        'device': -1  # Force CPU
+    }
+}
+# Heavy modules reported by /ready so lazy loading can be checked
+HEAVY_MODULES = ['torch', 'transformers', 'numpy', 'cv2']
+# Lab analyte rule tables (patterns, reference ranges, unit conversions)
+LAB_RULES_FILE = os.getenv("LAB_RULES_FILE", str(lab_engine.DEFAULT_LAB_RULES_FILE))
+# Disease keyword/pattern vocabulary and the on-disk cache of its keyword automaton
+DISEASE_RULES_FILE = os.getenv("DISEASE_RULES_FILE", str(keyword_matcher.DEFAULT_DISEASE_RULES_FILE))
+KEYWORD_AUTOMATON_CACHE = os.getenv("KEYWORD_AUTOMATON_CACHE", "cache/keyword_automaton.json")
 
 # Create upload folder if it doesn't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -80,16 +147,34 @@ class AnalysisResult(BaseModel):
     lab_details: Dict[str, LabValue]
     keyword_confidence: Dict[str, float]
     entities: List[Dict[str, Any]]
+    entities_status: Optional[str] = None
     summary: str
     analysis_timestamp: str
     filename: str
     extracted_text_length: int
+    ocr_metadata: Optional[Dict[str, Any]] = None
+    content_sha256: Optional[str] = None
+    rules_version: Optional[str] = None
+    cache: Optional[Dict[str, bool]] = None
 
 class HealthResponse(BaseModel):
     status: str
     message: str
     tesseract_available: bool
     analyzer_ready: bool
+    ocr_stats: Optional[Dict[str, Any]] = None
+    cache: Optional[Dict[str, Any]] = None
+    ner_stats: Optional[Dict[str, Any]] = None
+    report_store: Optional[Dict[str, Any]] = None
+
+class ReadinessResponse(BaseModel):
+    ready: bool
+    analyzer_ready: bool
+    tesseract_available: bool
+    model_loading: str
+    models: Dict[str, str]
+    ocr_pool_started: bool
+    loaded_modules: List[str]
 
 class SupportedFormatsResponse(BaseModel):
     supported_formats: List[str]
@@ -102,6 +187,94 @@ class APIResponse(BaseModel):
     data: Optional[AnalysisResult] = None
     error: Optional[str] = None
 
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+    events_url: str
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    filename: str
+    status: str
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    progress: Optional[Dict[str, Any]] = None
+    result: Optional[AnalysisResult] = None
+    error: Optional[str] = None
+
+class BatchItemResponse(BaseModel):
+    index: int
+    filename: str
+    success: bool
+    data: Optional[AnalysisResult] = None
+    error: Optional[str] = None
+
+class CohortRequest(BaseModel):
+    columns: Dict[str, List[Optional[float]]]
+    include_status_names: bool = False
+
+class CohortLabResult(BaseModel):
+    status_codes: List[int]
+    abnormal: List[bool]
+    counts: Dict[str, int]
+    statuses: Optional[List[str]] = None
+
+class CohortResponse(BaseModel):
+    success: bool
+    rows: int
+    status_names: List[str]
+    results: Dict[str, CohortLabResult]
+    elapsed_ms: float
+
+class ReportSummary(BaseModel):
+    content_sha256: str
+    filename: str
+    created_at: float
+    analyzed_at: Optional[float] = None
+    rules_version: Optional[str] = None
+    conditions: List[str]
+    lab_values: Dict[str, float]
+    summary: Optional[str] = None
+    snippet: Optional[str] = None
+
+class ReportQueryResponse(BaseModel):
+    success: bool
+    items: List[ReportSummary]
+    next_cursor: Optional[str] = None
+
+class StoredReportResponse(BaseModel):
+    content_sha256: str
+    filename: str
+    text: Optional[str] = None
+    ocr_metadata: Optional[Dict[str, Any]] = None
+    rules_version: Optional[str] = None
+    analyzed_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+
+class LabTrend(BaseModel):
+    observed_at: List[float]
+    values: List[float]
+    statuses: Optional[List[str]] = None
+    abnormal: Optional[List[bool]] = None
+    window: int
+    rolling_mean: List[Optional[float]]
+    rolling_min: List[Optional[float]]
+    rolling_max: List[Optional[float]]
+    latest: Dict[str, Any]
+    count: int
+    min: float
+    max: float
+    mean: float
+    slope_per_year: Optional[float] = None
+
+class LabTrendResponse(BaseModel):
+    success: bool
+    patient_id: str
+    trends: Dict[str, LabTrend]
+    elapsed_ms: float
+
 def allowed_file(filename: str) -> bool:
     """Check if file extension is allowed."""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -111,115 +284,60 @@ class MedicalReportAnalyzer:
         """Initialize the medical report analyzer with fallback to basic analysis."""
         logger.info("Initializing Medical Report Analyzer...")
         
-        # Initialize NLP models with error handling
-        self.clinical_classifier = None
+        # Transformer models are loaded on demand (or warmed in the background), never at import
         self.ner_pipeline = None
+        self.model_status = {name: 'not_loaded' for name in MODEL_SPECS}
+        self._model_lock = threading.Lock()
+        self._cohort_classifier = None
+        # Chunks of concurrent reports share NER forward passes
+        self.ner_batcher = ner_batcher.NERMicroBatcher(lambda: self.load_model('ner_pipeline'))
         
-        # Try to load advanced models, but don't fail if they're not available
-        try:
-            from transformers import pipeline
-            logger.info("Attempting to load transformers models...")
-            
-            # Try to load clinical BERT
-            try:
-                self.clinical_classifier = pipeline(
-                    "text-classification",
-                    model="emilyalsentzer/Bio_ClinicalBERT",
-                    device=-1  # Force CPU to avoid CUDA issues
-                )
-                logger.info("Clinical BERT loaded successfully")
-            except Exception as e:
-                logger.warning(f"Could not load Clinical BERT: {e}")
-            
-            # Try to load NER model
-            try:
-                self.ner_pipeline = pipeline(
-                    "ner",
-                    model="d4data/biomedical-ner-all",
-                    aggregation_strategy="simple",
-                    device=-1  # Force CPU
-                )
-                logger.info("NER pipeline loaded successfully")
-            except Exception as e:
-                logger.warning(f"Could not load NER pipeline: {e}")
-                
-        except ImportError:
-            logger.warning("Transformers library not available. Using basic analysis only.")
-        except Exception as e:
-            logger.warning(f"Error initializing advanced models: {e}")
-        
-        # Lab value ranges (this will always work)
-        self.lab_ranges = {
-            'glucose': {
-                'ranges': [(70, 99, 'normal'), (100, 125, 'prediabetes'), (126, float('inf'), 'diabetes')],
-                'patterns': [r'glucose[:\s](\d+\.?\d*)', r'blood\s+sugar[:\s](\d+\.?\d*)', r'fbs[:\s](\d+\.?\d*)'],
-                'unit_conversions': {'mmol/l': 18.0}
-            },
-            'hba1c': {
-                'ranges': [(0, 5.6, 'normal'), (5.7, 6.4, 'prediabetes'), (6.5, float('inf'), 'diabetes')],
-                'patterns': [r'hba1c[:\s](\d+\.?\d*)', r'hemoglobin\s+a1c[:\s](\d+\.?\d*)', r'glycated\s+hemoglobin[:\s](\d+\.?\d*)']
-            },
-            'cholesterol_total': {
-                'ranges': [(0, 199, 'normal'), (200, 239, 'borderline_high'), (240, float('inf'), 'high')],
-                'patterns': [r'total\s+cholesterol[:\s](\d+\.?\d*)', r'cholesterol[:\s](\d+\.?\d*)'],
-                'conditions': ['hyperlipidemia', 'cardiovascular_risk']
-            },
-            'ldl': {
-                'ranges': [(0, 99, 'optimal'), (100, 129, 'near_optimal'), (130, 159, 'borderline_high'), (160, 189, 'high'), (190, float('inf'), 'very_high')],
-                'patterns': [r'ldl[:\s](\d+\.?\d*)', r'low\s+density\s+lipoprotein[:\s](\d+\.?\d*)'],
-                'conditions': ['hyperlipidemia', 'cardiovascular_risk']
-            },
-            'hdl': {
-                'ranges': [(60, float('inf'), 'good'), (40, 59, 'low_normal'), (0, 39, 'low')],
-                'patterns': [r'hdl[:\s](\d+\.?\d*)', r'high\s+density\s+lipoprotein[:\s](\d+\.?\d*)'],
-                'conditions': ['low_hdl', 'cardiovascular_risk']
-            },
-            'blood_pressure_systolic': {
-                'ranges': [(0, 119, 'normal'), (120, 129, 'elevated'), (130, 139, 'stage1_hypertension'), (140, 179, 'stage2_hypertension'), (180, float('inf'), 'hypertensive_crisis')],
-                'patterns': [r'bp[:\s](\d+)\/\d+', r'blood\s+pressure[:\s](\d+)\/\d+', r'systolic[:\s]*(\d+)'],
-                'conditions': ['hypertension']
-            },
-            'blood_pressure_diastolic': {
-                'ranges': [(0, 79, 'normal'), (80, 89, 'stage1_hypertension'), (90, 119, 'stage2_hypertension'), (120, float('inf'), 'hypertensive_crisis')],
-                'patterns': [r'bp[:\s]\d+\/(\d+)', r'blood\s+pressure[:\s]\d+\/(\d+)', r'diastolic[:\s]*(\d+)'],
-                'conditions': ['hypertension']
-            },
-            'hemoglobin': {
-                'ranges': [(12.0, 16.0, 'normal_female'), (14.0, 18.0, 'normal_male'), (0, 11.9, 'anemia')],
-                'patterns': [r'hemoglobin[:\s](\d+\.?\d*)', r'hb[:\s](\d+\.?\d*)', r'hgb[:\s](\d+\.?\d*)'],
-                'conditions': ['anemia']
-            },
-            'creatinine': {
-                'ranges': [(0.6, 1.2, 'normal'), (1.3, 3.0, 'mild_kidney_disease'), (3.1, float('inf'), 'severe_kidney_disease')],
-                'patterns': [r'creatinine[:\s](\d+\.?\d*)', r'cr[:\s](\d+\.?\d*)'],
-                'conditions': ['chronic_kidney_disease']
-            }
-        }
+        # Lab rule tables are data, compiled once into a single-pass matcher
+        self.lab_ranges = lab_engine.load_lab_rules(LAB_RULES_FILE)
+        self.lab_engine = lab_engine.LabExtractionEngine(self.lab_ranges)
         
-        # Disease patterns for keyword matching
-        self.disease_patterns = {
-            'diabetes': {
-                'keywords': ['diabetes', 'diabetic', 'dm', 'hyperglycemia', 'insulin', 'metformin'],
-                'patterns': [r'\b(?:type\s*[12]\s*)?diabet(?:es|ic)\b', r'\bhyperglycemi[ac]\b']
-            },
-            'hypertension': {
-                'keywords': ['hypertension', 'high blood pressure', 'htn', 'elevated bp'],
-                'patterns': [r'\bhypertension\b', r'\bhigh\s+blood\s+pressure\b', r'\bhtn\b']
-            },
-            'hyperlipidemia': {
-                'keywords': ['hyperlipidemia', 'dyslipidemia', 'high cholesterol', 'elevated lipids'],
-                'patterns': [r'\bhyperlipidemia\b', r'\bdyslipidemia\b', r'\bhigh\s+cholesterol\b']
-            },
-            'anemia': {
-                'keywords': ['anemia', 'low hemoglobin', 'iron deficiency', 'low hb'],
-                'patterns': [r'\banemi[ac]\b', r'\blow\s+hemoglobin\b']
-            }
-        }
+        # Disease vocabulary, matched with a keyword automaton built once (cached on disk)
+        self.disease_patterns = keyword_matcher.load_disease_rules(DISEASE_RULES_FILE)
+        self.disease_matcher = keyword_matcher.DiseaseMatcher(self.disease_patterns, KEYWORD_AUTOMATON_CACHE)
+        
+        # Fingerprint of the rule tables, used to tell stale cached analyses apart
+        self.rules_version = hashlib.sha256(
+            json.dumps({'lab_ranges': self.lab_ranges, 'disease_patterns': self.disease_patterns},
+                       sort_keys=True).encode()
+        ).hexdigest()[:16]
         
         logger.info("Medical Report Analyzer initialized successfully")
 
-    async def extract_text_from_image(self, image_path: str) -> str:
-        """Extract text from an image file with enhanced preprocessing."""
+    def load_model(self, name: str) -> Optional[Any]:
+        """Load one of MODEL_SPECS on first use; returns None if it cannot be loaded."""
+        if MODEL_LOADING == 'off':
+            return None
+        with self._model_lock:
+            if self.model_status[name] in ('loaded', 'failed'):
+                return getattr(self, name)
+            
+            self.model_status[name] = 'loading'
+            start = time.perf_counter()
+            try:
+                from transformers import pipeline
+                setattr(self, name, pipeline(**MODEL_SPECS[name]))
+                self.model_status[name] = 'loaded'
+                logger.info(f"Loaded {name} in {time.perf_counter() - start:.1f}s")
+            except ImportError:
+                self.model_status[name] = 'failed'
+                logger.warning("Transformers library not available. Using basic analysis only.")
+            except Exception as e:
+                self.model_status[name] = 'failed'
+                logger.warning(f"Could not load {name}: {e}")
+            return getattr(self, name)
+
+    def warm_up_models(self):
+        """Load every model; meant to run in a background thread after startup."""
+        for name in MODEL_SPECS:
+            self.load_model(name)
+
+    async def extract_text_from_image(self, image_path: str) -> tuple:
+        """Extract text from an image file, returning (text, ocr_metadata)."""
         try:
             logger.debug(f"Extracting text from image: {image_path}")
             
@@ -227,41 +345,19 @@ class MedicalReportAnalyzer:
             if not tesseract_found:
                 raise Exception("Tesseract OCR not found. Please install Tesseract OCR.")
             
-            # Run OCR in thread pool to avoid blocking
-            def _extract_text():
-                image = Image.open(image_path)
-                # Convert to grayscale for better OCR
-                image = image.convert('L')
-                
-                # Try different OCR configurations
-                configs = [
-                    '--psm 6',  # Uniform block of text
-                    '--psm 4',  # Single column of text
-                    '--psm 3'   # Fully automatic page segmentation
-                ]
-                
-                best_text = ""
-                for config in configs:
-                    try:
-                        text = pytesseract.image_to_string(image, config=config)
-                        if len(text.strip()) > len(best_text.strip()):
-                            best_text = text
-                    except Exception as e:
-                        logger.debug(f"OCR config {config} failed: {e}")
-                        continue
-                
-                if not best_text.strip():
-                    # Fallback to basic OCR
-                    best_text = pytesseract.image_to_string(image)
-                
-                return best_text
+            image = Image.open(image_path)
+            # Convert to grayscale for better OCR
+            image = image.convert('L')
             
-            # Run in thread pool
-            loop = asyncio.get_event_loop()
-            text = await loop.run_in_executor(None, _extract_text)
+            # Normalize resolution, deskew, binarize and crop once, before any OCR pass
+            image, preprocess_metadata = await asyncio.to_thread(image_preprocess.preprocess, image)
             
-            logger.debug(f"Extracted {len(text)} characters from image")
-            return text
+            # Run OCR in the process pool (parallel PSM variants or adaptive escalation)
+            text, ocr_metadata = await ocr_pool.run_ocr(image)
+            ocr_metadata['preprocess'] = preprocess_metadata
+            
+            logger.debug(f"Extracted {len(text)} characters from image using {ocr_metadata['selected_config']}")
+            return text, ocr_metadata
             
         except Exception as e:
             logger.error(f"Error extracting text from image: {e}")
@@ -270,40 +366,61 @@ class MedicalReportAnalyzer:
                 detail=f"Error extracting text from image: {str(e)}"
             )
 
-    async def extract_text_from_pdf(self, pdf_path: str) -> str:
-        """Extract text from a PDF file."""
+    async def extract_text_from_pdf(self, pdf_path: str, progress: Optional[Callable] = None) -> tuple:
+        """Extract text from a PDF file, returning (text, ocr_metadata).
+
+        ``progress(event, data)`` is awaited as each page's text becomes available.
+        """
         try:
             logger.debug(f"Extracting text from PDF: {pdf_path}")
             
-            def _extract_from_pdf():
-                # Convert PDF to images
-                images = pdf2image.convert_from_path(pdf_path, dpi=200)
-                text = ""
-                
-                for i, img in enumerate(images):
-                    logger.debug(f"Processing page {i+1}")
-                    # Save image temporarily
-                    with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_img:
-                        img.save(temp_img.name, 'PNG')
-                        # Extract text synchronously within the thread
-                        image = Image.open(temp_img.name)
-                        image = image.convert('L')
-                        page_text = pytesseract.image_to_string(image)
-                        text += f"\n--- Page {i+1} ---\n{page_text}\n"
-                        # Clean up temp file
-                        try:
-                            os.unlink(temp_img.name)
-                        except:
-                            pass
-                
-                return text
-            
-            # Run in thread pool
+            # Only the page count is read up front; pages are rendered and OCRed one at a time
             loop = asyncio.get_event_loop()
-            text = await loop.run_in_executor(None, _extract_from_pdf)
+            page_count = await loop.run_in_executor(None, ocr_pool.pdf_page_count, pdf_path)
+            
+            # Born-digital pages are read straight from the text layer, only image pages are OCRed
+            page_texts = {}
+            pages = {}
+            text_layer_ms = 0.0
+            if PDF_TEXT_LAYER:
+                start = time.perf_counter()
+                text_layer = await loop.run_in_executor(None, ocr_pool.extract_text_layer, pdf_path, page_count)
+                text_layer_ms = round((time.perf_counter() - start) * 1000, 2)
+                for i, page_text in enumerate(text_layer):
+                    if ocr_pool.is_usable_text_layer(page_text, PDF_TEXT_LAYER_MIN_CHARS):
+                        page_texts[i + 1] = page_text
+                        pages[i + 1] = {'page': i + 1, 'source': 'text_layer'}
+                        if progress:
+                            await progress('page', {'page': i + 1, 'page_count': page_count, 'source': 'text_layer'})
+            
+            ocr_page_numbers = [n for n in range(1, page_count + 1) if n not in page_texts]
+            async for page in ocr_pool.iter_pdf_pages(
+                pdf_path, ocr_page_numbers, PDF_PAGE_WINDOW,
+                dpi_mode=PDF_DPI_MODE, dpi=PDF_DPI, low_dpi=PDF_LOW_DPI,
+                max_dpi=PDF_MAX_DPI, dpi_step=PDF_DPI_STEP
+            ):
+                logger.debug(f"OCRed page {page['page']}/{page_count}")
+                page_texts[page['page']] = page.pop('text')
+                page['source'] = 'ocr'
+                pages[page['page']] = page
+                if progress:
+                    await progress('page', {'page': page['page'], 'page_count': page_count, 'source': 'ocr'})
+            
+            text = ""
+            for n in range(1, page_count + 1):
+                text += f"\n--- Page {n} ---\n{page_texts[n]}\n"
+            
+            ocr_metadata = {
+                'page_count': page_count,
+                'dpi_mode': PDF_DPI_MODE,
+                'text_layer_pages': page_count - len(ocr_page_numbers),
+                'ocr_pages': len(ocr_page_numbers),
+                'text_layer_ms': text_layer_ms,
+                'pages': [pages[n] for n in range(1, page_count + 1)]
+            }
             
             logger.debug(f"Extracted {len(text)} characters from PDF")
-            return text
+            return text, ocr_metadata
             
         except Exception as e:
             logger.error(f"Error extracting text from PDF: {e}")
@@ -314,52 +431,36 @@ class MedicalReportAnalyzer:
 
     def preprocess_text(self, text: str) -> str:
         """Basic text preprocessing."""
+        return self.preprocess_text_with_offsets(text)[0]
+
+    def preprocess_text_with_offsets(self, text: str) -> tuple:
+        """Preprocess text, returning (cleaned_text, offsets).
+
+        ``offsets[i]`` is the position in ``text`` of ``cleaned_text[i]``.
+        """
+        offsets = list(range(len(text)))
         try:
             # Remove potential PII
-            text = re.sub(r'\b(?:patient|name|date|id|contact|address|phone|ssn)\b[:\s][^\n]*', '', text, flags=re.IGNORECASE)
+            text, offsets = ner_batcher.sub_with_offsets(
+                r'\b(?:patient|name|date|id|contact|address|phone|ssn)\b[:\s][^\n]*', '', text, offsets, flags=re.IGNORECASE)
             # Normalize units
-            text = re.sub(r'\b(?:mg/dl|mg%)\b', 'mg/dL', text, flags=re.IGNORECASE)
+            text, offsets = ner_batcher.sub_with_offsets(r'\b(?:mg/dl|mg%)\b', 'mg/dL', text, offsets, flags=re.IGNORECASE)
             # Clean whitespace
-            text = re.sub(r'\s+', ' ', text)
-            text = text.strip()
-            return text
+            text, offsets = ner_batcher.sub_with_offsets(r'\s+', ' ', text, offsets)
+            stripped = text.strip()
+            lead = len(text) - len(text.lstrip())
+            return stripped, offsets[lead:lead + len(stripped)]
         except Exception as e:
             logger.error(f"Error preprocessing text: {e}")
-            return text
+            return text, offsets
 
     def extract_lab_values(self, text: str) -> Dict[str, float]:
-        """Extract lab values using regex patterns."""
-        extracted_values = {}
-        
+        """Extract lab values in a single pass of the compiled lab engine."""
         try:
-            for lab_name, lab_info in self.lab_ranges.items():
-                for pattern in lab_info['patterns']:
-                    matches = re.finditer(pattern, text, re.IGNORECASE)
-                    for match in matches:
-                        try:
-                            value = float(match.group(1))
-                            
-                            # Handle unit conversions
-                            if 'unit_conversions' in lab_info:
-                                context = text[max(0, match.start()-50):match.end()+50].lower()
-                                for unit, conversion_factor in lab_info['unit_conversions'].items():
-                                    if unit in context:
-                                        value *= conversion_factor
-                                        break
-                            
-                            extracted_values[lab_name] = value
-                            logger.debug(f"Found {lab_name}: {value}")
-                            break
-                        except (ValueError, IndexError) as e:
-                            logger.debug(f"Error parsing value for {lab_name}: {e}")
-                            continue
-                    if lab_name in extracted_values:
-                        break
-                        
+            return self.lab_engine.extract(text)
         except Exception as e:
             logger.error(f"Error extracting lab values: {e}")
-        
-        return extracted_values
+            return {}
 
     def analyze_lab_values(self, lab_values: Dict[str, float]) -> tuple:
         """Analyze lab values against reference ranges."""
@@ -383,7 +484,7 @@ class MedicalReportAnalyzer:
                 detailed_results[lab_name] = LabValue(
                     value=value,
                     status=status,
-                    normal=status in ['normal', 'optimal', 'good', 'normal_female', 'normal_male']
+                    normal=status in lab_engine.NORMAL_STATUSES
                 )
                 
                 # Add conditions if abnormal
@@ -395,34 +496,43 @@ class MedicalReportAnalyzer:
         
         return conditions, detailed_results
 
+    def get_cohort_classifier(self):
+        """Compile lab_ranges for vectorized cohort classification on first use (imports numpy)."""
+        if self._cohort_classifier is None:
+            import lab_cohort
+            self._cohort_classifier = lab_cohort.CohortLabClassifier(self.lab_ranges)
+        return self._cohort_classifier
+
     def extract_diseases_by_keywords(self, text: str) -> tuple:
         """Extract diseases using keyword matching."""
-        detected_diseases = []
-        confidence_scores = {}
-        
         try:
-            for disease, disease_info in self.disease_patterns.items():
-                score = 0
-                
-                # Check keywords
-                for keyword in disease_info['keywords']:
-                    if keyword.lower() in text.lower():
-                        score += 1
-                
-                # Check patterns
-                for pattern in disease_info['patterns']:
-                    matches = re.findall(pattern, text, re.IGNORECASE)
-                    score += len(matches) * 2
-                
-                if score > 0:
-                    detected_diseases.append(disease)
-                    confidence_scores[disease] = min(score / 3.0, 1.0)
-                    logger.debug(f"Detected {disease} with score {score}")
-                    
+            return self.disease_matcher.match(text)
         except Exception as e:
             logger.error(f"Error extracting diseases by keywords: {e}")
-        
-        return detected_diseases, confidence_scores
+            return [], {}
+
+    async def extract_entities(self, text: str, offsets: Optional[List[int]] = None) -> tuple:
+        """Run biomedical NER on text, returning (entities, entities_status).
+
+        Entity offsets refer to ``text``, or to the original report when
+        ``offsets`` maps ``text`` back to it. While the model is still warming up in
+        the background the report is analyzed without entities instead of waiting.
+        """
+        if MODEL_LOADING == 'off':
+            return [], 'disabled'
+        model_status = self.model_status['ner_pipeline']
+        if model_status == 'failed':
+            return [], 'unavailable'
+        if MODEL_LOADING == 'background' and model_status != 'loaded':
+            return [], 'skipped'
+        try:
+            entities = await self.ner_batcher.extract(text)
+            if offsets is not None:
+                entities = ner_batcher.map_entity_offsets(entities, offsets)
+            return entities, 'ok'
+        except Exception as e:
+            logger.error(f"Error extracting entities: {e}")
+            return [], 'failed'
 
     async def analyze_medical_report(self, report_text: str) -> Dict[str, Any]:
         """Main analysis function with comprehensive error handling."""
@@ -430,7 +540,7 @@ class MedicalReportAnalyzer:
             logger.info("Starting medical report analysis")
             
             # Preprocess text
-            cleaned_text = self.preprocess_text(report_text)
+            cleaned_text, offsets = self.preprocess_text_with_offsets(report_text)
             logger.debug(f"Preprocessed text: {len(cleaned_text)} characters")
             
             # Extract lab values
@@ -444,6 +554,10 @@ class MedicalReportAnalyzer:
             keyword_diseases, keyword_confidence = self.extract_diseases_by_keywords(cleaned_text)
             logger.debug(f"Found diseases: {keyword_diseases}")
             
+            # Extract entities (offsets into the original report text)
+            entities, entities_status = await self.extract_entities(cleaned_text, offsets)
+            logger.debug(f"Found {len(entities)} entities ({entities_status})")
+            
             # Combine all conditions
             all_conditions = list(set(lab_conditions + keyword_diseases))
             
@@ -455,7 +569,8 @@ class MedicalReportAnalyzer:
                 'lab_values': lab_values,
                 'lab_details': lab_details,
                 'keyword_confidence': keyword_confidence,
-                'entities': [],  # Placeholder for now
+                'entities': entities,
+                'entities_status': entities_status,
                 'summary': summary,
                 'analysis_timestamp': datetime.now().isoformat()
             }
@@ -503,6 +618,160 @@ except Exception as e:
     logger.error(f"Failed to initialize analyzer: {e}")
     analyzer = None
 
+# Content-addressed cache for OCR text and analysis results
+report_cache = report_cache_module.create_cache()
+
+# Durable archive of extracted text and latest analyses, used for re-analysis after rule changes
+report_store = report_store_module.create_store()
+
+# Per-patient lab value time series, opened on first use (imports numpy)
+_lab_trend_store = None
+_lab_trend_store_opened = False
+
+def get_lab_trend_store():
+    """Return the lab trend store, or None when disabled."""
+    global _lab_trend_store, _lab_trend_store_opened
+    if not _lab_trend_store_opened:
+        import lab_trends
+        _lab_trend_store = lab_trends.create_store()
+        _lab_trend_store_opened = True
+    return _lab_trend_store
+
+def parse_observed_at(observed_at: Optional[str]) -> float:
+    """Epoch seconds for an ISO date/datetime (or epoch number); now when not given."""
+    if not observed_at:
+        return time.time()
+    try:
+        return float(observed_at)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(observed_at).timestamp()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid observed_at '{observed_at}': use an ISO date such as 2024-03-01"
+        )
+
+# Persistent queue for asynchronous analysis jobs
+job_queue = job_queue_module.JobQueue()
+job_runners: List[asyncio.Task] = []
+
+async def extract_report_text(filename: str, content: bytes, progress: Optional[Callable] = None) -> tuple:
+    """Extract text from uploaded file bytes, returning (text, ocr_metadata)."""
+    temp_path = None
+    try:
+        # Create temporary file with proper extension
+        suffix = Path(filename).suffix
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
+            temp_path = temp_file.name
+            # Write content to temporary file using aiofiles properly
+            async with aiofiles.open(temp_path, 'wb') as f:
+                await f.write(content)
+            logger.debug(f"Saved temp file: {temp_path}")
+        
+        # Extract text based on file type
+        if filename.lower().endswith('.pdf'):
+            logger.info("Extracting text from PDF")
+            return await analyzer.extract_text_from_pdf(temp_path, progress=progress)
+        else:
+            logger.info("Extracting text from image")
+            result = await analyzer.extract_text_from_image(temp_path)
+            if progress:
+                await progress('page', {'page': 1, 'page_count': 1, 'source': 'ocr'})
+            return result
+        
+    finally:
+        # Clean up temporary file
+        if temp_path:
+            try:
+                os.unlink(temp_path)
+                logger.debug(f"Cleaned up temp file: {temp_path}")
+            except Exception as e:
+                logger.warning(f"Could not clean up temp file: {e}")
+
+def build_analysis_result(results: Dict[str, Any], filename: str, report_text: str,
+                          ocr_metadata: Optional[Dict[str, Any]], content_hash: str) -> AnalysisResult:
+    """Attach file and provenance metadata to analyze_medical_report output."""
+    results['filename'] = filename
+    results['extracted_text_length'] = len(report_text)
+    results['ocr_metadata'] = ocr_metadata
+    results['content_sha256'] = content_hash
+    results['rules_version'] = analyzer.rules_version
+    return AnalysisResult(**results)
+
+async def analyze_content(filename: str, content: bytes, progress: Optional[Callable] = None) -> AnalysisResult:
+    """Run the OCR + analysis pipeline on uploaded bytes, using the report cache when possible.
+
+    ``progress(event, data)`` is a coroutine function awaited with per-page events while text is extracted.
+    """
+    try:
+        content_hash = hashlib.sha256(content).hexdigest()
+        analysis_key = f"{content_hash}:{analyzer.rules_version}"
+        
+        # Identical bytes analyzed under the same rules: nothing to recompute
+        cached_analysis = await asyncio.to_thread(report_cache.get, 'analysis', analysis_key) if report_cache else None
+        if cached_analysis is not None:
+            logger.info(f"Analysis cache hit for {content_hash[:12]}")
+            # The memory tier hands out the stored dict itself, so don't modify it
+            return AnalysisResult(**{**cached_analysis, 'filename': filename,
+                                     'cache': {'text': True, 'analysis': True}})
+        
+        cached_text = await asyncio.to_thread(report_cache.get, 'text', content_hash) if report_cache else None
+        if cached_text is None and report_store:
+            # Evicted from the cache but archived: still no need to OCR again
+            cached_text = await asyncio.to_thread(report_store.get_text, content_hash)
+        if cached_text is not None:
+            logger.info(f"OCR text cache hit for {content_hash[:12]}")
+            report_text, ocr_metadata = cached_text['text'], cached_text['ocr_metadata']
+        else:
+            report_text, ocr_metadata = await extract_report_text(filename, content, progress=progress)
+        
+        # Check if text was extracted
+        if not report_text or not report_text.strip():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No text could be extracted from the file. Please check the file quality and format."
+            )
+        
+        if report_cache and cached_text is None:
+            await asyncio.to_thread(report_cache.set, 'text', content_hash,
+                                    {'text': report_text, 'ocr_metadata': ocr_metadata})
+        if report_store and cached_text is None:
+            await asyncio.to_thread(report_store.save_text, content_hash, filename, report_text, ocr_metadata)
+        
+        logger.info(f"Extracted {len(report_text)} characters")
+        if progress:
+            await progress('analyzing', {'extracted_text_length': len(report_text)})
+        
+        # Analyze the report
+        results = await analyzer.analyze_medical_report(report_text)
+        analysis_result = build_analysis_result(results, filename, report_text, ocr_metadata, content_hash)
+        
+        logger.info("Analysis completed successfully")
+        
+        if report_store:
+            await asyncio.to_thread(report_store.save_analysis, content_hash, analyzer.rules_version,
+                                    analysis_result.model_dump(exclude={'filename', 'cache'}))
+        
+        # Don't pin an analysis that is missing entities only because the model wasn't ready
+        if report_cache and analysis_result.entities_status not in ('skipped', 'failed'):
+            await asyncio.to_thread(report_cache.set, 'analysis', analysis_key,
+                                    analysis_result.model_dump(exclude={'filename', 'cache'}))
+        analysis_result.cache = {'text': cached_text is not None, 'analysis': False}
+        
+        return analysis_result
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing file: {e}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Analysis failed: {str(e)}"
+        )
+
 # API Routes
 
 @app.get("/", response_model=Dict[str, str])
@@ -522,12 +791,42 @@ async def health_check():
         status="healthy",
         message="Medical Report Analyzer API is running",
         tesseract_available=tesseract_found,
-        analyzer_ready=analyzer is not None
+        analyzer_ready=analyzer is not None,
+        ocr_stats={'mode': ocr_pool.OCR_MODE, 'engine': ocr_engine.resolve_backend(),
+                   'languages': ocr_languages.OCR_LANGUAGES, 'script_routing': ocr_languages.routing_enabled(),
+                   **ocr_pool.ocr_stats},
+        cache=report_cache.stats() if report_cache else None,
+        ner_stats=analyzer.ner_batcher.snapshot() if analyzer else None,
+        # Stale analyses are counted by `python reanalyze.py --dry-run`, not on every health check
+        report_store=report_store.stats() if report_store else None
+    )
+
+@app.get("/ready", response_model=ReadinessResponse)
+async def readiness_check():
+    """Readiness endpoint reporting which models and heavy dependencies are actually loaded."""
+    ready = analyzer is not None and tesseract_found
+    readiness = ReadinessResponse(
+        ready=ready,
+        analyzer_ready=analyzer is not None,
+        tesseract_available=tesseract_found,
+        model_loading=MODEL_LOADING,
+        models=dict(analyzer.model_status) if analyzer else {},
+        ocr_pool_started=ocr_pool.is_started(),
+        loaded_modules=[name for name in HEAVY_MODULES if name in sys.modules]
+    )
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=readiness.model_dump()
     )
 
 @app.post("/analyze", response_model=APIResponse)
-async def analyze_report(file: UploadFile = File(...)):
-    """Main endpoint to analyze medical reports."""
+async def analyze_report(file: UploadFile = File(...), patient_id: Optional[str] = Form(None),
+                         observed_at: Optional[str] = Form(None)):
+    """Main endpoint to analyze medical reports.
+
+    With a ``patient_id`` the extracted lab values are added to the patient's
+    lab trends, dated ``observed_at`` (the report date; upload time by default).
+    """
     try:
         logger.info(f"Received analysis request for file: {file.filename}")
         
@@ -556,71 +855,26 @@ async def analyze_report(file: UploadFile = File(...)):
         filename = file.filename
         logger.info(f"Processing file: {filename}")
         
-        # Create temporary file
-        temp_path = None
-        try:
-            # Read file content
-            content = await file.read()
-            
-            # Create temporary file with proper extension
-            suffix = Path(filename).suffix
-            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
-                temp_path = temp_file.name
-                # Write content to temporary file using aiofiles properly
-                async with aiofiles.open(temp_path, 'wb') as f:
-                    await f.write(content)
-                logger.debug(f"Saved temp file: {temp_path}")
-            
-            # Extract text based on file type
-            if filename.lower().endswith('.pdf'):
-                logger.info("Extracting text from PDF")
-                report_text = await analyzer.extract_text_from_pdf(temp_path)
-            else:
-                logger.info("Extracting text from image")
-                report_text = await analyzer.extract_text_from_image(temp_path)
-            
-            # Check if text was extracted
-            if not report_text or not report_text.strip():
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="No text could be extracted from the file. Please check the file quality and format."
-                )
-            
-            logger.info(f"Extracted {len(report_text)} characters")
-            
-            # Analyze the report
-            results = await analyzer.analyze_medical_report(report_text)
-            
-            # Add metadata
-            results['filename'] = filename
-            results['extracted_text_length'] = len(report_text)
-            
-            logger.info("Analysis completed successfully")
-            
-            # Convert to Pydantic model
-            analysis_result = AnalysisResult(**results)
-            
-            return APIResponse(success=True, data=analysis_result)
-            
-        except HTTPException:
-            raise
-        except Exception as e:
-            logger.error(f"Error processing file: {e}")
-            logger.error(traceback.format_exc())
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Analysis failed: {str(e)}"
-            )
-            
-        finally:
-            # Clean up temporary file
-            if temp_path:
-                try:
-                    os.unlink(temp_path)
-                    logger.debug(f"Cleaned up temp file: {temp_path}")
-                except Exception as e:
-                    logger.warning(f"Could not clean up temp file: {e}")
-                
+        # Validate trend fields before spending time on OCR
+        trend_store = get_lab_trend_store() if patient_id else None
+        if trend_store:
+            try:
+                trend_store.check_name("patient id", patient_id)
+            except ValueError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+            observed_ts = parse_observed_at(observed_at)
+        
+        # Read file content
+        content = await file.read()
+        analysis_result = await analyze_content(filename, content)
+        
+        if trend_store and analysis_result.lab_values:
+            added = await asyncio.to_thread(trend_store.append, patient_id, analysis_result.lab_values,
+                                            observed_ts, analysis_result.content_sha256)
+            logger.info(f"Recorded {added} lab values for patient {patient_id}")
+        
+        return APIResponse(success=True, data=analysis_result)
+    
     except Exception as e:
         logger.error(f"Unexpected error in analyze_report: {e}")
         logger.error(traceback.format_exc())
@@ -629,6 +883,403 @@ async def analyze_report(file: UploadFile = File(...)):
             detail=f"Server error: {str(e)}"
         )
 
+def expand_batch_uploads(uploads: List[tuple]) -> List[tuple]:
+    """Unpack zip archives and validate each file, returning (filename, content, error) tuples.
+
+    Zip members are only listed here; their ``content`` is a callable that
+    decompresses the member when it is analyzed. Raises 413 as soon as the
+    batch passes MAX_BATCH_FILES files or MAX_BATCH_BYTES, using the sizes
+    recorded in the archive rather than decompressing anything.
+    """
+    items = []
+    total_bytes = 0
+    
+    def _add(filename, content, error, size=0):
+        nonlocal total_bytes
+        items.append((filename, content, error))
+        total_bytes += size
+        if len(items) > MAX_BATCH_FILES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Batch contains more than {MAX_BATCH_FILES} files"
+            )
+        if total_bytes > MAX_BATCH_BYTES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Batch files exceed {MAX_BATCH_BYTES // (1024 * 1024)}MB in total"
+            )
+    
+    for filename, content in uploads:
+        if filename.lower().endswith('.zip'):
+            try:
+                archive = zipfile.ZipFile(io.BytesIO(content))
+            except zipfile.BadZipFile as e:
+                _add(filename, None, f"Invalid zip archive: {str(e)}")
+                continue
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                if info.file_size > MAX_FILE_SIZE:
+                    _add(info.filename, None, "File size exceeds maximum allowed size")
+                elif not allowed_file(info.filename):
+                    _add(info.filename, None, "File type not allowed")
+                else:
+                    # ZipFile reads are bounded by the recorded size
+                    _add(info.filename, lambda archive=archive, info=info: archive.read(info), None, info.file_size)
+        elif len(content) > MAX_FILE_SIZE:
+            _add(filename, None, "File size exceeds maximum allowed size")
+        elif not allowed_file(filename):
+            _add(filename, None, "File type not allowed")
+        else:
+            _add(filename, content, None, len(content))
+    return items
+
+async def read_batch_uploads(files: List[UploadFile]) -> List[tuple]:
+    """Read batch uploads as (filename, content) tuples.
+
+    Raises 413 as soon as the uploads (zip archives included) pass
+    MAX_BATCH_BYTES, before anything past the limit is read. Files other
+    than zip archives are read only one byte past MAX_FILE_SIZE, which is
+    enough for expand_batch_uploads to reject them.
+    """
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Batch files exceed {MAX_BATCH_BYTES // (1024 * 1024)}MB in total"
+    )
+    uploads = []
+    total_bytes = 0
+    for i, file in enumerate(files):
+        filename = file.filename or f"file_{i}"
+        read_limit = None if filename.lower().endswith('.zip') else MAX_FILE_SIZE + 1
+        expected = min(file.size, read_limit or file.size) if file.size else 0
+        if total_bytes + expected > MAX_BATCH_BYTES:
+            raise too_large
+        
+        chunks = []
+        size = 0
+        while read_limit is None or size < read_limit:
+            chunk = await file.read(UPLOAD_READ_CHUNK if read_limit is None else min(UPLOAD_READ_CHUNK, read_limit - size))
+            if not chunk:
+                break
+            size += len(chunk)
+            total_bytes += len(chunk)
+            if total_bytes > MAX_BATCH_BYTES:
+                raise too_large
+            chunks.append(chunk)
+        uploads.append((filename, b"".join(chunks)))
+    return uploads
+
+async def stream_batch_results(items: List[tuple]):
+    """Analyze batch items concurrently and yield one NDJSON line per file as it finishes."""
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def _analyze_item(index: int, filename: str, content, error: Optional[str]):
+        if error:
+            return BatchItemResponse(index=index, filename=filename, success=False, error=error)
+        async with semaphore:
+            try:
+                if callable(content):
+                    # Zip member, decompressed only now
+                    content = await asyncio.to_thread(content)
+                data = await analyze_content(filename, content)
+                return BatchItemResponse(index=index, filename=filename, success=True, data=data)
+            except HTTPException as e:
+                return BatchItemResponse(index=index, filename=filename, success=False, error=str(e.detail))
+            except Exception as e:
+                logger.error(f"Batch item {filename} failed: {e}")
+                return BatchItemResponse(index=index, filename=filename, success=False, error=str(e))
+    
+    tasks = [asyncio.ensure_future(_analyze_item(i, *item)) for i, item in enumerate(items)]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            result = await next_result
+            yield result.model_dump_json() + "\n"
+    finally:
+        # Client went away: stop the files that have not finished yet
+        for task in tasks:
+            task.cancel()
+
+@app.post("/analyze/batch")
+async def analyze_batch(files: List[UploadFile] = File(...)):
+    """Analyze many reports (or a zip of reports), streaming results as NDJSON."""
+    if not analyzer:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Analyzer not properly initialized"
+        )
+    
+    # Read everything before streaming starts; upload handles do not outlive the request body
+    uploads = await read_batch_uploads(files)
+    items = expand_batch_uploads(uploads)
+    
+    logger.info(f"Received batch of {len(items)} files")
+    return StreamingResponse(stream_batch_results(items), media_type="application/x-ndjson")
+
+def classify_cohort(columns: Dict[str, List[Optional[float]]], include_status_names: bool) -> Dict[str, Any]:
+    """Classify columnar lab values for many patients; missing values (null) are 'unknown'."""
+    start = time.perf_counter()
+    classifier = analyzer.get_cohort_classifier()
+    results = {}
+    for lab_name, values in columns.items():
+        codes, abnormal = classifier.classify(lab_name, [v if v is not None else float('nan') for v in values])
+        results[lab_name] = {
+            'status_codes': codes.tolist(),
+            'abnormal': abnormal.tolist(),
+            'counts': classifier.status_counts(codes)
+        }
+        if include_status_names:
+            results[lab_name]['statuses'] = [classifier.status_names[code] for code in results[lab_name]['status_codes']]
+    return {
+        'success': True,
+        'rows': len(next(iter(columns.values()), [])),
+        'status_names': classifier.status_names,
+        'results': results,
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 2)
+    }
+
+@app.post("/analyze/cohort", response_model=CohortResponse)
+async def analyze_cohort(request: CohortRequest):
+    """Classify lab values for a whole cohort at once, one column of values per analyte."""
+    if not analyzer:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Analyzer not properly initialized"
+        )
+    
+    unknown_labs = [lab_name for lab_name in request.columns if lab_name not in analyzer.lab_ranges]
+    if unknown_labs:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"No reference ranges for: {', '.join(unknown_labs)}. Known analytes: {', '.join(analyzer.lab_ranges)}"
+        )
+    
+    lengths = {len(values) for values in request.columns.values()}
+    if len(lengths) > 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="All columns must have one value per patient (use null for missing values)"
+        )
+    if lengths and max(lengths) > MAX_COHORT_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Cohort contains {max(lengths)} rows, maximum is {MAX_COHORT_ROWS}"
+        )
+    
+    result = await asyncio.to_thread(classify_cohort, request.columns, request.include_status_names)
+    logger.info(f"Classified {result['rows']} rows x {len(request.columns)} analytes in {result['elapsed_ms']} ms")
+    # Large columns: skip re-validating the response model
+    return JSONResponse(content=result)
+
+reports_api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
+
+def require_reports_api_key(api_key: Optional[str] = Depends(reports_api_key_header)):
+    """Reject requests for patient data (stored reports, lab trends) without the configured API key."""
+    if not REPORTS_API_KEY:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Patient data is unavailable: REPORTS_API_KEY is not configured")
+    if not api_key or not hmac.compare_digest(api_key.encode('utf-8'), REPORTS_API_KEY.encode('utf-8')):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or missing API key",
+                            headers={"WWW-Authenticate": "X-API-Key"})
+
+@app.get("/reports", response_model=ReportQueryResponse, dependencies=[Depends(require_reports_api_key)])
+async def query_reports(
+    q: Optional[str] = None,
+    condition: Optional[str] = None,
+    lab: Optional[str] = None,
+    min_value: Optional[float] = None,
+    max_value: Optional[float] = None,
+    lab_status: Optional[str] = None,
+    abnormal: Optional[bool] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    limit: int = report_store_module.REPORT_QUERY_DEFAULT_LIMIT,
+    cursor: Optional[str] = None
+):
+    """Search stored reports by text, condition, lab value range and upload time, newest first."""
+    if not report_store:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Report store is disabled")
+    try:
+        page = await asyncio.to_thread(
+            report_store.query, text=q, condition=condition, lab_name=lab, min_value=min_value,
+            max_value=max_value, lab_status=lab_status, abnormal=abnormal, since=since,
+            until=until, limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return ReportQueryResponse(success=True, items=page['items'], next_cursor=page['next_cursor'])
+
+@app.get("/reports/{content_sha256}", response_model=StoredReportResponse,
+         dependencies=[Depends(require_reports_api_key)])
+async def get_stored_report(content_sha256: str, include_text: bool = False):
+    """Latest analysis of one stored report, with its full text when ``include_text`` is set."""
+    if not report_store:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Report store is disabled")
+    stored = await asyncio.to_thread(report_store.get_text, content_sha256)
+    if stored is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Report not found")
+    analysis = await asyncio.to_thread(report_store.get_analysis, content_sha256) or {}
+    return StoredReportResponse(
+        content_sha256=content_sha256,
+        filename=stored['filename'],
+        text=stored['text'] if include_text else None,
+        ocr_metadata=stored['ocr_metadata'],
+        rules_version=analysis.get('rules_version'),
+        analyzed_at=analysis.get('analyzed_at'),
+        result=analysis.get('result')
+    )
+
+def collect_lab_trends(trend_store, patient_id: str, lab_names: Optional[List[str]], window: Optional[int],
+                       since_ts: Optional[float], until_ts: Optional[float]) -> Dict[str, Any]:
+    """Trends of ``lab_names`` (default: all recorded) with each value classified against lab_ranges."""
+    if lab_names is None:
+        lab_names = trend_store.labs(patient_id)
+    trends = {}
+    for lab_name in lab_names:
+        trend = trend_store.trend(patient_id, lab_name, window=window, since=since_ts, until=until_ts)
+        if trend is None:
+            continue
+        if analyzer and lab_name in analyzer.lab_ranges:
+            classifier = analyzer.get_cohort_classifier()
+            codes, abnormal = classifier.classify(lab_name, trend['values'])
+            trend['statuses'] = [classifier.status_names[code] for code in codes]
+            trend['abnormal'] = abnormal.tolist()
+        trends[lab_name] = trend
+    return trends
+
+@app.get("/patients/{patient_id}/lab-trends", response_model=LabTrendResponse,
+         dependencies=[Depends(require_reports_api_key)])
+async def get_lab_trends(patient_id: str, labs: Optional[str] = None, window: Optional[int] = None,
+                         since: Optional[str] = None, until: Optional[str] = None):
+    """Time series, rolling statistics and latest value per analyte for one patient.
+
+    ``labs`` is a comma-separated list of analytes (default: all recorded);
+    ``since``/``until`` bound the observation dates.
+    """
+    trend_store = get_lab_trend_store()
+    if not trend_store:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Lab trend store is disabled")
+    
+    start = time.perf_counter()
+    since_ts = parse_observed_at(since) if since else None
+    until_ts = parse_observed_at(until) if until else None
+    lab_names = [lab.strip() for lab in labs.split(',') if lab.strip()] if labs else None
+    try:
+        # File reads and numpy work stay off the event loop
+        trends = await asyncio.to_thread(collect_lab_trends, trend_store, patient_id, lab_names,
+                                         window, since_ts, until_ts)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    return LabTrendResponse(
+        success=True,
+        patient_id=patient_id,
+        trends=trends,
+        elapsed_ms=round((time.perf_counter() - start) * 1000, 2)
+    )
+
+async def run_analysis_jobs():
+    """Pull queued jobs and run them through the analysis pipeline until cancelled."""
+    next_requeue = 0.0
+    while True:
+        # Queue calls block on sqlite (claim waits on a write lock), so keep them off the event loop
+        job = await asyncio.to_thread(job_queue.claim)
+        if job is None:
+            # Pick up jobs left behind by a process that died since startup
+            if time.monotonic() >= next_requeue:
+                await asyncio.to_thread(job_queue.requeue_interrupted)
+                next_requeue = time.monotonic() + job_queue.lease_seconds / 2
+            await asyncio.sleep(JOB_POLL_SECONDS)
+            continue
+        
+        job_id = job['id']
+        logger.info(f"Running analysis job {job_id} ({job['filename']})")
+        await asyncio.to_thread(job_queue.add_event, job_id, 'started', {'attempt': job['attempts'] + 1})
+        lease = asyncio.create_task(job_queue.hold_lease(job_id))
+        
+        async def _progress(event, data):
+            await asyncio.to_thread(job_queue.add_event, job_id, event, data)
+        
+        try:
+            async with aiofiles.open(job['content_path'], 'rb') as f:
+                content = await f.read()
+            result = await analyze_content(job['filename'], content, progress=_progress)
+            await asyncio.to_thread(job_queue.complete, job_id, json.loads(result.model_dump_json()))
+        except asyncio.CancelledError:
+            # Left as running; requeued once its lease expires
+            raise
+        except HTTPException as e:
+            await asyncio.to_thread(job_queue.fail, job_id, str(e.detail))
+        except Exception as e:
+            logger.error(f"Analysis job {job_id} failed: {e}")
+            await asyncio.to_thread(job_queue.fail, job_id, str(e))
+        finally:
+            lease.cancel()
+
+@app.post("/analyze/jobs", response_model=JobSubmitResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_analysis_job(file: UploadFile = File(...)):
+    """Queue a report for background analysis and return its job id immediately."""
+    if file.size and file.size > MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File size exceeds maximum allowed size of {MAX_FILE_SIZE / (1024 * 1024)}MB"
+        )
+    if not file.filename or not allowed_file(file.filename):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File type not allowed. Please upload PDF, PNG, JPG, JPEG, TIFF, or BMP files."
+        )
+    
+    content = await file.read()
+    job_id = await asyncio.to_thread(job_queue.submit, file.filename, content)
+    logger.info(f"Queued analysis job {job_id} for {file.filename}")
+    return JobSubmitResponse(
+        job_id=job_id,
+        status="queued",
+        status_url=f"/analyze/jobs/{job_id}",
+        events_url=f"/analyze/jobs/{job_id}/events"
+    )
+
+@app.get("/analyze/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_analysis_job(job_id: str):
+    """Poll the status, latest progress and (when done) the result of a job."""
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return JobStatusResponse(
+        job_id=job['id'],
+        filename=job['filename'],
+        status=job['status'],
+        created_at=job['created_at'],
+        started_at=job['started_at'],
+        finished_at=job['finished_at'],
+        progress=job['progress'],
+        result=job['result'],
+        error=job['error']
+    )
+
+@app.get("/analyze/jobs/{job_id}/events")
+async def stream_analysis_job_events(job_id: str, request: Request):
+    """Server-Sent Events stream of a job's progress, ending with its result or error."""
+    if await asyncio.to_thread(job_queue.get, job_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    
+    # Reconnecting clients resume after the last event they saw
+    last_seq = int(request.headers.get('last-event-id') or 0)
+    
+    async def _events():
+        nonlocal last_seq
+        while True:
+            for event in await asyncio.to_thread(job_queue.events_since, job_id, last_seq):
+                last_seq = event['seq']
+                yield f"id: {event['seq']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+                if event['event'] in job_queue_module.TERMINAL_EVENTS:
+                    return
+            if await request.is_disconnected():
+                return
+            await asyncio.sleep(JOB_POLL_SECONDS)
+    
+    return StreamingResponse(_events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @app.get("/supported-formats", response_model=SupportedFormatsResponse)
 async def get_supported_formats():
     """Get list of supported file formats."""
@@ -639,6 +1290,26 @@ async def get_supported_formats():
         tesseract_available=tesseract_found
     )
 
+@app.on_event("startup")
+async def start_background_work():
+    """Requeue jobs with an expired lease, start the job runners and the background model warm-up."""
+    await asyncio.to_thread(job_queue.requeue_interrupted)
+    for _ in range(JOB_WORKERS):
+        job_runners.append(asyncio.create_task(run_analysis_jobs()))
+    
+    # Warm models without holding up startup; requests work without them meanwhile
+    if analyzer and MODEL_LOADING == 'background':
+        threading.Thread(target=analyzer.warm_up_models, name="model-warmup", daemon=True).start()
+
+@app.on_event("shutdown")
+async def shutdown_ocr_pool():
+    """Stop the job runners and NER batcher and release the OCR worker processes."""
+    for runner in job_runners:
+        runner.cancel()
+    if analyzer:
+        analyzer.ner_batcher.shutdown()
+    ocr_pool.shutdown_pool()
+
 # Exception handlers
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
@@ -666,6 +1337,7 @@ if __name__ == "__main__":
     print(f"Max file size: {MAX_FILE_SIZE / (1024 * 1024)}MB")
     print(f"Tesseract OCR: {'Available' if tesseract_found else 'NOT FOUND'}")
     print(f"Analyzer: {'Ready' if analyzer else 'FAILED TO INITIALIZE'}")
+    print(f"OCR workers: {ocr_pool.OCR_POOL_WORKERS}")
     print("API will be available at: http://localhost:8000")
     print("API Documentation: http://localhost:8000/docs")
     print("=" * 50)
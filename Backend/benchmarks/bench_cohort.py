@@ -0,0 +1,84 @@
+"""Benchmark vectorized cohort classification against the per-report range loop.
+
+Usage:
+    python benchmarks/bench_cohort.py [--patients 50000] [--missing 0.05]
+
+Random values (plus every range bound, to exercise the closed-interval edges)
+are classified both ways; the run fails if any status or abnormal flag differs.
+"""
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lab_engine import load_lab_rules, NORMAL_STATUSES  # noqa: E402
+from lab_cohort import CohortLabClassifier  # noqa: E402
+
+
+def loop_classify(ranges, value):
+    """The status rule of MedicalReportAnalyzer.analyze_lab_values."""
+    status = 'unknown'
+    for min_val, max_val, range_status in ranges:
+        if min_val <= value <= max_val:
+            status = range_status
+            break
+    return status
+
+
+def cohort_columns(lab_ranges, patients, missing, seed=0):
+    rng = random.Random(seed)
+    columns = {}
+    for lab_name, lab_info in lab_ranges.items():
+        bounds = [b for min_val, max_val, _ in lab_info['ranges'] for b in (min_val, max_val) if b != float('inf')]
+        top = max(bounds) * 1.5 + 1
+        values = [round(rng.uniform(0, top), 1) for _ in range(patients - len(bounds))] + bounds
+        columns[lab_name] = [float('nan') if rng.random() < missing else v for v in values]
+    return columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, default=50000)
+    parser.add_argument('--missing', type=float, default=0.05, help='fraction of missing values')
+    args = parser.parse_args()
+
+    lab_ranges = load_lab_rules()
+    columns = cohort_columns(lab_ranges, args.patients, args.missing)
+    arrays = {lab_name: np.array(values) for lab_name, values in columns.items()}
+
+    start = time.perf_counter()
+    classifier = CohortLabClassifier(lab_ranges)
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    expected = {
+        lab_name: [loop_classify(lab_ranges[lab_name]['ranges'], value) for value in values]
+        for lab_name, values in columns.items()
+    }
+    loop_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    results = classifier.classify_columns(arrays)
+    vector_ms = (time.perf_counter() - start) * 1000
+
+    for lab_name, (codes, abnormal) in results.items():
+        statuses = [classifier.status_names[code] for code in codes]
+        flags = [status not in NORMAL_STATUSES for status in expected[lab_name]]
+        if statuses != expected[lab_name] or abnormal.tolist() != flags:
+            sys.exit(f"MISMATCH for {lab_name}")
+
+    values = args.patients * len(columns)
+    print(f"{args.patients} patients x {len(columns)} analytes = {values} values (identical results)")
+    print(f"Compile: {compile_ms:.2f} ms (once)")
+    print(f"Per-value loop: {loop_ms:9.1f} ms  ({values / loop_ms * 1000:,.0f} values/s)")
+    print(f"Vectorized:     {vector_ms:9.1f} ms  ({values / vector_ms * 1000:,.0f} values/s, "
+          f"{loop_ms / vector_ms:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
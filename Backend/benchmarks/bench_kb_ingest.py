@@ -0,0 +1,77 @@
+"""Compare full re-embedding with incremental knowledge-base ingestion.
+
+Usage:
+    python benchmarks/bench_kb_ingest.py [--data health.txt] [--edits 2]
+
+Needs the chatbot's embedding dependencies (langchain, chromadb,
+sentence-transformers). Works in a temporary Chroma directory: indexes the
+data file once, re-ingests it unchanged, then re-ingests it with ``--edits``
+paragraphs changed, and reports what each step embedded. The first step
+embeds every chunk, which is what every update used to cost.
+"""
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import knowledge_base  # noqa: E402
+
+
+def load_langchain():
+    try:
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        from langchain_community.vectorstores import Chroma
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+    except ImportError:
+        from langchain.embeddings import HuggingFaceEmbeddings
+        from langchain.vectorstores import Chroma
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+    return HuggingFaceEmbeddings, Chroma, RecursiveCharacterTextSplitter
+
+
+def edited(text, edits):
+    """``text`` with the first ``edits`` long paragraphs changed."""
+    paragraphs = text.split("\n\n")
+    changed = 0
+    for i, paragraph in enumerate(paragraphs):
+        if changed < edits and len(paragraph) > 200:
+            paragraphs[i] = paragraph + " (Reviewed.)"
+            changed += 1
+    return "\n\n".join(paragraphs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default=str(Path(__file__).resolve().parent.parent / 'health.txt'))
+    parser.add_argument('--edits', type=int, default=2, help='paragraphs changed for the incremental step')
+    parser.add_argument('--model', default='sentence-transformers/all-MiniLM-L6-v2')
+    args = parser.parse_args()
+
+    HuggingFaceEmbeddings, Chroma, RecursiveCharacterTextSplitter = load_langchain()
+    embeddings = HuggingFaceEmbeddings(model_name=args.model)
+    text = Path(args.data).read_text(encoding='utf-8')
+    workdir = Path(tempfile.mkdtemp(prefix='kb_bench_'))
+    try:
+        index = knowledge_base.KnowledgeBaseIndex(workdir / 'chroma', embeddings, Chroma,
+                                                  RecursiveCharacterTextSplitter)
+        store = None
+        steps = [("full build", text), ("unchanged", text), (f"{args.edits} paragraphs edited", edited(text, args.edits))]
+        for name, content in steps:
+            data_file = workdir / 'data.txt'
+            data_file.write_text(content, encoding='utf-8')
+            start = time.perf_counter()
+            store, summary = index.ingest(str(data_file), 'bench', store)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"{name:<22} {elapsed:8.0f} ms  chunks {summary['chunks']:4d}  embedded {summary['embedded']:4d}  "
+                  f"reused {summary['reused']:4d}  removed {summary['removed']:4d}")
+        print(f"Index version {summary['version']}, {store._collection.count()} chunks stored")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Benchmark per-patient lab trend appends and trend queries.
+
+Usage:
+    python benchmarks/bench_lab_trends.py [--patients 200] [--reports 300] [--queries 200]
+
+Each patient gets ``--reports`` reports spread over ten years with every
+analyte present, written through LabTrendStore.append into a temporary
+directory; trend queries then read back all analytes of random patients.
+"""
+import sys
+import time
+import random
+import hashlib
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lab_engine import load_lab_rules  # noqa: E402
+from lab_trends import LabTrendStore  # noqa: E402
+
+YEAR = 365.25 * 24 * 3600
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, default=200)
+    parser.add_argument('--reports', type=int, default=300, help='reports per patient')
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    lab_names = list(load_lab_rules())
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as root:
+        store = LabTrendStore(root)
+        start = time.perf_counter()
+        for patient in range(args.patients):
+            for report in range(args.reports):
+                values = {lab_name: round(rng.uniform(50, 150), 1) for lab_name in lab_names}
+                observed_at = 1.5e9 + rng.uniform(0, 10 * YEAR)
+                store.append(f"patient-{patient}", values, observed_at, hashlib.sha256(f"{patient}:{report}".encode()).hexdigest())
+        append_s = time.perf_counter() - start
+        reports = args.patients * args.reports
+
+        latencies = []
+        for _ in range(args.queries):
+            patient_id = f"patient-{rng.randrange(args.patients)}"
+            start = time.perf_counter()
+            trends = {lab_name: store.trend(patient_id, lab_name) for lab_name in store.labs(patient_id)}
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert all(trend['count'] == args.reports for trend in trends.values())
+
+    latencies.sort()
+    print(f"Appended {reports} reports x {len(lab_names)} analytes in {append_s:.1f}s "
+          f"({reports / append_s:,.0f} reports/s)")
+    print(f"Trend query, all {len(lab_names)} analytes of one patient with {args.reports} reports: "
+          f"mean {statistics.mean(latencies):.2f} ms  p50 {latencies[len(latencies) // 2]:.2f} ms  "
+          f"p95 {latencies[int(len(latencies) * 0.95)]:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""Measure event-loop blocking and throughput of chatbot LLM calls against the local stub.
+
+Usage:
+    python benchmarks/bench_llm_client.py [--requests 32] [--latency-ms 300] [--fail-rate 0.1]
+    python benchmarks/bench_llm_client.py --stream [--first-token-ms 200] [--token-ms 20]
+
+Starts llm_stub.py on a local port, then issues concurrent completions from
+one event loop, first with the old blocking ``requests.post`` call and then
+with AsyncLLMClient. A 10 ms ticker runs alongside; its worst delay is how
+long every other user of the loop would have been frozen.
+
+With --stream, compares the time until a user sees the first words of the
+answer: a buffered completion versus ``stream_chat_completion``.
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_stub(port):
+    import uvicorn
+    import llm_stub
+    server = uvicorn.Server(uvicorn.Config(llm_stub.app, host='127.0.0.1', port=port, log_level='warning'))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def ticker(stop, lags):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append((time.perf_counter() - start) * 1000 - 10)
+
+
+async def run(name, call, count):
+    stop, lags = asyncio.Event(), []
+    tick = asyncio.create_task(ticker(stop, lags))
+    start = time.perf_counter()
+    results = await asyncio.gather(*(call(i) for i in range(count)), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick
+    failed = sum(1 for r in results if isinstance(r, Exception))
+    print(f"{name:<22} {elapsed:7.2f} s  {count / elapsed:7.1f} req/s  "
+          f"worst loop stall {max(lags, default=0):8.1f} ms  {failed} failed")
+
+
+async def main_async(args, url):
+    import requests
+    import llm_client
+
+    messages = [{"role": "user", "content": "I have a headache and a mild fever"}]
+    payload = {"model": "stub", "messages": messages}
+
+    async def blocking_call(i):
+        # What chatbot.generate_medical_response did before: a blocking call inside async def
+        response = requests.post(url, json=payload, timeout=30)
+        response.raise_for_status()
+        return response.json()
+
+    client = llm_client.AsyncLLMClient(url=url, api_key=None, max_in_flight=args.max_in_flight,
+                                       backoff_base=0.05)
+    client.start()
+
+    async def async_call(i):
+        return await client.chat_completion(messages, model="stub")
+
+    await run("blocking requests.post", blocking_call, args.requests)
+    await run("AsyncLLMClient", async_call, args.requests)
+    print(f"Client stats: {client.stats}")
+    await client.aclose()
+
+
+async def stream_async(args, url):
+    import llm_client
+
+    messages = [{"role": "user", "content": "I have a headache and a mild fever"}]
+    client = llm_client.AsyncLLMClient(url=url, api_key=None, max_in_flight=args.max_in_flight,
+                                       backoff_base=0.05)
+    client.start()
+
+    async def buffered(i):
+        start = time.perf_counter()
+        await client.chat_completion(messages, model="stub")
+        elapsed = time.perf_counter() - start
+        return elapsed, elapsed
+
+    async def streamed(i):
+        start = time.perf_counter()
+        first = None
+        async for _ in client.stream_chat_completion(messages, model="stub"):
+            if first is None:
+                first = time.perf_counter() - start
+        return first, time.perf_counter() - start
+
+    for name, call in (("buffered", buffered), ("streamed", streamed)):
+        results = await asyncio.gather(*(call(i) for i in range(args.requests)), return_exceptions=True)
+        timings = sorted(r for r in results if not isinstance(r, Exception))
+        failed = len(results) - len(timings)
+        if not timings:
+            print(f"{name:<10} all {failed} failed")
+            continue
+        first = sorted(t[0] for t in timings)
+        total = sorted(t[1] for t in timings)
+        print(f"{name:<10} first text p50 {first[len(first) // 2] * 1000:7.0f} ms  "
+              f"p95 {first[int(len(first) * 0.95)] * 1000:7.0f} ms  "
+              f"complete p50 {total[len(total) // 2] * 1000:7.0f} ms  {failed} failed")
+    print(f"Client stats: {client.stats}")
+    await client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=32)
+    parser.add_argument('--latency-ms', type=float, default=300)
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='fraction of stub replies that are 429/503')
+    parser.add_argument('--max-in-flight', type=int, default=8)
+    parser.add_argument('--stream', action='store_true', help='measure time to first token instead')
+    parser.add_argument('--first-token-ms', type=float, default=200)
+    parser.add_argument('--token-ms', type=float, default=20)
+    args = parser.parse_args()
+
+    os.environ['STUB_LATENCY_MS'] = str(args.latency_ms)
+    os.environ['STUB_FAIL_RATE'] = str(args.fail_rate)
+    os.environ['STUB_FIRST_TOKEN_MS'] = str(args.first_token_ms)
+    os.environ['STUB_TOKEN_MS'] = str(args.token_ms)
+    port = free_port()
+    server = start_stub(port)
+    try:
+        url = f"http://127.0.0.1:{port}/v1/chat/completions"
+        asyncio.run(stream_async(args, url) if args.stream else main_async(args, url))
+    finally:
+        server.should_exit = True
+
+
+if __name__ == '__main__':
+    main()
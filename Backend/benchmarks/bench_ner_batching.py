@@ -0,0 +1,88 @@
+"""Measure NER throughput (chunks/sec) at different batch sizes.
+
+Usage:
+    python benchmarks/bench_ner_batching.py [--batch-sizes 1 2 4 8 16 32] [--chunks 64]
+    python benchmarks/bench_ner_batching.py --concurrency 16 --max-wait-ms 5
+
+The first table runs the pipeline directly on fixed-size batches. The second
+sends ``--concurrency`` simultaneous reports through NERMicroBatcher to show
+the batch sizes it actually forms and the resulting throughput.
+"""
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ner_batcher import NERMicroBatcher, chunk_text, NER_CHUNK_CHARS  # noqa: E402
+
+SAMPLE_REPORT = (
+    "Patient presents with type 2 diabetes mellitus and hypertension. Fasting glucose 142 mg/dL, "
+    "HbA1c 7.8 %. Started on metformin 500 mg twice daily and lisinopril 10 mg. "
+    "Chest X-ray shows mild cardiomegaly without pleural effusion. Creatinine 1.4 mg/dL suggests "
+    "early chronic kidney disease; advised nephrology follow-up and repeat lipid panel. "
+)
+
+
+def build_chunks(count, chunk_chars):
+    text = SAMPLE_REPORT * (count * chunk_chars // len(SAMPLE_REPORT) + 1)
+    return [chunk for _, chunk in chunk_text(text, chunk_chars)][:count]
+
+
+def bench_direct(pipeline, chunks, batch_size):
+    start = time.perf_counter()
+    for i in range(0, len(chunks), batch_size):
+        pipeline(chunks[i:i + batch_size], batch_size=batch_size)
+    return len(chunks) / (time.perf_counter() - start)
+
+
+async def bench_batcher(pipeline, report, concurrency, max_batch, max_wait_ms, chunk_chars):
+    batcher = NERMicroBatcher(lambda: pipeline, max_batch=max_batch,
+                              max_wait_ms=max_wait_ms, chunk_chars=chunk_chars)
+    start = time.perf_counter()
+    await asyncio.gather(*(batcher.extract(report) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    batcher.shutdown()
+    stats = batcher.snapshot()
+    return stats['chunks'] / elapsed, stats['avg_batch_size'], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default="d4data/biomedical-ner-all")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--chunks', type=int, default=64, help='chunks per direct measurement')
+    parser.add_argument('--chunk-chars', type=int, default=NER_CHUNK_CHARS)
+    parser.add_argument('--concurrency', type=int, default=16, help='simultaneous reports for the batcher run')
+    parser.add_argument('--report-chunks', type=int, default=3, help='chunks per simulated report')
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    args = parser.parse_args()
+
+    from transformers import pipeline
+    ner = pipeline("ner", model=args.model, aggregation_strategy="simple", device=-1)
+
+    chunks = build_chunks(args.chunks, args.chunk_chars)
+    ner(chunks[:2], batch_size=2)  # warm-up
+
+    print(f"Direct pipeline, {len(chunks)} chunks of ~{args.chunk_chars} chars")
+    baseline = None
+    for batch_size in args.batch_sizes:
+        throughput = bench_direct(ner, chunks, batch_size)
+        baseline = baseline or throughput
+        print(f"  batch {batch_size:>3}: {throughput:8.1f} chunks/s  ({throughput / baseline:.2f}x)")
+
+    report = " ".join(build_chunks(args.report_chunks, args.chunk_chars))
+    print(f"\nMicro-batcher, {args.concurrency} concurrent reports x {args.report_chunks} chunks, "
+          f"max wait {args.max_wait_ms} ms")
+    for max_batch in args.batch_sizes:
+        throughput, avg_batch, elapsed = asyncio.run(bench_batcher(
+            ner, report, args.concurrency, max_batch, args.max_wait_ms, args.chunk_chars
+        ))
+        print(f"  max batch {max_batch:>3}: {throughput:8.1f} chunks/s  "
+              f"avg batch {avg_batch:5.2f}  total {elapsed * 1000:7.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Compare the pytesseract and tesserocr OCR backends on the same corpus.
+
+Usage:
+    python benchmarks/bench_ocr_engines.py [--samples 5] [--configs "--psm 6" "--psm 4"]
+    python benchmarks/bench_ocr_engines.py --images scan1.png scan2.jpg
+
+Every image is preprocessed once (as in production) and then OCRed by each
+backend with each config. CPU time includes the tesseract child processes
+pytesseract spawns, so the process-spawn overhead shows up in the numbers.
+"""
+import os
+import sys
+import time
+import difflib
+import argparse
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import ocr_engine  # noqa: E402
+import image_preprocess  # noqa: E402
+from ocr_pool import PSM_CONFIGS  # noqa: E402
+from bench_preprocess import synthetic_photo  # noqa: E402
+
+
+def cpu_seconds():
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def run_backend(engine, images, configs, repeat):
+    texts = {}
+    start_wall, start_cpu = time.perf_counter(), cpu_seconds()
+    for _ in range(repeat):
+        for name, image in images:
+            for config in configs:
+                texts[(name, config)] = engine.image_to_string(image, config=config)
+    calls = repeat * len(images) * len(configs)
+    wall_ms = (time.perf_counter() - start_wall) * 1000 / calls
+    cpu_ms = (cpu_seconds() - start_cpu) * 1000 / calls
+    return wall_ms, cpu_ms, texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--images', nargs='+', help='report images instead of synthetic photos')
+    parser.add_argument('--samples', type=int, default=5)
+    parser.add_argument('--configs', nargs='+', default=PSM_CONFIGS)
+    parser.add_argument('--repeat', type=int, default=2)
+    args = parser.parse_args()
+
+    if args.images:
+        raw = [(Path(path).name, Image.open(path).convert('L')) for path in args.images]
+    else:
+        raw = [(f"synthetic-{seed}", synthetic_photo(seed, 4.0, 12.0)[0]) for seed in range(args.samples)]
+    images = [(name, image_preprocess.preprocess(image)[0]) for name, image in raw]
+
+    backends = []
+    for requested in ('pytesseract', 'tesserocr'):
+        start = time.perf_counter()
+        engine = ocr_engine.create_engine(requested)
+        init_ms = (time.perf_counter() - start) * 1000
+        if engine.name != requested:
+            print(f"{requested}: not available, skipped")
+            continue
+        # First call per config initializes the tesserocr handles; keep it out of the timings
+        for config in args.configs:
+            engine.image_to_string(images[0][1], config=config)
+        backends.append((engine, init_ms))
+
+    print(f"{len(images)} images x {len(args.configs)} configs x {args.repeat} repeats")
+    results = {}
+    for engine, init_ms in backends:
+        wall_ms, cpu_ms, texts = run_backend(engine, images, args.configs, args.repeat)
+        results[engine.name] = (wall_ms, cpu_ms, texts)
+        print(f"{engine.name:<12} init {init_ms:7.1f} ms  {wall_ms:8.1f} ms/call wall  {cpu_ms:8.1f} ms/call CPU")
+
+    if len(results) == 2:
+        base_wall, base_cpu, base_texts = results['pytesseract']
+        wall_ms, cpu_ms, texts = results['tesserocr']
+        similarity = [
+            difflib.SequenceMatcher(None, base_texts[key], texts[key]).ratio() for key in base_texts
+        ]
+        print(f"tesserocr speedup: {base_wall / wall_ms:.2f}x wall, {base_cpu / cpu_ms:.2f}x CPU")
+        print(f"Text similarity between backends: min {min(similarity):.3f}, "
+              f"mean {sum(similarity) / len(similarity):.3f}")
+
+
+if __name__ == '__main__':
+    main()
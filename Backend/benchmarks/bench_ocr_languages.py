@@ -0,0 +1,85 @@
+"""Measure script/orientation routing against OCR with every configured language pack.
+
+Usage:
+    python benchmarks/bench_ocr_languages.py --languages eng+hin+ben+tam --images hindi1.png english1.png
+    python benchmarks/bench_ocr_languages.py --languages eng+hin --samples 6 --rotate
+
+For every page the detection pass picks the traineddata and orientation, then
+the page is OCRed once with the routed languages and once with all languages
+(the behaviour without routing: no orientation fix either). Without
+``--images`` the synthetic English corpus pages are used; ``--rotate`` turns
+every other one by 90/180/270 degrees to exercise the orientation fix.
+"""
+import sys
+import time
+import difflib
+import argparse
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import ocr_engine  # noqa: E402
+import ocr_languages  # noqa: E402
+import image_preprocess  # noqa: E402
+from bench_preprocess import synthetic_photo  # noqa: E402
+
+
+def timed_ocr(engine, image, lang):
+    start = time.perf_counter()
+    text = engine.image_to_string(image, lang=lang)
+    return text, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--images', nargs='+', help='report images instead of synthetic pages')
+    parser.add_argument('--samples', type=int, default=6)
+    parser.add_argument('--languages', default=ocr_languages.OCR_LANGUAGES,
+                        help="'+'-separated traineddata to route between")
+    parser.add_argument('--rotate', action='store_true', help='rotate every other synthetic page')
+    args = parser.parse_args()
+    ocr_languages.OCR_LANGUAGES = args.languages
+
+    if args.images:
+        raw = [(Path(path).name, Image.open(path).convert('L')) for path in args.images]
+    else:
+        raw = []
+        for seed in range(args.samples):
+            image = synthetic_photo(seed, 2.0, 8.0)[0]
+            if args.rotate and seed % 2:
+                image = image.rotate(90 * (seed // 2 % 3 + 1), expand=True, fillcolor=255)
+            raw.append((f"synthetic-{seed}", image))
+    pages = [(name, image_preprocess.preprocess(image)[0]) for name, image in raw]
+
+    engine = ocr_engine.get_engine()
+    # Load the all-languages and routed traineddata before timing anything
+    engine.image_to_string(pages[0][1], lang=args.languages)
+
+    print(f"Engine {engine.name}, routing between {args.languages}\n")
+    print(f"{'page':<20} {'script':<11} {'lang':<10} {'rot':>4} {'osd':>8} {'routed':>9} "
+          f"{'all langs':>10} {'saved':>9} {'same text':>9}")
+    totals = {'osd': 0.0, 'routed': 0.0, 'all': 0.0}
+    for name, image in pages:
+        language = ocr_languages.route_page(image)
+        upright = ocr_languages.upright(image, language)
+        routed_text, routed_ms = timed_ocr(engine, upright, language['lang'])
+        all_text, all_ms = timed_ocr(engine, image, args.languages)
+        saved_ms = all_ms - routed_ms - language['osd_ms']
+        similarity = difflib.SequenceMatcher(None, routed_text, all_text).ratio()
+        totals['osd'] += language['osd_ms']
+        totals['routed'] += routed_ms
+        totals['all'] += all_ms
+        print(f"{name:<20} {language.get('script', '-'):<11} {language['lang']:<10} {language['rotate']:>4} "
+              f"{language['osd_ms']:7.1f}ms {routed_ms:7.1f}ms {all_ms:8.1f}ms {saved_ms:7.1f}ms {similarity:9.2f}")
+
+    routed_total = totals['osd'] + totals['routed']
+    print(f"\nTotal: routing {routed_total:.0f} ms (detection {totals['osd']:.0f} ms) vs "
+          f"all languages {totals['all']:.0f} ms, saved {totals['all'] - routed_total:.0f} ms "
+          f"({(totals['all'] - routed_total) / totals['all'] * 100:.0f}%)")
+
+
+if __name__ == '__main__':
+    main()
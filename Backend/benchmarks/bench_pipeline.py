@@ -0,0 +1,243 @@
+"""Time every stage of the report pipeline on a synthetic corpus and score extraction accuracy.
+
+Usage:
+    python benchmarks/corpus.py --out corpus/ --reports 20
+    python benchmarks/bench_pipeline.py corpus/ --out results.json [--end-to-end]
+    python benchmarks/bench_pipeline.py corpus/ --out new.json --compare results.json
+
+Stages: upload (bytes to temp file), rasterize (decode image / render PDF
+pages), image_preprocess, ocr, preprocess_text, extract_lab_values and
+analyze_lab_values. OCR uses the production path for each format: the pooled
+``run_ocr`` for images and one engine pass per page for PDFs. Results are
+written as JSON with the run configuration so runs can be compared.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import platform
+import argparse
+import tempfile
+import subprocess
+import statistics
+from datetime import datetime
+from contextlib import contextmanager
+from pathlib import Path
+
+# Measure the rule-based pipeline only: no transformer models, no result cache
+os.environ.setdefault("MODEL_LOADING", "off")
+os.environ.setdefault("CACHE_ENABLED", "false")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pdf2image  # noqa: E402
+from PIL import Image  # noqa: E402
+
+import app  # noqa: E402
+import ocr_pool  # noqa: E402
+import ocr_engine  # noqa: E402
+import image_preprocess  # noqa: E402
+
+STAGES = ['upload', 'rasterize', 'image_preprocess', 'ocr',
+          'preprocess_text', 'extract_lab_values', 'analyze_lab_values']
+
+
+class StageTimer:
+    """Accumulates wall time per stage name."""
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def __call__(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[stage] = self.timings.get(stage, 0.0) + (time.perf_counter() - start) * 1000
+
+
+def score(found, statuses, report):
+    """Compare extracted values and statuses with the corpus ground truth."""
+    expected = report['labs']
+    correct = [name for name, value in expected.items()
+               if name in found and abs(found[name] - value) < 1e-6]
+    status_correct = [name for name in correct if statuses.get(name) == report['statuses'][name]]
+    return {
+        'expected': len(expected),
+        'extracted': len(found),
+        'correct': len(correct),
+        'status_correct': len(status_correct),
+        'wrong_values': {name: found[name] for name in expected if name in found and name not in correct},
+        'missing': [name for name in expected if name not in found],
+    }
+
+
+async def run_file(path, report, analyzer):
+    timer = StageTimer()
+    content = path.read_bytes()
+
+    with timer('upload'):
+        with tempfile.NamedTemporaryFile(delete=False, suffix=path.suffix) as temp_file:
+            temp_file.write(content)
+            temp_path = temp_file.name
+    try:
+        with timer('rasterize'):
+            if path.suffix.lower() == '.pdf':
+                pages = pdf2image.convert_from_path(temp_path, dpi=app.PDF_DPI, grayscale=True)
+            else:
+                pages = [Image.open(temp_path).convert('L')]
+
+        with timer('image_preprocess'):
+            if path.suffix.lower() == '.pdf':
+                pages = [ocr_pool.preprocess_pdf_page(page, app.PDF_DPI)[0] for page in pages]
+            else:
+                pages = [image_preprocess.preprocess(page)[0] for page in pages]
+
+        with timer('ocr'):
+            if path.suffix.lower() == '.pdf':
+                engine = ocr_engine.get_engine()
+                text = "".join(f"\n--- Page {n} ---\n{engine.image_to_string(page)}\n"
+                               for n, page in enumerate(pages, 1))
+            else:
+                text, _ = await ocr_pool.run_ocr(pages[0])
+    finally:
+        os.unlink(temp_path)
+
+    with timer('preprocess_text'):
+        cleaned = analyzer.preprocess_text(text)
+    with timer('extract_lab_values'):
+        found = analyzer.extract_lab_values(cleaned)
+    with timer('analyze_lab_values'):
+        _, details = analyzer.analyze_lab_values(found)
+
+    result = {
+        'file': report['file'],
+        'format': report['format'],
+        'pages': len(pages),
+        'chars': len(text),
+        'stages_ms': {stage: round(timer.timings.get(stage, 0.0), 3) for stage in STAGES},
+        'accuracy': score(found, {name: detail.status for name, detail in details.items()}, report),
+    }
+    result['total_ms'] = round(sum(result['stages_ms'].values()), 3)
+    return result, content
+
+
+def summarize(files, end_to_end):
+    def stats(values):
+        values = sorted(values)
+        return {
+            'mean_ms': round(statistics.mean(values), 3),
+            'p50_ms': round(values[len(values) // 2], 3),
+            'p95_ms': round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+            'total_ms': round(sum(values), 3),
+        }
+
+    stages = {stage: stats([f['stages_ms'][stage] for f in files]) for stage in STAGES}
+    stages['total'] = stats([f['total_ms'] for f in files])
+    if end_to_end:
+        stages['end_to_end'] = stats(end_to_end)
+
+    totals = {key: sum(f['accuracy'][key] for f in files)
+              for key in ('expected', 'extracted', 'correct', 'status_correct')}
+    accuracy = {
+        'recall': round(totals['correct'] / totals['expected'], 4) if totals['expected'] else None,
+        'precision': round(totals['correct'] / totals['extracted'], 4) if totals['extracted'] else None,
+        'status_accuracy': round(totals['status_correct'] / totals['expected'], 4) if totals['expected'] else None,
+        'perfect_reports': sum(1 for f in files if f['accuracy']['correct'] == f['accuracy']['expected']),
+        **totals,
+    }
+    return stages, accuracy
+
+
+def run_metadata(corpus_dir, manifest):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, cwd=Path(__file__).parent).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'corpus': str(corpus_dir),
+        'corpus_generator': manifest.get('generator'),
+        'config': {
+            'ocr_engine': ocr_engine.resolve_backend(),
+            'ocr_mode': ocr_pool.OCR_MODE,
+            'ocr_pool_workers': ocr_pool.OCR_POOL_WORKERS,
+            'ocr_preprocess': image_preprocess.OCR_PREPROCESS,
+            'ocr_preprocess_steps': image_preprocess.OCR_PREPROCESS_STEPS,
+            'pdf_dpi': app.PDF_DPI,
+            'rules_version': app.analyzer.rules_version,
+        },
+    }
+
+
+def print_comparison(stages, accuracy, previous):
+    print(f"\nCompared with {previous['run'].get('timestamp')} ({previous['run'].get('git_commit')}):")
+    for stage, current in stages.items():
+        before = previous['stages'].get(stage)
+        if not before or not before['mean_ms']:
+            continue
+        change = (current['mean_ms'] - before['mean_ms']) / before['mean_ms'] * 100
+        print(f"  {stage:<20} {before['mean_ms']:10.2f} -> {current['mean_ms']:10.2f} ms  ({change:+.1f}%)")
+    for key in ('recall', 'precision', 'status_accuracy'):
+        before = previous['accuracy'].get(key)
+        if before is not None and accuracy[key] is not None:
+            print(f"  {key:<20} {before:10.4f} -> {accuracy[key]:10.4f}")
+
+
+async def main_async(args):
+    corpus_dir = Path(args.corpus)
+    manifest = json.loads((corpus_dir / 'manifest.json').read_text())
+    reports = manifest['reports'][:args.limit] if args.limit else manifest['reports']
+    analyzer = app.analyzer
+
+    files, end_to_end = [], []
+    for report in reports:
+        result, content = await run_file(corpus_dir / report['file'], report, analyzer)
+        files.append(result)
+        if args.end_to_end:
+            start = time.perf_counter()
+            await app.analyze_content(report['file'], content)
+            result['end_to_end_ms'] = round((time.perf_counter() - start) * 1000, 3)
+            end_to_end.append(result['end_to_end_ms'])
+        accuracy = result['accuracy']
+        print(f"{report['file']:<18} {result['total_ms']:9.1f} ms  "
+              f"labs {accuracy['correct']}/{accuracy['expected']}")
+
+    stages, accuracy = summarize(files, end_to_end)
+    print(f"\n{'stage':<20} {'mean':>10} {'p50':>10} {'p95':>10}  (ms)")
+    for stage, stats in stages.items():
+        print(f"{stage:<20} {stats['mean_ms']:10.2f} {stats['p50_ms']:10.2f} {stats['p95_ms']:10.2f}")
+    print(f"\nRecall {accuracy['recall']}  precision {accuracy['precision']}  "
+          f"status accuracy {accuracy['status_accuracy']}  "
+          f"perfect reports {accuracy['perfect_reports']}/{len(files)}")
+
+    output = {'run': run_metadata(corpus_dir, manifest), 'stages': stages, 'accuracy': accuracy, 'files': files}
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(output, f, indent=2)
+        print(f"Results written to {args.out}")
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(stages, accuracy, json.load(f))
+    ocr_pool.shutdown_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('corpus', help='directory written by benchmarks/corpus.py')
+    parser.add_argument('--out', help='write results JSON here')
+    parser.add_argument('--compare', help='previous results JSON to compare against')
+    parser.add_argument('--limit', type=int, help='only use the first N corpus files')
+    parser.add_argument('--end-to-end', action='store_true', help='also time analyze_content on each file')
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Benchmark OCR time and lab-value recall with and without image preprocessing.
+
+Usage:
+    python benchmarks/bench_preprocess.py [--samples 5] [--skew 4] [--megapixels 12]
+    python benchmarks/bench_preprocess.py --images scan1.jpg scan2.png
+
+Without ``--images`` synthetic phone photos of corpus reports are generated
+(upscaled, skewed, on a dark background, with a shadow and sensor noise).
+Real images can be scored by placing a ``<image>.labs.json`` file with the
+expected ``{"lab_name": value}`` next to each one.
+"""
+import re
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import pytesseract
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import image_preprocess  # noqa: E402
+from lab_engine import load_lab_rules, LabExtractionEngine  # noqa: E402
+import corpus  # noqa: E402
+
+
+def synthetic_photo(seed, skew, megapixels):
+    """A one-page corpus report degraded like a phone photo; returns (image, expected_labs)."""
+    width, height = (int(inches * 300) for inches in corpus.PAGE_INCHES)
+    # The photo framing adds roughly 30% around the page
+    scale = (megapixels * 1e6 / (width * height * 1.3)) ** 0.5
+    images, values, _ = corpus.generate_report(seed, load_lab_rules(), pages=1, dpi=300, noise=8,
+                                               skew=skew, photo=True, scale=scale)
+    return images[0], values
+
+
+def load_images(paths):
+    for path in paths:
+        sidecar = Path(f"{path}.labs.json")
+        expected = json.loads(sidecar.read_text()) if sidecar.exists() else None
+        yield Path(path).name, Image.open(path).convert('L'), expected
+
+
+def recall(found, expected):
+    if not expected:
+        return None
+    hits = sum(
+        1 for name, value in expected.items()
+        if name in found and abs(found[name] - value) <= max(0.051, abs(value) * 0.01)
+    )
+    return hits / len(expected)
+
+
+def run_case(image, preprocess, engine):
+    prep_ms = 0.0
+    if preprocess:
+        start = time.perf_counter()
+        image, _ = image_preprocess.preprocess(image)
+        prep_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    text = pytesseract.image_to_string(image, config='--psm 6')
+    ocr_ms = (time.perf_counter() - start) * 1000
+    return prep_ms, ocr_ms, engine.extract(re.sub(r'\s+', ' ', text)), image.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--images', nargs='+', help='real report images instead of synthetic photos')
+    parser.add_argument('--samples', type=int, default=5)
+    parser.add_argument('--skew', type=float, default=4.0, help='maximum synthetic skew in degrees')
+    parser.add_argument('--megapixels', type=float, default=12.0)
+    parser.add_argument('--json', dest='json_path', help='write per-image results to this file')
+    args = parser.parse_args()
+
+    if not image_preprocess._load_cv2():
+        sys.exit("OpenCV is required for this benchmark (pip install opencv-python-headless)")
+
+    engine = LabExtractionEngine(load_lab_rules())
+    if args.images:
+        cases = load_images(args.images)
+    else:
+        cases = ((f"synthetic-{seed}", *synthetic_photo(seed, args.skew, args.megapixels))
+                 for seed in range(args.samples))
+
+    rows = []
+    for name, image, expected in cases:
+        for preprocess in (False, True):
+            prep_ms, ocr_ms, found, size = run_case(image, preprocess, engine)
+            rows.append({
+                'image': name, 'preprocess': preprocess, 'size': list(size),
+                'preprocess_ms': round(prep_ms, 1), 'ocr_ms': round(ocr_ms, 1),
+                'labs_found': len(found), 'recall': recall(found, expected)
+            })
+            row = rows[-1]
+            score = f"{row['recall']:.2f}" if row['recall'] is not None else "  - "
+            print(f"{name:<16} {'preprocessed' if preprocess else 'raw':<12} {size[0]:>5}x{size[1]:<5} "
+                  f"prep {prep_ms:7.0f} ms  ocr {ocr_ms:7.0f} ms  labs {len(found):>2}  recall {score}")
+
+    print()
+    for preprocess in (False, True):
+        subset = [r for r in rows if r['preprocess'] == preprocess]
+        scored = [r['recall'] for r in subset if r['recall'] is not None]
+        total_ms = sum(r['preprocess_ms'] + r['ocr_ms'] for r in subset) / len(subset)
+        mean_recall = f"{sum(scored) / len(scored):.2f}" if scored else "n/a"
+        print(f"{'preprocessed' if preprocess else 'raw':<12} mean total {total_ms:7.0f} ms/image  "
+              f"mean recall {mean_recall}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Measure lookup cost and hit rate of the chatbot's semantic response cache.
+
+Usage:
+    python benchmarks/bench_response_cache.py [--entries 2000] [--questions 200] [--queries 5000]
+    python benchmarks/bench_response_cache.py --model   # similarities with the real embedding model
+
+Synthetic mode fills the cache to capacity with random 384-dimensional
+embeddings (the size all-MiniLM-L6-v2 produces), then replays a Zipf-skewed
+stream of paraphrases (the question embedding plus noise) and reports lookup
+latency, hit rate and the LLM calls that would have been saved.
+
+With --model, embeds pairs of rephrased and merely related questions with the
+chatbot's embedding model and prints their cosine similarity next to the
+threshold, for tuning RESPONSE_CACHE_THRESHOLD.
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import response_cache  # noqa: E402
+
+DIMENSIONS = 384
+
+# (question, rephrasing that should hit, related question that must not)
+QUESTION_PAIRS = [
+    ("What are the symptoms of diabetes?", "diabetes symptoms?", "What are the symptoms of hypothyroidism?"),
+    ("What are the symptoms of type 1 diabetes?", "type 1 diabetes signs", "What are the symptoms of type 2 diabetes?"),
+    ("How do I treat a migraine at home?", "home remedies for migraine", "How do I treat a tension headache at home?"),
+    ("Is chest pain after exercise dangerous?", "chest pain when working out, should I worry?",
+     "Is leg pain after exercise dangerous?"),
+    ("What is a normal blood pressure for adults?", "normal adult blood pressure range",
+     "What is a normal blood pressure for children?"),
+]
+
+
+def noisy(rng, vector, noise):
+    out = vector + rng.normal(scale=noise / np.sqrt(DIMENSIONS), size=DIMENSIONS)
+    return out / np.linalg.norm(out)
+
+
+def synthetic(args):
+    rng = np.random.default_rng(0)
+    cache = response_cache.SemanticResponseCache(threshold=args.threshold, max_entries=args.entries)
+    answer = {"text_response": "x" * 3000, "english_response": "x" * 3000, "audio_file_path": None}
+
+    cache.lookup(rng.normal(size=DIMENSIONS), 'en', 'v1')
+    start = time.perf_counter()
+    for _ in range(args.entries):
+        cache.put(rng.normal(size=DIMENSIONS), 'en', 'v1', answer)
+    fill_ms = (time.perf_counter() - start) * 1000
+    stats = cache.stats()
+    print(f"Filled {stats['entries']} entries in {fill_ms:.0f} ms, {stats['bytes'] / (1024 * 1024):.1f} MB")
+
+    # Popular questions asked again and again in different words
+    questions = [noisy(rng, np.zeros(DIMENSIONS), 1.0) for _ in range(args.questions)]
+    weights = 1 / np.arange(1, args.questions + 1)
+    weights /= weights.sum()
+    asked = rng.choice(args.questions, size=args.queries, p=weights)
+    timings = []
+    for index in asked:
+        query = noisy(rng, questions[index], args.noise)
+        start = time.perf_counter()
+        hit = cache.lookup(query, 'en', 'v1')
+        timings.append((time.perf_counter() - start) * 1000)
+        if hit is None:
+            cache.put(query, 'en', 'v1', answer)
+    timings.sort()
+    stats = cache.stats()
+    print(f"{args.queries} lookups: p50 {timings[len(timings) // 2]:.3f} ms  "
+          f"p99 {timings[int(len(timings) * 0.99)]:.3f} ms")
+    print(f"Hit rate {stats['hit_rate']:.1%} (mean similarity {stats['mean_hit_similarity']}): "
+          f"{stats['hits']} of {args.queries} LLM calls saved, {stats['lru_evictions']} LRU evictions")
+
+
+def model_similarities(threshold):
+    sys.argv = sys.argv[:1]
+    from chatbot import embed_query
+    print(f"threshold {threshold}")
+    for question, rephrased, related in QUESTION_PAIRS:
+        base = np.asarray(embed_query(question))
+        for label, other in (("rephrased", rephrased), ("related", related)):
+            vector = np.asarray(embed_query(other))
+            similarity = float(base @ vector / (np.linalg.norm(base) * np.linalg.norm(vector)))
+            expected_hit = label == "rephrased"
+            flag = "" if (similarity >= threshold) == expected_hit else "  <-- wrong side of threshold"
+            print(f"  {similarity:.3f}  {label:<9} {question!r} vs {other!r}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=response_cache.RESPONSE_CACHE_MAX_ENTRIES)
+    parser.add_argument('--questions', type=int, default=200, help='distinct popular questions')
+    parser.add_argument('--queries', type=int, default=5000)
+    parser.add_argument('--noise', type=float, default=0.3, help='how far paraphrases drift from the question')
+    parser.add_argument('--threshold', type=float, default=response_cache.RESPONSE_CACHE_THRESHOLD)
+    parser.add_argument('--model', action='store_true', help='use the real embedding model (needs chatbot deps)')
+    args = parser.parse_args()
+
+    if args.model:
+        model_similarities(args.threshold)
+    else:
+        synthetic(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""Generate synthetic lab reports with known ground-truth values.
+
+Usage:
+    python benchmarks/corpus.py --out corpus/ [--reports 20] [--formats png pdf]
+        [--pages 2] [--dpi 200] [--noise 6] [--skew 2] [--photo]
+
+Every report contains a value for every analyte in the lab rules, written in
+one of the forms the rule patterns accept. Values are spread over all
+reference ranges, so normal and abnormal statuses both occur. Images are
+rendered at ``--dpi``, optionally degraded (sensor noise, rotation, phone
+photo framing with a shadow), and saved as PNG (one page) or raster-only
+multi-page PDF. ``manifest.json`` records the ground truth of every file.
+"""
+import re
+import sys
+import json
+import random
+import argparse
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lab_engine import load_lab_rules, LabExtractionEngine  # noqa: E402
+
+PAGE_INCHES = (8.27, 11.69)  # A4
+# Analytes reported together on one line; the first pattern of each member must accept it
+COMBINED_LINES = {
+    ('blood_pressure_systolic', 'blood_pressure_diastolic'): "Blood pressure {blood_pressure_systolic}/{blood_pressure_diastolic} mmHg",
+}
+# Display names and units for the shipped analytes; other analytes use their pattern text
+LAB_LINES = {
+    'glucose': ["Fasting glucose {value} mg/dL", "Blood sugar {value} mg/dL", "FBS:{value} mg/dL"],
+    # "Glycated hemoglobin <n>" is left out: the hemoglobin rule would read it as hemoglobin
+    'hba1c': ["HbA1c {value} %", "Hemoglobin A1c:{value} %"],
+    'cholesterol_total': ["Total cholesterol {value} mg/dL", "Total Cholesterol:{value} mg/dL"],
+    'ldl': ["LDL {value} mg/dL", "LDL:{value} mg/dL", "Low density lipoprotein {value} mg/dL"],
+    'hdl': ["HDL {value} mg/dL", "HDL:{value} mg/dL", "High density lipoprotein {value} mg/dL"],
+    'hemoglobin': ["Hemoglobin {value} g/dL", "Hgb:{value} g/dL", "HB {value} g/dL"],
+    'creatinine': ["Creatinine {value} mg/dL", "Creatinine:{value} mg/dL"],
+}
+HEADER_LINES = [
+    "CITY DIAGNOSTIC LABORATORY",
+    "Patient: Jane Roe    Age: 54    Sex: F",
+    "Date: 2024-03-{day:02d}    Sample: Venous blood",
+    "",
+    "TEST                          RESULT",
+]
+FILLER_LINES = [
+    "Reference intervals are provided for adults and may vary by method.",
+    "Specimen received in good condition and processed within 2 hours.",
+    "Comments: correlate clinically, repeat testing advised if indicated.",
+    "Method: enzymatic colorimetric assay on automated analyzer.",
+]
+
+
+def _font(size):
+    for name in ("DejaVuSans.ttf", "Arial.ttf", "LiberationSans-Regular.ttf"):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+def _pattern_label(pattern):
+    """Readable label from the literal start of a rule pattern, e.g. ``total\\s+cholesterol``."""
+    literal = re.split(r'\[|\(', pattern, maxsplit=1)[0]
+    return re.sub(r'\\s[+*]?', ' ', literal).replace('\\', '').strip()
+
+
+def _decimals(ranges):
+    bounds = [b for low, high, _ in ranges for b in (low, high) if b not in (None, float('inf'))]
+    return 1 if any(float(b) != int(b) for b in bounds) else 0
+
+
+def sample_value(ranges, rng):
+    """A value inside a randomly chosen reference range."""
+    low, high, _ = rng.choice(ranges)
+    if high in (None, float('inf')):
+        high = low * 1.4 + 1
+    if low == 0:
+        # Keep "below the reference range" values plausible rather than near zero
+        low = high * 0.6
+    decimals = _decimals(ranges)
+    value = round(rng.uniform(low, high), decimals)
+    return int(value) if decimals == 0 else value
+
+
+def expected_status(ranges, value):
+    """Status by the same rule as the analyzer: first closed range containing the value."""
+    for low, high, status in ranges:
+        if low <= value <= high:
+            return status
+    return 'unknown'
+
+
+def report_lines(lab_ranges, rng):
+    """Build (lines, ground_truth) for one report; lab lines come back in random order."""
+    values = {name: sample_value(info['ranges'], rng) for name, info in lab_ranges.items()}
+    lab_lines = []
+    combined = set()
+    for members, template in COMBINED_LINES.items():
+        if all(name in values for name in members):
+            lab_lines.append(template.format(**values))
+            combined.update(members)
+    for name, value in values.items():
+        if name in combined:
+            continue
+        templates = LAB_LINES.get(name) or [f"{_pattern_label(lab_ranges[name]['patterns'][0])} {{value}}"]
+        lab_lines.append(rng.choice(templates).format(value=value))
+    rng.shuffle(lab_lines)
+    return lab_lines, values
+
+
+def render_pages(lines, pages, dpi, rng, font_points=11):
+    """Lay out the header, lab lines and filler over ``pages`` white pages at ``dpi``."""
+    size = (int(PAGE_INCHES[0] * dpi), int(PAGE_INCHES[1] * dpi))
+    font = _font(int(font_points / 72 * dpi))
+    line_height = int(font_points / 72 * dpi * 1.8)
+    margin = int(0.8 * dpi)
+    per_page = -(-len(lines) // pages)
+
+    images = []
+    for page_number in range(pages):
+        page = Image.new('L', size, 255)
+        draw = ImageDraw.Draw(page)
+        y = margin
+        body = [line.format(day=rng.randint(1, 28)) for line in HEADER_LINES] if page_number == 0 else []
+        body += lines[page_number * per_page:(page_number + 1) * per_page]
+        body += ["", rng.choice(FILLER_LINES), "", f"Page {page_number + 1} of {pages}"]
+        for line in body:
+            draw.text((margin, y), line, fill=15, font=font)
+            y += line_height
+        images.append(page)
+    return images
+
+
+def degrade(image, rng, noise=0.0, skew=0.0, photo=False, scale=1.0):
+    """Simulate scanning or photographing a printed page."""
+    if scale != 1.0:
+        image = image.resize((int(image.width * scale), int(image.height * scale)), Image.BICUBIC)
+    background = 70 if photo else 255
+    if skew:
+        image = image.rotate(rng.uniform(-skew, skew), resample=Image.BICUBIC, expand=True, fillcolor=background)
+    if photo:
+        canvas = Image.new('L', (int(image.width * 1.1), int(image.height * 1.15)), background)
+        canvas.paste(image, ((canvas.width - image.width) // 2, (canvas.height - image.height) // 2))
+        image = canvas
+    if noise or photo:
+        pixels = np.asarray(image, dtype=np.float32)
+        if photo:
+            pixels = pixels * np.linspace(0.55, 1.0, pixels.shape[1], dtype=np.float32)[None, :]
+        if noise:
+            pixels = pixels + np.random.default_rng(rng.randrange(2 ** 32)).normal(0, noise, pixels.shape)
+        image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    return image
+
+
+def generate_report(seed, lab_ranges, pages=1, dpi=200, noise=0.0, skew=0.0, photo=False, scale=1.0):
+    """Render one report; returns (page_images, ground_truth_values, text)."""
+    rng = random.Random(seed)
+    lines, values = report_lines(lab_ranges, rng)
+    images = [degrade(page, rng, noise, skew, photo, scale) for page in render_pages(lines, pages, dpi, rng)]
+    return images, values, "\n".join(lines)
+
+
+def check_ground_truth(lab_ranges, text, values):
+    """Make sure the lab rules recover every value from the clean report text."""
+    extracted = LabExtractionEngine(lab_ranges).extract(re.sub(r'\s+', ' ', text))
+    missing = {name: value for name, value in values.items() if extracted.get(name) != value}
+    if missing:
+        raise ValueError(f"Lab rules do not recover generated values {missing} from: {text!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--out', required=True, help='output directory')
+    parser.add_argument('--reports', type=int, default=20)
+    parser.add_argument('--formats', nargs='+', choices=['png', 'pdf'], default=['png', 'pdf'])
+    parser.add_argument('--pages', type=int, default=2, help='pages per PDF report')
+    parser.add_argument('--dpi', type=int, default=200, help='render resolution')
+    parser.add_argument('--scale', type=float, default=1.0, help='resize factor after rendering')
+    parser.add_argument('--noise', type=float, default=6.0, help='Gaussian noise sigma (0-255 scale)')
+    parser.add_argument('--skew', type=float, default=2.0, help='maximum rotation in degrees')
+    parser.add_argument('--photo', action='store_true', help='frame pages like a phone photo with a shadow')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--lab-rules', help='lab rules JSON (defaults to the shipped rules)')
+    args = parser.parse_args()
+
+    lab_ranges = load_lab_rules(args.lab_rules) if args.lab_rules else load_lab_rules()
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+
+    effective_dpi = int(args.dpi * args.scale)
+    reports = []
+    for index in range(args.reports):
+        seed = args.seed + index
+        for fmt in args.formats:
+            pages = args.pages if fmt == 'pdf' else 1
+            images, values, text = generate_report(seed, lab_ranges, pages, args.dpi,
+                                                   args.noise, args.skew, args.photo, args.scale)
+            check_ground_truth(lab_ranges, text, values)
+            filename = f"report_{index:03d}.{fmt}"
+            if fmt == 'pdf':
+                images[0].save(out / filename, save_all=True, append_images=images[1:], resolution=effective_dpi)
+            else:
+                images[0].save(out / filename, dpi=(effective_dpi, effective_dpi))
+            reports.append({
+                'file': filename,
+                'format': fmt,
+                'pages': pages,
+                'seed': seed,
+                'labs': values,
+                'statuses': {name: expected_status(lab_ranges[name]['ranges'], value)
+                             for name, value in values.items()},
+            })
+
+    manifest = {
+        'generator': {key: value for key, value in vars(args).items() if key != 'out'},
+        'reports': reports,
+    }
+    with open(out / 'manifest.json', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Wrote {len(reports)} files and manifest.json to {out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Measure cold import/startup time of the backend services.
+
+Each service module is imported in a fresh interpreter with ``-X importtime``,
+so the numbers include module-level initialization (analyzer construction,
+model loading) exactly as a new pod would pay it.
+
+Usage:
+    python benchmarks/startup_profile.py                      # all services
+    python benchmarks/startup_profile.py app medical_api --runs 5 --top 15
+    python benchmarks/startup_profile.py app --budget-ms 1500 # exit 1 if slower
+    python benchmarks/startup_profile.py --json startup.json
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+SERVICES = ['app', 'medical_api', 'chatbot', 'symptoms']
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+PROBE = (
+    "import time; _start = time.perf_counter(); import {module}; "
+    "print('STARTUP_MS', (time.perf_counter() - _start) * 1000)"
+)
+
+
+def profile_once(module: str) -> dict:
+    """Import ``module`` in a fresh interpreter and collect timings."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE.format(module=module)],
+        cwd=BACKEND_DIR, capture_output=True, text=True, env=env
+    )
+    startup_ms = None
+    for line in proc.stdout.splitlines():
+        if line.startswith('STARTUP_MS'):
+            startup_ms = float(line.split()[1])
+
+    # Top-level packages only (no leading indentation in the importtime tree)
+    packages = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and len(match.group(3)) <= 1:
+            package = match.group(4).split('.')[0]
+            packages[package] = packages.get(package, 0) + int(match.group(2)) / 1000
+
+    return {
+        'ok': proc.returncode == 0 and startup_ms is not None,
+        'startup_ms': startup_ms,
+        'packages': packages,
+        'error': None if proc.returncode == 0 else proc.stderr.strip().splitlines()[-1:]
+    }
+
+
+def profile_service(module: str, runs: int, top: int) -> dict:
+    results = [profile_once(module) for _ in range(runs)]
+    ok = [r for r in results if r['ok']]
+    if not ok:
+        return {'service': module, 'ok': False, 'error': results[-1]['error']}
+
+    packages = {}
+    for result in ok:
+        for package, ms in result['packages'].items():
+            packages.setdefault(package, []).append(ms)
+    slowest = sorted(
+        ((package, statistics.median(times)) for package, times in packages.items()),
+        key=lambda item: item[1], reverse=True
+    )[:top]
+
+    timings = [r['startup_ms'] for r in ok]
+    return {
+        'service': module,
+        'ok': True,
+        'runs': len(ok),
+        'startup_ms_median': round(statistics.median(timings), 1),
+        'startup_ms_min': round(min(timings), 1),
+        'startup_ms_max': round(max(timings), 1),
+        'slowest_imports_ms': [{'package': p, 'ms': round(ms, 1)} for p, ms in slowest]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import/startup time per backend service")
+    parser.add_argument('services', nargs='*', default=SERVICES, help=f"modules to profile (default: {' '.join(SERVICES)})")
+    parser.add_argument('--runs', type=int, default=3, help='fresh interpreters per service')
+    parser.add_argument('--top', type=int, default=10, help='slowest top-level imports to show')
+    parser.add_argument('--budget-ms', type=float, help='exit non-zero if any service median exceeds this')
+    parser.add_argument('--json', dest='json_path', help='also write the report to this file')
+    args = parser.parse_args()
+
+    report = [profile_service(service, args.runs, args.top) for service in args.services]
+
+    over_budget = False
+    for entry in report:
+        print("=" * 50)
+        if not entry['ok']:
+            print(f"{entry['service']}: FAILED TO IMPORT {entry['error']}")
+            over_budget = True
+            continue
+        flag = ""
+        if args.budget_ms is not None and entry['startup_ms_median'] > args.budget_ms:
+            flag = f"  OVER BUDGET ({args.budget_ms:.0f} ms)"
+            over_budget = True
+        print(f"{entry['service']}: {entry['startup_ms_median']} ms median "
+              f"(min {entry['startup_ms_min']}, max {entry['startup_ms_max']}, {entry['runs']} runs){flag}")
+        for item in entry['slowest_imports_ms']:
+            print(f"    {item['ms']:>9.1f} ms  {item['package']}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.json_path}")
+
+    sys.exit(1 if over_budget and args.budget_ms is not None else 0)
+
+
+if __name__ == '__main__':
+    main()
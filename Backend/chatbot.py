@@ -2,14 +2,15 @@ import os
 import uuid
 import time
 import tempfile
-import requests
 import json
+import asyncio
+import hashlib
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Optional
 
 from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
@@ -20,6 +21,14 @@ from langdetect import detect
 
 from dotenv import load_dotenv
 
+# Load environment variables (before the modules below read their configuration)
+load_dotenv()
+
+import llm_client
+import response_cache as response_cache_module
+import knowledge_base
+import job_queue as job_queue_module
+
 # Alternative imports for Windows compatibility
 try:
     # Try standard langchain imports first
@@ -42,12 +51,10 @@ except ImportError:
         TextLoader = None
         RecursiveCharacterTextSplitter = None
 
-# Load environment variables
-load_dotenv()
-
-# Get API key from environment
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+# Shared async completions client (keep-alive pool, in-flight limit, retries);
+# set LLM_API_URL to a local llm_stub.py to run without the real API
+# (LLM_API_KEY, falling back to GROQ_API_KEY)
+llm = llm_client.AsyncLLMClient(url=llm_client.LLM_API_URL, api_key=llm_client.LLM_API_KEY)
 
 app = FastAPI(title="MediChain AI Chatbot", description="AI-powered medical symptom checker and health assistant")
 
@@ -74,6 +81,12 @@ EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 # Health data file
 HEALTH_DATA_FILE = "health.txt"
 
+# Knowledge-base updates run as background jobs, persisted here
+KB_JOBS_DB_PATH = os.getenv("KB_JOBS_DB_PATH", "cache/kb_jobs.sqlite3")
+KB_JOBS_UPLOAD_DIR = os.getenv("KB_JOBS_UPLOAD_DIR", "cache/kb_uploads")
+# How often idle runners poll for update jobs and for an index made current by another server process
+KB_JOB_POLL_SECONDS = float(os.getenv("KB_JOB_POLL_SECONDS", "1.0"))
+
 # Pydantic Models
 class QueryModel(BaseModel):
     message: str
@@ -137,10 +150,11 @@ def load_and_store_medical_data(data_file=HEALTH_DATA_FILE):
         docs = loader.load()
         
         # Split documents into chunks for better retrieval
+        # Same chunking as knowledge-base updates, so their embeddings can be reused
         text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=800,  # Larger chunks for medical context
-            chunk_overlap=100,
-            separators=["\n\n", "\n", ".", "!", "?", ",", " ", ""]
+            chunk_size=knowledge_base.KB_CHUNK_SIZE,
+            chunk_overlap=knowledge_base.KB_CHUNK_OVERLAP,
+            separators=knowledge_base.KB_SEPARATORS
         )
         texts = text_splitter.split_documents(docs)
         
@@ -163,11 +177,24 @@ def load_and_store_medical_data(data_file=HEALTH_DATA_FILE):
         else:
             return load_medical_data_simple(data_file)
 
+def knowledge_base_version(data_file=HEALTH_DATA_FILE):
+    """
+    Fingerprint of the medical data file the vector store was built from
+    """
+    try:
+        with open(data_file, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()[:16]
+    except OSError:
+        return "empty"
+
 # Initialize or load ChromaDB with medical data
+kb_index = None
 try:
     if HuggingFaceEmbeddings and Chroma:
         embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
-        vectorstore = Chroma(
+        # Versioned, content-hashed collections written by knowledge-base update jobs
+        kb_index = knowledge_base.KnowledgeBaseIndex(CHROMA_DIR, embeddings, Chroma, RecursiveCharacterTextSplitter)
+        vectorstore = kb_index.open_current() or Chroma(
             persist_directory=str(CHROMA_DIR), 
             embedding_function=embeddings
         )
@@ -179,6 +206,17 @@ except:
     print("Creating new medical vector store")
     vectorstore = load_and_store_medical_data()
 
+# Version of the knowledge base answers are generated from; cached answers only match the same version
+kb_version = (kb_index.manifest or {}).get('version') if kb_index else None
+kb_version = kb_version or knowledge_base_version()
+
+# Queue of knowledge-base updates, applied one at a time across all server processes
+kb_jobs = job_queue_module.JobQueue(db_path=KB_JOBS_DB_PATH, upload_dir=KB_JOBS_UPLOAD_DIR)
+kb_job_runners = []
+
+# Semantic cache of chat answers, keyed by query embedding
+response_cache = response_cache_module.create_cache()
+
 def detect_language(text):
     """Detect language of the input text."""
     try:
@@ -224,12 +262,65 @@ def text_to_speech(text, lang='en'):
         print(f"Text-to-speech error: {e}")
         return None
 
-def retrieve_medical_context(query, top_k=5):
+def embed_query(text):
+    """
+    Embed a query with the vector store's embedding model (None without ChromaDB)
+    """
+    embedding_function = getattr(vectorstore, 'embeddings', None)
+    if embedding_function is None:
+        return None
+    try:
+        return embedding_function.embed_query(text)
+    except Exception as e:
+        print(f"Query embedding error: {e}")
+        return None
+
+def lookup_cached_response(english_message, lang):
+    """
+    Return the query embedding and a cached answer to a near-identical question, if any
+    """
+    if response_cache is None:
+        return None, None
+    query_embedding = embed_query(english_message)
+    if query_embedding is None:
+        return None, None
+    return query_embedding, response_cache.lookup(query_embedding, lang, kb_version)
+
+def cache_response(query_embedding, lang, version, final_response, response_text, audio_filename):
+    """
+    Remember a generated answer, unless generation or its translation failed
+    """
+    if response_cache is None or query_embedding is None or response_text == FALLBACK_RESPONSE:
+        return
+    if lang != 'en' and final_response == response_text:
+        return
+    response_cache.put(query_embedding, lang, version, {
+        "text_response": final_response,
+        "english_response": response_text,
+        "audio_file_path": audio_filename
+    })
+
+def cached_audio(cached, lang):
+    """
+    Audio for a cached answer, regenerated if the file is gone
+    """
+    audio_filename = cached["audio_file_path"]
+    if audio_filename and (UPLOAD_DIR / audio_filename).exists():
+        return audio_filename
+    audio_filename = text_to_speech(cached["text_response"], lang)
+    cached["audio_file_path"] = audio_filename
+    return audio_filename
+
+def retrieve_medical_context(query, top_k=5, query_embedding=None):
     """
     Retrieve relevant medical context from ChromaDB or simple text
     """
     try:
-        if hasattr(vectorstore, 'similarity_search'):
+        if query_embedding is not None and hasattr(vectorstore, 'similarity_search_by_vector'):
+            # Reuse the embedding computed for the response cache
+            docs = vectorstore.similarity_search_by_vector(query_embedding, k=top_k)
+            context = "\n\n".join([doc.page_content for doc in docs])
+        elif hasattr(vectorstore, 'similarity_search'):
             # ChromaDB available
             docs = vectorstore.similarity_search(query, k=top_k)
             context = "\n\n".join([doc.page_content for doc in docs])
@@ -242,17 +333,13 @@ def retrieve_medical_context(query, top_k=5):
         print(f"Medical context retrieval error: {e}")
         return ""
 
-def generate_medical_response(message, context="", user_profile=None):
-    """Generate a medical response using Groq API with medical context."""
-    try:
-        # Prepare headers
-        headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        # Enhanced medical prompt
-        system_prompt = """You are MediChain AI, an advanced medical assistant specialized in symptom analysis and health guidance. 
+# Shown instead of a completion when the LLM API fails
+FALLBACK_RESPONSE = "I apologize, but I'm experiencing technical difficulties. Please consult with a healthcare professional for your medical concerns."
+
+def build_medical_messages(message, context="", user_profile=None):
+    """Build the system and user messages for a medical completion."""
+    # Enhanced medical prompt
+    system_prompt = """You are MediChain AI, an advanced medical assistant specialized in symptom analysis and health guidance. 
 
 IMPORTANT GUIDELINES:
 - Provide accurate, helpful medical information based on symptoms
@@ -265,12 +352,12 @@ IMPORTANT GUIDELINES:
 
 Your responses should be structured, informative, and focused on patient safety."""
 
-        # Prepare comprehensive prompt
-        user_context = ""
-        if user_profile:
-            user_context = f"Patient Context: Age: {user_profile.get('age', 'N/A')}, Gender: {user_profile.get('gender', 'N/A')}, Medical History: {user_profile.get('medical_history', [])}"
-        
-        full_prompt = f"""Medical Knowledge Base Context:
+    # Prepare comprehensive prompt
+    user_context = ""
+    if user_profile:
+        user_context = f"Patient Context: Age: {user_profile.get('age', 'N/A')}, Gender: {user_profile.get('gender', 'N/A')}, Medical History: {user_profile.get('medical_history', [])}"
+    
+    full_prompt = f"""Medical Knowledge Base Context:
 {context}
 
 {user_context}
@@ -286,35 +373,34 @@ Please provide a comprehensive medical assessment including:
 
 Respond naturally and professionally without referencing the knowledge base directly."""
 
-        # Prepare payload
-        payload = {
-            "model": "llama3-70b-8192",  # Using larger model for better medical responses
-            "messages": [
-                {
-                    "role": "system",
-                    "content": system_prompt
-                },
-                {
-                    "role": "user",
-                    "content": full_prompt
-                }
-            ],
-            "temperature": 0.3,  # Lower temperature for more consistent medical responses
-            "max_tokens": 1500
+    return [
+        {
+            "role": "system",
+            "content": system_prompt
+        },
+        {
+            "role": "user",
+            "content": full_prompt
         }
-        
-        # Make the request
-        response = requests.post(GROQ_API_URL, headers=headers, json=payload, timeout=30)
-        response.raise_for_status()
-        
-        # Parse the response
-        result = response.json()
-        return result["choices"][0]["message"]["content"]
+    ]
+
+# Completion settings shared by the JSON and streaming chat paths
+COMPLETION_OPTIONS = {
+    "model": "llama3-70b-8192",  # Using larger model for better medical responses
+    "temperature": 0.3,  # Lower temperature for more consistent medical responses
+    "max_tokens": 1500
+}
+
+async def generate_medical_response(message, context="", user_profile=None):
+    """Generate a medical response using Groq API with medical context."""
+    try:
+        # Make the request without blocking the event loop
+        return await llm.chat_completion(build_medical_messages(message, context, user_profile), **COMPLETION_OPTIONS)
     except Exception as e:
         print(f"Groq API error: {e}")
-        return "I apologize, but I'm experiencing technical difficulties. Please consult with a healthcare professional for your medical concerns."
+        return FALLBACK_RESPONSE
 
-def analyze_symptoms(symptoms_data: SymptomAnalysisModel):
+async def analyze_symptoms(symptoms_data: SymptomAnalysisModel):
     """Analyze symptoms and provide medical insights"""
     symptoms_text = ", ".join(symptoms_data.symptoms)
     context_query = f"symptoms: {symptoms_text} age: {symptoms_data.age} gender: {symptoms_data.gender}"
@@ -335,7 +421,7 @@ def analyze_symptoms(symptoms_data: SymptomAnalysisModel):
     """
     
     # Generate medical response
-    response = generate_medical_response(detailed_query, context)
+    response = await generate_medical_response(detailed_query, context)
     
     return response
 
@@ -357,11 +443,26 @@ async def medical_chat(query: QueryModel):
             except Exception as e:
                 print(f"Translation error: {e}")
         
+        # Answer near-duplicates of earlier questions from the cache
+        version = kb_version
+        # Embedding the question and synthesizing audio are blocking; keep them off the event loop
+        query_embedding, cached = await asyncio.to_thread(lookup_cached_response, english_message, detected_lang)
+        if cached:
+            cached_answer, similarity = cached
+            return {
+                "text_response": cached_answer["text_response"],
+                "english_response": cached_answer["english_response"],
+                "audio_file_path": await asyncio.to_thread(cached_audio, cached_answer, detected_lang),
+                "detected_language": detected_lang,
+                "cache": {"hit": True, "similarity": round(similarity, 4)},
+                "timestamp": datetime.now().isoformat()
+            }
+        
         # Retrieve medical context from health.txt
-        context = retrieve_medical_context(english_message)
+        context = retrieve_medical_context(english_message, query_embedding=query_embedding)
         
         # Generate medical response
-        response_text = generate_medical_response(english_message, context)
+        response_text = await generate_medical_response(english_message, context)
         
         # Translate response back if needed
         final_response = response_text
@@ -375,12 +476,14 @@ async def medical_chat(query: QueryModel):
         
         # Convert to speech
         audio_filename = text_to_speech(final_response, detected_lang)
+        cache_response(query_embedding, detected_lang, version, final_response, response_text, audio_filename)
         
         return {
             "text_response": final_response,
             "english_response": response_text,
             "audio_file_path": audio_filename,
             "detected_language": detected_lang,
+            "cache": {"hit": False},
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
@@ -392,13 +495,124 @@ async def medical_chat(query: QueryModel):
             "detected_language": "en"
         }
 
+def sse_event(event, data):
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def translate_text(text, source, target):
+    """Translate text, returning it unchanged if translation fails."""
+    try:
+        return GoogleTranslator(source=source, target=target).translate(text)
+    except Exception as e:
+        print(f"Translation error: {e}")
+        return text
+
+async def stream_medical_chat(message):
+    """Yield the Server-Sent Events of one streamed medical chat turn."""
+    detected_lang = 'en'
+    try:
+        # Language detection, translation, retrieval and TTS are blocking calls
+        detected_lang = await asyncio.to_thread(detect_language, message)
+        yield sse_event("meta", {"detected_language": detected_lang})
+
+        english_message = message
+        if detected_lang != 'en':
+            english_message = await asyncio.to_thread(translate_text, message, detected_lang, 'en')
+
+        version = kb_version
+        query_embedding, cached = await asyncio.to_thread(lookup_cached_response, english_message, detected_lang)
+        if cached:
+            # A cached answer arrives as one token, followed by the usual events
+            cached_answer, similarity = cached
+            yield sse_event("token", {"text": cached_answer["english_response"]})
+            if detected_lang != 'en':
+                yield sse_event("translation", {"text": cached_answer["text_response"]})
+            audio_filename = await asyncio.to_thread(cached_audio, cached_answer, detected_lang)
+            if audio_filename:
+                yield sse_event("audio", {"audio_file_path": audio_filename, "audio_url": f"/audio/{audio_filename}"})
+            yield sse_event("done", {
+                "text_response": cached_answer["text_response"],
+                "english_response": cached_answer["english_response"],
+                "audio_file_path": audio_filename,
+                "detected_language": detected_lang,
+                "cache": {"hit": True, "similarity": round(similarity, 4)},
+                "timestamp": datetime.now().isoformat()
+            })
+            return
+        context = await asyncio.to_thread(retrieve_medical_context, english_message, 5, query_embedding)
+
+        # Tokens are streamed in English; the translation follows once the answer is complete
+        pieces = []
+        complete = True
+        try:
+            async for piece in llm.stream_chat_completion(
+                build_medical_messages(english_message, context), **COMPLETION_OPTIONS
+            ):
+                pieces.append(piece)
+                yield sse_event("token", {"text": piece})
+        except Exception as e:
+            print(f"Groq API error: {e}")
+            if pieces:
+                # Part of the answer was already sent, so report the failure instead of replacing it
+                complete = False
+                yield sse_event("error", {"error": str(e)})
+            else:
+                pieces.append(FALLBACK_RESPONSE)
+                yield sse_event("token", {"text": FALLBACK_RESPONSE})
+        response_text = "".join(pieces)
+
+        final_response = response_text
+        if detected_lang != 'en':
+            final_response = await asyncio.to_thread(translate_text, response_text, 'en', detected_lang)
+            yield sse_event("translation", {"text": final_response})
+
+        audio_filename = await asyncio.to_thread(text_to_speech, final_response, detected_lang)
+        if audio_filename:
+            yield sse_event("audio", {"audio_file_path": audio_filename, "audio_url": f"/audio/{audio_filename}"})
+        if complete:
+            cache_response(query_embedding, detected_lang, version, final_response, response_text, audio_filename)
+
+        yield sse_event("done", {
+            "text_response": final_response,
+            "english_response": response_text,
+            "audio_file_path": audio_filename,
+            "detected_language": detected_lang,
+            "cache": {"hit": False},
+            "timestamp": datetime.now().isoformat()
+        })
+    except Exception as e:
+        print(f"Medical chat stream error: {e}")
+        yield sse_event("error", {"error": str(e)})
+        yield sse_event("done", {
+            "text_response": "I apologize for the technical issue. Please consult a healthcare professional for medical advice.",
+            "audio_file_path": None,
+            "detected_language": detected_lang
+        })
+
+@app.post("/chat/stream")
+async def medical_chat_stream(query: QueryModel):
+    """
+    Streaming variant of /chat: the answer arrives as Server-Sent Events.
+
+    Events: "meta" (detected language), "token" (answer text as generated),
+    "translation" (full answer in the user's language, non-English only),
+    "audio" (speech file), "error", and finally "done" with the same fields
+    as the /chat response.
+    """
+    return StreamingResponse(
+        stream_medical_chat(query.message),
+        media_type="text/event-stream",
+        # X-Accel-Buffering stops nginx from holding tokens back until the response ends
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/symptom-analysis")
 async def symptom_analysis(symptoms: SymptomAnalysisModel):
     """
     Advanced symptom analysis endpoint
     """
     try:
-        analysis_result = analyze_symptoms(symptoms)
+        analysis_result = await analyze_symptoms(symptoms)
         
         return {
             "analysis": analysis_result,
@@ -454,7 +668,7 @@ async def process_medical_voice(file: UploadFile = File(...)):
         context = retrieve_medical_context(transcribed_text)
 
         # Generate medical response
-        response_text = generate_medical_response(transcribed_text, context)
+        response_text = await generate_medical_response(transcribed_text, context)
         
         # Translate if needed
         if detected_lang != 'en':
@@ -497,29 +711,115 @@ async def get_audio(filename: str):
         raise HTTPException(status_code=404, detail="Audio file not found")
     return FileResponse(str(file_path))
 
-@app.post("/update-medical-database")
-async def update_medical_database(file: UploadFile = File(...)):
+def ingest_medical_data(data_file, source, progress):
+    """
+    Build the vector store for a medical data file, returning it with a summary of the change
     """
-    Update the medical ChromaDB with a new health.txt file
+    if kb_index is None:
+        # No ChromaDB: the simple text fallback is the whole file
+        with open(data_file, 'rb') as f:
+            version = hashlib.sha256(f.read()).hexdigest()[:16]
+        return load_medical_data_simple(data_file), {"version": version, "previous_version": kb_version}
+    return kb_index.ingest(data_file, source, vectorstore, progress)
+
+async def reload_knowledge_base():
     """
+    Switch to the index another server process made current, if any
+    """
+    global vectorstore, kb_version
+    if kb_index is None:
+        return
     try:
-        # Save uploaded file
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.txt')
-        content = await file.read()
-        temp_file.write(content)
-        temp_file.close()
+        reloaded = await asyncio.to_thread(kb_index.current_if_changed, kb_version)
+    except Exception as e:
+        print(f"Could not open the current knowledge base: {e}")
+        return
+    if reloaded:
+        vectorstore, kb_version = reloaded
 
-        # Reload database with new medical file
-        global vectorstore
-        vectorstore = load_and_store_medical_data(temp_file.name)
+async def run_ingestion_jobs():
+    """
+    Apply queued knowledge-base updates one at a time until cancelled
+    """
+    global vectorstore, kb_version
+    next_requeue = 0.0
+    while True:
+        # One update at a time across processes: each builds on the index the previous one made current
+        job = await asyncio.to_thread(kb_jobs.claim, exclusive=True)
+        if job is None:
+            await reload_knowledge_base()
+            # Pick up updates left behind by a process that died
+            if time.monotonic() >= next_requeue:
+                await asyncio.to_thread(kb_jobs.requeue_interrupted)
+                next_requeue = time.monotonic() + kb_jobs.lease_seconds / 2
+            await asyncio.sleep(KB_JOB_POLL_SECONDS)
+            continue
+
+        job_id = job['id']
+        print(f"Running knowledge base update {job_id} ({job['filename']})")
+        await asyncio.to_thread(kb_jobs.add_event, job_id, 'started', {'attempt': job['attempts'] + 1})
+        lease = asyncio.create_task(kb_jobs.hold_lease(job_id))
+        try:
+            # Build on the index another process may have made current meanwhile
+            await reload_knowledge_base()
+            # Chunking and embedding are blocking; chat requests keep using the current store meanwhile
+            new_store, summary = await asyncio.to_thread(
+                ingest_medical_data, job['content_path'], job['filename'],
+                lambda event, data: kb_jobs.add_event(job_id, event, data)
+            )
+            # Swap to the new index in one step on the event loop; cached answers from the old one stop matching
+            vectorstore, kb_version = new_store, summary['version']
+            await asyncio.to_thread(kb_jobs.complete, job_id, summary)
+        except asyncio.CancelledError:
+            # Left as running; requeued once its lease expires
+            raise
+        except Exception as e:
+            print(f"Medical database update error: {e}")
+            await asyncio.to_thread(kb_jobs.fail, job_id, str(e))
+        finally:
+            lease.cancel()
+
+@app.post("/update-medical-database", status_code=202)
+async def update_medical_database(file: UploadFile = File(...)):
+    """
+    Queue an update of the medical ChromaDB from a new health.txt file.
 
-        # Clean up temporary file
-        os.unlink(temp_file.name)
+    The file replaces the knowledge base: only chunks not indexed yet are
+    embedded, chunks missing from the file are dropped, and chat requests
+    switch to the new index once it is complete.
+    """
+    try:
+        content = await file.read()
+        content.decode('utf-8')
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Medical data file must be UTF-8 text")
+    job_id = await asyncio.to_thread(kb_jobs.submit, file.filename or HEALTH_DATA_FILE, content)
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/update-medical-database/jobs/{job_id}",
+        "timestamp": datetime.now().isoformat()
+    }
 
-        return {"status": "Medical database updated successfully", "timestamp": datetime.now().isoformat()}
-    except Exception as e:
-        print(f"Medical database update error: {e}")
-        return {"error": str(e)}
+@app.get("/update-medical-database/jobs/{job_id}")
+async def get_medical_database_update(job_id: str):
+    """
+    Status of a knowledge-base update; the result summarizes chunks embedded, reused and removed
+    """
+    job = await asyncio.to_thread(kb_jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Update job not found")
+    return {
+        "job_id": job['id'],
+        "filename": job['filename'],
+        "status": job['status'],
+        "created_at": job['created_at'],
+        "started_at": job['started_at'],
+        "finished_at": job['finished_at'],
+        "progress": job['progress'],
+        "result": job['result'],
+        "error": job['error']
+    }
 
 @app.get("/health-check")
 async def health_check():
@@ -530,9 +830,26 @@ async def health_check():
         "status": "healthy",
         "service": "MediChain AI Chatbot",
         "version": "1.0.0",
+        "llm": {"url": llm.url, "max_in_flight": llm.max_in_flight, **llm.stats},
+        "response_cache": response_cache.stats() if response_cache else None,
+        "knowledge_base": {"version": kb_version, "update_jobs": kb_jobs.stats()},
         "timestamp": datetime.now().isoformat()
     }
 
+@app.on_event("startup")
+async def start_llm_client():
+    """Open the LLM connection pool and start the knowledge-base update runner (which also follows index changes)."""
+    llm.start()
+    await asyncio.to_thread(kb_jobs.requeue_interrupted)
+    kb_job_runners.append(asyncio.create_task(run_ingestion_jobs()))
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    """Stop the update runner and close the pooled LLM connections."""
+    for runner in kb_job_runners:
+        runner.cancel()
+    await llm.aclose()
+
 @app.get("/")
 async def root():
     """
@@ -543,6 +860,7 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "chat": "/chat - Medical chat interface",
+            "chat_stream": "/chat/stream - Medical chat streamed as Server-Sent Events",
             "symptom_analysis": "/symptom-analysis - Advanced symptom analysis",
             "voice_input": "/voice-input - Voice-based medical queries",
             "health_check": "/health-check - Service health status"
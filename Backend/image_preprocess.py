@@ -0,0 +1,220 @@
+import os
+import time
+import logging
+from typing import List, Dict, Optional, Any
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+# Image cleanup before OCR; OpenCV/numpy are imported on first use and the
+# stage is skipped when they are not installed
+OCR_PREPROCESS = os.getenv("OCR_PREPROCESS", "true").lower() in ("1", "true", "yes")
+OCR_PREPROCESS_STEPS = [
+    step.strip() for step in os.getenv("OCR_PREPROCESS_STEPS", "resize,deskew,binarize,crop").split(",")
+    if step.strip()
+]
+# Resolution images are normalized to; without a trustworthy DPI tag the page
+# is assumed to be A4 (11.7 in along its long side)
+OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "300"))
+OCR_MAX_SKEW_DEGREES = float(os.getenv("OCR_MAX_SKEW_DEGREES", "10"))
+# Offset subtracted from the local mean when binarizing; higher drops more faint noise
+OCR_BINARIZE_OFFSET = int(os.getenv("OCR_BINARIZE_OFFSET", "15"))
+
+STEPS = ('resize', 'deskew', 'binarize', 'crop')
+PAGE_LONG_SIDE_INCHES = 11.7
+# DPI tags implying a page longer than this are ignored (phones write 72 DPI on 4000 px photos)
+MAX_PLAUSIBLE_PAGE_INCHES = 17.0
+# Largest upscale applied on the A4 guess alone; small crops and screenshots are not whole pages
+MAX_GUESSED_UPSCALE = float(os.getenv("OCR_MAX_GUESSED_UPSCALE", "1.5"))
+# Skew is estimated on a copy downscaled to this long side
+SKEW_ESTIMATE_SIZE = 800
+
+_cv2 = None
+_np = None
+
+
+def _load_cv2() -> bool:
+    """Import OpenCV and numpy on first use; False when they are not installed."""
+    global _cv2, _np
+    if _cv2 is None:
+        try:
+            import cv2
+            import numpy
+            _cv2, _np = cv2, numpy
+        except ImportError:
+            logger.warning("OpenCV not available, OCR preprocessing disabled")
+            _cv2 = False
+    return bool(_cv2)
+
+
+def _source_dpi(image: Image.Image) -> Optional[float]:
+    """DPI from the image metadata, if it describes a plausibly sized page."""
+    dpi = image.info.get('dpi')
+    if not dpi:
+        return None
+    try:
+        dpi = float(dpi[0] if isinstance(dpi, (tuple, list)) else dpi)
+    except (TypeError, ValueError):
+        return None
+    if dpi <= 0 or max(image.size) / dpi > MAX_PLAUSIBLE_PAGE_INCHES:
+        return None
+    return dpi
+
+
+def _resize(gray, scale: float):
+    interpolation = _cv2.INTER_AREA if scale < 1 else _cv2.INTER_CUBIC
+    return _cv2.resize(gray, None, fx=scale, fy=scale, interpolation=interpolation)
+
+
+def estimate_skew(gray, max_angle: float = OCR_MAX_SKEW_DEGREES) -> float:
+    """Estimate the text skew angle in degrees with a projection-profile search.
+
+    Text lines give the sharpest horizontal ink profile when level, so the
+    angle maximizing the row-to-row profile change wins: a 1 degree sweep
+    first, then 0.1 degree steps around the best coarse angle.
+    """
+    cv2, np = _cv2, _np
+    scale = min(1.0, SKEW_ESTIMATE_SIZE / max(gray.shape))
+    small = _resize(gray, scale) if scale < 1 else gray
+    # Local thresholding so shadows don't show up as ink
+    ink = cv2.adaptiveThreshold(small, 1, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 15, 10)
+    height, width = ink.shape
+    center = (width / 2, height / 2)
+
+    def sharpness(angle):
+        matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
+        rotated = cv2.warpAffine(ink, matrix, (width, height), flags=cv2.INTER_NEAREST, borderValue=0)
+        profile = rotated.sum(axis=1, dtype=np.float64)
+        return float(np.sum(np.diff(profile) ** 2))
+
+    coarse = max(np.arange(-max_angle, max_angle + 1e-9, 1.0), key=sharpness)
+    fine = max(np.arange(coarse - 1.0, coarse + 1.0 + 1e-9, 0.1), key=sharpness)
+    return round(float(fine), 2)
+
+
+def _rotate(gray, angle: float):
+    """Rotate by ``angle`` degrees on a canvas large enough to keep the corners, padding white."""
+    cv2, np = _cv2, _np
+    height, width = gray.shape
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+    new_width = int(height * sin + width * cos)
+    new_height = int(height * cos + width * sin)
+    matrix[0, 2] += new_width / 2 - width / 2
+    matrix[1, 2] += new_height / 2 - height / 2
+    return cv2.warpAffine(gray, matrix, (new_width, new_height), flags=cv2.INTER_CUBIC,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=255)
+
+
+def _binarize(gray, dpi: int):
+    """Adaptive (local mean) threshold, robust to uneven lighting and shadows."""
+    cv2 = _cv2
+    block = max(15, int(dpi / 10)) | 1  # odd window of roughly a tenth of an inch
+    gray = cv2.medianBlur(gray, 3)
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY,
+                                 block, OCR_BINARIZE_OFFSET)
+
+
+def _crop_borders(binary, dpi: int) -> tuple:
+    """Drop ink touching the image edge (table, fingers, page edges) and crop to the text.
+
+    Returns (image, crop_box) where ``crop_box`` is ``[x, y, width, height]``
+    in the input image, or None when nothing was cropped.
+    """
+    cv2, np = _cv2, _np
+    height, width = binary.shape
+    ink = (binary == 0).astype(np.uint8)
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    if count <= 1:
+        return binary, None
+
+    x, y, w, h, area = (stats[1:, i] for i in range(5))
+    touches_edge = (x == 0) | (y == 0) | (x + w >= width) | (y + h >= height)
+    keep = ~touches_edge & (area >= 4)
+    if not keep.any():
+        return binary, None
+
+    if touches_edge.any():
+        edge_labels = np.flatnonzero(touches_edge) + 1
+        binary = binary.copy()
+        binary[np.isin(labels, edge_labels)] = 255
+
+    margin = max(10, dpi // 15)
+    left = max(0, int(x[keep].min()) - margin)
+    top = max(0, int(y[keep].min()) - margin)
+    right = min(width, int((x[keep] + w[keep]).max()) + margin)
+    bottom = min(height, int((y[keep] + h[keep]).max()) + margin)
+    if (right - left) * (bottom - top) < 0.05 * width * height:
+        # Almost nothing left; more likely noise than a page, keep the full frame
+        return binary, None
+    return binary[top:bottom, left:right], [left, top, right - left, bottom - top]
+
+
+def preprocess(image: Image.Image, steps: Optional[List[str]] = None,
+               source_dpi: Optional[float] = None, target_dpi: int = OCR_TARGET_DPI) -> tuple:
+    """Clean up a page image for OCR, returning (image, preprocess_metadata).
+
+    Steps run in a fixed order: ``resize`` (to ``target_dpi``; without a
+    trustworthy DPI tag by at most MAX_GUESSED_UPSCALE), ``deskew``,
+    ``binarize`` (adaptive threshold) and ``crop`` (drop edge artifacts and
+    empty borders). ``source_dpi`` overrides the DPI tag of the image; pass
+    the render DPI for rasterized PDF pages and leave ``resize`` out.
+    """
+    steps = OCR_PREPROCESS_STEPS if steps is None else steps
+    metadata: Dict[str, Any] = {'enabled': OCR_PREPROCESS, 'input_size': list(image.size), 'steps': {}}
+    if not OCR_PREPROCESS or not steps:
+        return image, metadata
+    if not _load_cv2():
+        metadata['enabled'] = False
+        metadata['skipped'] = 'opencv_unavailable'
+        return image, metadata
+
+    np = _np
+    start = time.perf_counter()
+    gray = np.asarray(image.convert('L'))
+    dpi = source_dpi or _source_dpi(image)
+
+    def timed(name, fn):
+        step_start = time.perf_counter()
+        result = fn()
+        metadata['steps'][name] = round((time.perf_counter() - step_start) * 1000, 2)
+        return result
+
+    if 'resize' in steps:
+        if dpi:
+            scale = target_dpi / dpi
+        else:
+            dpi = max(gray.shape) / PAGE_LONG_SIDE_INCHES
+            scale = min(target_dpi / dpi, MAX_GUESSED_UPSCALE)
+        metadata['scale'] = round(scale, 3)
+        if abs(scale - 1) > 0.1:
+            gray = timed('resize', lambda: _resize(gray, scale))
+        dpi = dpi * scale
+    dpi = int(dpi or target_dpi)
+
+    if 'deskew' in steps:
+        angle = timed('deskew', lambda: estimate_skew(gray))
+        metadata['skew_angle'] = angle
+        if abs(angle) >= 0.2:
+            gray = timed('rotate', lambda: _rotate(gray, angle))
+
+    if 'binarize' in steps:
+        gray = timed('binarize', lambda: _binarize(gray, dpi))
+
+    if 'crop' in steps:
+        if 'binarize' in steps:
+            gray, crop_box = timed('crop', lambda: _crop_borders(gray, dpi))
+        else:
+            _, crop_box = timed('crop', lambda: _crop_borders(_binarize(gray, dpi), dpi))
+            if crop_box:
+                left, top, width, height = crop_box
+                gray = gray[top:top + height, left:left + width]
+        metadata['crop_box'] = crop_box
+
+    result = Image.fromarray(gray)
+    result.info['dpi'] = (dpi, dpi)
+    metadata['output_size'] = list(result.size)
+    metadata['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return result, metadata
@@ -0,0 +1,321 @@
+"""Bulk-import an archive of scanned reports into the report store without going through HTTP.
+
+Usage:
+    python import_reports.py /data/archive                 # directory tree
+    python import_reports.py /data/archive.zip --workers 16
+    python import_reports.py /data/archive --retry-failed  # also retry files that failed before
+    python import_reports.py /data/archive --dry-run       # only count what is left to import
+
+Files are read and hashed in the main process, which skips reports whose
+bytes were already analyzed under the current rules; the rest are OCRed and
+analyzed in a process pool (one file per worker, OCR inline in the worker)
+and written to the report store in batched transactions by the main
+process. Workers are spawned rather than forked, so they never share the
+main process's sqlite connections. A file that crashes a worker is recorded
+as failed and the pool is restarted. Progress is checkpointed per file after
+each batch is saved, so an interrupted import resumes with the files that
+are not done yet.
+"""
+import os
+import sys
+import time
+import sqlite3
+import asyncio
+import hashlib
+import zipfile
+import argparse
+import logging
+import multiprocessing
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger("import_reports")
+
+DEFAULT_CHECKPOINT = "cache/import_checkpoint.sqlite3"
+
+_loop = None
+_archives = {}
+
+
+class ImportCheckpoint:
+    """Per-file import state, keyed by (source, path within the source)."""
+
+    def __init__(self, db_path: str, source: str):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.source = source
+        self._db = sqlite3.connect(db_path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS import_files (
+                source TEXT NOT NULL,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                content_sha256 TEXT,
+                error TEXT,
+                finished_at REAL NOT NULL,
+                PRIMARY KEY (source, path)
+            )
+        """)
+        self._db.commit()
+
+    def finished(self, retry_failed: bool) -> dict:
+        """``{path: size}`` of files that need no further work."""
+        statuses = ('done', 'duplicate') if retry_failed else ('done', 'duplicate', 'failed')
+        rows = self._db.execute(
+            f"SELECT path, size FROM import_files WHERE source = ? AND status IN ({','.join('?' * len(statuses))})",
+            (self.source, *statuses)
+        ).fetchall()
+        return dict(rows)
+
+    def record(self, outcomes: list):
+        """Store ``(path, size, status, content_sha256, error)`` tuples in one transaction."""
+        now = time.time()
+        self._db.executemany(
+            "INSERT OR REPLACE INTO import_files (source, path, size, status, content_sha256, error, finished_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(self.source, *outcome, now) for outcome in outcomes]
+        )
+        self._db.commit()
+
+
+def list_files(source: str, allowed_file) -> list:
+    """Return sorted ``(path, size)`` pairs of importable files in a directory tree or zip archive."""
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            files = [(info.filename, info.file_size) for info in archive.infolist()
+                     if not info.is_dir() and allowed_file(info.filename)]
+    else:
+        files = []
+        for directory, _, names in os.walk(source):
+            for name in names:
+                if allowed_file(name):
+                    path = os.path.join(directory, name)
+                    files.append((os.path.relpath(path, source), os.path.getsize(path)))
+    return sorted(files)
+
+
+def _init_worker():
+    """Import the analyzer once per worker and give it a long-lived event loop."""
+    global _loop
+    import app  # noqa: F401
+    logging.getLogger().setLevel(logging.WARNING)
+    _loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_loop)
+
+
+def _read(source: str, path: str) -> bytes:
+    if os.path.isdir(source):
+        with open(os.path.join(source, path), 'rb') as f:
+            return f.read()
+    if source not in _archives:
+        _archives[source] = zipfile.ZipFile(source)
+    return _archives[source].read(path)
+
+
+def check_file(source: str, path: str, size: int, store, rules_version: str, max_size: int) -> tuple:
+    """Read and hash one file; returns ``(outcome, content)``, with content None when nothing is left to do."""
+    outcome = {'path': path, 'size': size, 'status': 'failed', 'content_sha256': None, 'error': None}
+    try:
+        if size > max_size:
+            raise ValueError(f"File size exceeds maximum allowed size of {max_size / (1024 * 1024)}MB")
+        content = _read(source, path)
+        content_hash = hashlib.sha256(content).hexdigest()
+        outcome['content_sha256'] = content_hash
+
+        stored = store.get_analysis(content_hash)
+        if stored and stored['rules_version'] == rules_version:
+            outcome['status'] = 'duplicate'
+            return outcome, None
+        return outcome, content
+    except Exception as e:
+        outcome['error'] = str(e) or type(e).__name__
+        return outcome, None
+
+
+def import_file(outcome: dict, content: bytes) -> dict:
+    """OCR and analyze one checked file in a worker; returns its outcome with the report to store."""
+    import app
+    try:
+        filename = os.path.basename(outcome['path'])
+        content_hash = outcome['content_sha256']
+        text, ocr_metadata = _loop.run_until_complete(app.extract_report_text(filename, content))
+        if not text or not text.strip():
+            raise ValueError("No text could be extracted from the file")
+        results = _loop.run_until_complete(app.analyzer.analyze_medical_report(text))
+        result = app.build_analysis_result(results, filename, text, ocr_metadata, content_hash)
+        outcome['status'] = 'done'
+        outcome['report'] = {
+            'content_sha256': content_hash,
+            'filename': filename,
+            'text': text,
+            'ocr_metadata': ocr_metadata,
+            'rules_version': app.analyzer.rules_version,
+            'result': result.model_dump(exclude={'filename', 'cache'}),
+        }
+    except Exception as e:
+        outcome['error'] = getattr(e, 'detail', None) or str(e) or type(e).__name__
+    return outcome
+
+
+def import_checked(checked, workers: int, make_pool, work=import_file):
+    """Yield the outcome of every ``(outcome, content)`` pair from ``checked``.
+
+    Files with content are run through ``work`` in the pool from
+    ``make_pool()``, two per worker at most. When a worker dies, every file
+    in flight fails with it, so the pool is recreated and those files are
+    rerun one at a time: only a file that crashes a worker on its own is
+    recorded as failed.
+    """
+    pool = make_pool()
+    in_flight = {}
+    suspects = deque()
+    try:
+        while True:
+            isolating = bool(suspects) or any(isolated for _, _, isolated in in_flight.values())
+            while len(in_flight) < (1 if isolating else workers * 2):
+                if suspects:
+                    outcome, content = suspects.popleft()
+                    isolated = True
+                else:
+                    outcome, content = next(checked, (None, None))
+                    if outcome is None:
+                        break
+                    if content is None:
+                        yield outcome
+                        continue
+                    isolated = False
+                in_flight[pool.submit(work, outcome, content)] = (outcome, content, isolated)
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            crashed = False
+            for future in done:
+                outcome, content, isolated = in_flight.pop(future)
+                try:
+                    outcome = future.result()
+                except BrokenProcessPool as e:
+                    crashed = True
+                    if not isolated:
+                        suspects.append((outcome, content))
+                        continue
+                    outcome = dict(outcome, error=f"Worker process crashed: {e}")
+                except Exception as e:
+                    outcome = dict(outcome, error=str(e) or type(e).__name__)
+                yield outcome
+            if crashed:
+                logger.warning(f"A worker process died, restarting the pool and rerunning "
+                               f"{len(suspects) + len(in_flight)} files one at a time")
+                suspects.extend((outcome, content) for outcome, content, _ in in_flight.values())
+                in_flight.clear()
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = make_pool()
+    except BaseException:
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+
+
+def flush(store, checkpoint: ImportCheckpoint, outcomes: list):
+    """Save new reports, then mark their files done; a crash in between only redoes the batch."""
+    reports = [outcome['report'] for outcome in outcomes if 'report' in outcome]
+    if reports:
+        store.save_reports(reports)
+    checkpoint.record([(o['path'], o['size'], o['status'], o['content_sha256'], o['error']) for o in outcomes])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('source', help='directory tree or zip archive of reports')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--batch-size', type=int, default=100, help='reports saved per transaction')
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT, help='sqlite file recording progress')
+    parser.add_argument('--retry-failed', action='store_true', help='process files that failed in earlier runs')
+    parser.add_argument('--entities', action='store_true', help='run the NER model as well')
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    # Configure the analyzer before it is imported (spawned workers inherit the environment):
+    # parallelism comes from the file workers, so each one runs OCR inline
+    os.environ['MODEL_LOADING'] = 'lazy' if args.entities else 'off'
+    os.environ['CACHE_ENABLED'] = 'false'
+    os.environ['OCR_POOL_WORKERS'] = '0'
+    logging.basicConfig(level=logging.INFO)
+    import app
+
+    if app.report_store is None or app.analyzer is None:
+        sys.exit("Report store or analyzer unavailable (is REPORT_STORE_ENABLED set?)")
+    source = os.path.abspath(args.source)
+    if not os.path.isdir(source) and not zipfile.is_zipfile(source):
+        sys.exit(f"{args.source} is neither a directory nor a zip archive")
+
+    checkpoint = ImportCheckpoint(args.checkpoint, source)
+    files = list_files(source, app.allowed_file)
+    finished = checkpoint.finished(args.retry_failed)
+    todo = [(path, size) for path, size in files if finished.get(path) != size]
+    print(f"{len(files)} report files in {source}: {len(files) - len(todo)} already imported, {len(todo)} to go")
+    if args.dry_run or not todo:
+        return
+
+    start = time.perf_counter()
+    counts = Counter()
+    errors = Counter()
+    failed_paths = []
+    pending_outcomes = []
+    bytes_done = 0
+
+    def finish(outcome):
+        nonlocal bytes_done
+        counts[outcome['status']] += 1
+        bytes_done += outcome['size']
+        if outcome['status'] == 'failed':
+            errors[outcome['error']] += 1
+            failed_paths.append(outcome['path'])
+            logger.warning(f"Import of {outcome['path']} failed: {outcome['error']}")
+        pending_outcomes.append(outcome)
+
+    def checked_files():
+        # Read lazily, so the whole archive is never queued up front
+        for path, size in todo:
+            yield check_file(source, path, size, app.report_store, app.analyzer.rules_version, app.MAX_FILE_SIZE)
+
+    def make_pool():
+        # Spawned workers open their own sqlite connections instead of inheriting this process's
+        return ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                                   mp_context=multiprocessing.get_context('spawn'))
+
+    try:
+        for outcome in import_checked(checked_files(), args.workers, make_pool):
+            finish(outcome)
+            if len(pending_outcomes) >= args.batch_size:
+                flush(app.report_store, checkpoint, pending_outcomes)
+                pending_outcomes = []
+                processed = sum(counts.values())
+                elapsed = time.perf_counter() - start
+                print(f"  {processed}/{len(todo)} files  {processed / elapsed:.1f} files/s  "
+                      f"{counts['failed']} failed")
+    except KeyboardInterrupt:
+        print("Interrupted, saving finished files (run again to resume)")
+    finally:
+        flush(app.report_store, checkpoint, pending_outcomes)
+
+    elapsed = time.perf_counter() - start
+    processed = sum(counts.values())
+    print(f"\nProcessed {processed} files in {elapsed:.1f}s with {args.workers} workers: "
+          f"{processed / elapsed:.2f} files/s, {bytes_done / elapsed / (1024 * 1024):.2f} MB/s")
+    print(f"  imported {counts['done']}, already analyzed {counts['duplicate']}, failed {counts['failed']}")
+    if errors:
+        print("Errors:")
+        for error, count in errors.most_common(10):
+            print(f"  {count:6d}  {error}")
+        print("Failed files (first 10):")
+        for path in failed_paths[:10]:
+            print(f"  {path}")
+
+
+if __name__ == '__main__':
+    main()
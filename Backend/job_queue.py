@@ -0,0 +1,252 @@
+import os
+import json
+import asyncio
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import List, Dict, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "cache/jobs.sqlite3")
+JOBS_UPLOAD_DIR = os.getenv("JOBS_UPLOAD_DIR", "cache/job_uploads")
+# A running job whose runner has not renewed its lease for this long is
+# considered interrupted (server killed or restarted) and is queued again
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+# Attempts after which an interrupted job is failed instead of requeued
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+# Events after which a job emits nothing more
+TERMINAL_EVENTS = ('done', 'failed')
+
+
+class JobQueue:
+    """Persistent sqlite-backed queue of analysis jobs and their progress events.
+
+    Uploaded bytes are written under ``upload_dir`` and only the path is
+    queued, so queued and interrupted jobs survive a server restart. Runners
+    hold a lease on the job they process and renew it while working, so
+    several server processes can share one queue.
+    """
+
+    def __init__(self, db_path: str = JOBS_DB_PATH, upload_dir: str = JOBS_UPLOAD_DIR,
+                 lease_seconds: float = JOB_LEASE_SECONDS, max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.upload_dir = Path(upload_dir)
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                content_path TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                heartbeat_at REAL,
+                finished_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                progress TEXT,
+                result TEXT,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+            CREATE TABLE IF NOT EXISTS job_events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                event TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_job_events_job ON job_events (job_id, seq);
+        """)
+        columns = {row['name'] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if 'heartbeat_at' not in columns:
+            # Queue created before leases
+            try:
+                self._db.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+            except sqlite3.OperationalError:
+                pass  # Added by another process in the meantime
+
+    def submit(self, filename: str, content: bytes) -> str:
+        """Persist the upload and enqueue a job for it, returning the job id."""
+        job_id = uuid.uuid4().hex
+        content_path = self.upload_dir / f"{job_id}{Path(filename).suffix}"
+        content_path.write_bytes(content)
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, filename, content_path, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, filename, str(content_path), time.time())
+            )
+        self.add_event(job_id, 'queued', {'filename': filename})
+        return job_id
+
+    def claim(self, exclusive: bool = False) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest queued job to ``running`` and return it.
+
+        With ``exclusive``, nothing is claimed while another job is running
+        (in any process sharing the queue), so jobs run strictly one at a time.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                running = exclusive and self._db.execute(
+                    "SELECT 1 FROM jobs WHERE status = 'running' LIMIT 1"
+                ).fetchone() is not None
+                row = None if running else self._db.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    self._db.execute("COMMIT")
+                    return None
+                self._db.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, heartbeat_at = ?, attempts = attempts + 1 "
+                    "WHERE id = ?",
+                    (now, now, row['id'])
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        job = dict(row)
+        job['status'] = 'running'
+        return job
+
+    def heartbeat(self, job_id: str):
+        """Renew the lease on a running job."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'",
+                (time.time(), job_id)
+            )
+
+    async def hold_lease(self, job_id: str):
+        """Renew the lease on ``job_id`` until cancelled; run it as a task next to the job."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            await asyncio.to_thread(self.heartbeat, job_id)
+
+    def requeue_interrupted(self) -> int:
+        """Put running jobs whose lease expired back in the queue.
+
+        Jobs that already used ``max_attempts`` attempts are failed instead.
+        Jobs still being worked on renew their lease, so this is safe to call
+        from every process sharing the queue.
+        """
+        cutoff = time.time() - self.lease_seconds
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                expired = self._db.execute(
+                    "SELECT id, attempts FROM jobs WHERE status = 'running' "
+                    "AND COALESCE(heartbeat_at, started_at, 0) < ?",
+                    (cutoff,)
+                ).fetchall()
+                exhausted = [row['id'] for row in expired if row['attempts'] >= self.max_attempts]
+                requeued = [row['id'] for row in expired if row['attempts'] < self.max_attempts]
+                self._db.executemany(
+                    "UPDATE jobs SET status = 'queued', started_at = NULL, heartbeat_at = NULL WHERE id = ?",
+                    [(job_id,) for job_id in requeued]
+                )
+                self._db.executemany(
+                    "UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE id = ?",
+                    [(time.time(), self._exhausted_error(), job_id) for job_id in exhausted]
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        for job_id in exhausted:
+            self.add_event(job_id, 'failed', {'error': self._exhausted_error()})
+            self._remove_upload(job_id)
+        if requeued:
+            logger.info(f"Requeued {len(requeued)} interrupted jobs")
+        if exhausted:
+            logger.warning(f"Failed {len(exhausted)} jobs interrupted {self.max_attempts} times")
+        return len(requeued)
+
+    def _exhausted_error(self) -> str:
+        return f"Job was interrupted {self.max_attempts} times"
+
+    def add_event(self, job_id: str, event: str, data: Dict[str, Any]):
+        """Append a progress event; the latest one is also kept as the job's progress."""
+        payload = json.dumps(data)
+        # The result is already stored on the job row, keep the progress summary small
+        progress = {'event': event} if event == 'done' else {'event': event, **data}
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO job_events (job_id, event, data, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, event, payload, time.time())
+            )
+            self._db.execute(
+                "UPDATE jobs SET progress = ? WHERE id = ?",
+                (json.dumps(progress), job_id)
+            )
+
+    def complete(self, job_id: str, result: Dict[str, Any]):
+        """Store the analysis result and mark the job done."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'done', finished_at = ?, result = ? WHERE id = ?",
+                (time.time(), json.dumps(result), job_id)
+            )
+        self.add_event(job_id, 'done', {'result': result})
+        self._remove_upload(job_id)
+
+    def fail(self, job_id: str, error: str):
+        """Mark the job failed with ``error``."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE id = ?",
+                (time.time(), error, job_id)
+            )
+        self.add_event(job_id, 'failed', {'error': error})
+        self._remove_upload(job_id)
+
+    def _remove_upload(self, job_id: str):
+        job = self.get(job_id)
+        if job:
+            try:
+                os.unlink(job['content_path'])
+            except OSError:
+                pass
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the job row with JSON columns decoded, or None."""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        for column in ('progress', 'result'):
+            if job[column] is not None:
+                job[column] = json.loads(job[column])
+        return job
+
+    def events_since(self, job_id: str, after_seq: int = 0) -> List[Dict[str, Any]]:
+        """Return the job's events with a sequence number greater than ``after_seq``."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, event, data FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, after_seq)
+            ).fetchall()
+        return [{'seq': row['seq'], 'event': row['event'], 'data': json.loads(row['data'])} for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        """Job counts per status."""
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {row[0]: row[1] for row in rows}
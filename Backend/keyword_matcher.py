@@ -0,0 +1,181 @@
+import os
+import re
+import json
+import hashlib
+import logging
+from pathlib import Path
+from typing import List, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DISEASE_RULES_FILE = Path(__file__).parent / 'rules' / 'disease_rules.json'
+
+# Bump when the cached automaton layout changes
+AUTOMATON_FORMAT = 2
+
+
+def load_disease_rules(path=DEFAULT_DISEASE_RULES_FILE) -> Dict[str, Dict[str, List[str]]]:
+    """Load the disease keyword/pattern vocabulary from JSON."""
+    with open(path, 'r', encoding='utf-8') as f:
+        disease_patterns = json.load(f)
+    logger.info(f"Loaded {len(disease_patterns)} disease rules from {path}")
+    return disease_patterns
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher: finds every keyword in one linear scan."""
+
+    def __init__(self, keywords: List[str]):
+        self.keywords = keywords
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[tuple] = [()]
+
+        for keyword_id, keyword in enumerate(keywords):
+            state = 0
+            for char in keyword:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(())
+                state = next_state
+            self.output[state] += (keyword_id,)
+
+        # Breadth-first pass to set failure links and merge outputs along them
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] += self.output[self.fail[next_state]]
+
+    def to_tables(self) -> Dict[str, list]:
+        """The automaton as plain JSON-serializable tables."""
+        return {'goto': self.goto, 'fail': self.fail, 'output': [list(ids) for ids in self.output]}
+
+    @classmethod
+    def from_tables(cls, keywords: List[str], tables: Dict[str, list]) -> 'AhoCorasick':
+        """Rebuild an automaton from ``to_tables`` output, checking the tables are consistent."""
+        goto, fail, output = tables['goto'], tables['fail'], tables['output']
+        states = len(goto)
+        if not (states == len(fail) == len(output)) or not states:
+            raise ValueError("Automaton tables have mismatched lengths")
+        for transitions, fallback, ids in zip(goto, fail, output):
+            if not isinstance(transitions, dict) or not isinstance(fallback, int) or not 0 <= fallback < states:
+                raise ValueError("Malformed automaton state")
+            if any(not isinstance(state, int) or not 0 <= state < states for state in transitions.values()):
+                raise ValueError("Automaton transition out of range")
+            if any(not isinstance(i, int) or not 0 <= i < len(keywords) for i in ids):
+                raise ValueError("Automaton output out of range")
+        automaton = cls.__new__(cls)
+        automaton.keywords = keywords
+        automaton.goto = goto
+        automaton.fail = fail
+        automaton.output = [tuple(ids) for ids in output]
+        return automaton
+
+    def find_ids(self, text: str) -> set:
+        """Return the ids of every keyword occurring in ``text``."""
+        goto, fail, output = self.goto, self.fail, self.output
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+class DiseaseMatcher:
+    """Scores diseases by keyword hits (one automaton scan) and regex pattern hits.
+
+    Scoring matches the original keyword loop: +1 per listed keyword present
+    anywhere in the text (case-insensitive substring), +2 per pattern match,
+    confidence ``min(score / 3.0, 1.0)``.
+    """
+
+    def __init__(self, disease_patterns: Dict[str, Dict[str, List[str]]], cache_path: Optional[str] = None):
+        self.diseases = list(disease_patterns)
+
+        # Each unique keyword maps to every (disease) entry listing it
+        keyword_ids: Dict[str, int] = {}
+        self.keyword_diseases: List[List[int]] = []
+        for disease_index, disease in enumerate(self.diseases):
+            for keyword in disease_patterns[disease].get('keywords', []):
+                keyword = keyword.lower()
+                if keyword not in keyword_ids:
+                    keyword_ids[keyword] = len(keyword_ids)
+                    self.keyword_diseases.append([])
+                self.keyword_diseases[keyword_ids[keyword]].append(disease_index)
+
+        self.patterns = [
+            [re.compile(pattern, re.IGNORECASE) for pattern in disease_patterns[disease].get('patterns', [])]
+            for disease in self.diseases
+        ]
+        self.automaton = self._load_or_build(list(keyword_ids), cache_path)
+
+    @staticmethod
+    def _load_or_build(keywords: List[str], cache_path: Optional[str]) -> AhoCorasick:
+        """Reuse a cached automaton when it was built from the same keyword list.
+
+        The cache is plain JSON, so a tampered file can at worst produce
+        wrong matches (and is rejected if its tables are inconsistent); it is
+        never executed.
+        """
+        vocabulary_hash = hashlib.sha256(
+            json.dumps([AUTOMATON_FORMAT, keywords]).encode()
+        ).hexdigest()
+
+        if cache_path and os.path.exists(cache_path):
+            try:
+                with open(cache_path, 'r', encoding='utf-8') as f:
+                    cached = json.load(f)
+                if cached.get('vocabulary_hash') == vocabulary_hash:
+                    automaton = AhoCorasick.from_tables(keywords, cached['tables'])
+                    logger.info(f"Loaded keyword automaton from {cache_path}")
+                    return automaton
+            except Exception as e:
+                logger.warning(f"Could not load keyword automaton cache: {e}")
+
+        automaton = AhoCorasick(keywords)
+        logger.info(f"Built keyword automaton: {len(keywords)} keywords, {len(automaton.goto)} states")
+
+        if cache_path:
+            try:
+                directory = os.path.dirname(cache_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                temp_path = f"{cache_path}.tmp"
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump({'vocabulary_hash': vocabulary_hash, 'tables': automaton.to_tables()}, f)
+                os.replace(temp_path, cache_path)
+            except Exception as e:
+                logger.warning(f"Could not write keyword automaton cache: {e}")
+        return automaton
+
+    def match(self, text: str) -> tuple:
+        """Return (detected_diseases, confidence_scores) for ``text``."""
+        scores = [0] * len(self.diseases)
+        for keyword_id in self.automaton.find_ids(text.lower()):
+            for disease_index in self.keyword_diseases[keyword_id]:
+                scores[disease_index] += 1
+
+        detected_diseases = []
+        confidence_scores = {}
+        for disease_index, disease in enumerate(self.diseases):
+            score = scores[disease_index]
+            for pattern in self.patterns[disease_index]:
+                score += len(pattern.findall(text)) * 2
+            if score > 0:
+                detected_diseases.append(disease)
+                confidence_scores[disease] = min(score / 3.0, 1.0)
+                logger.debug(f"Detected {disease} with score {score}")
+        return detected_diseases, confidence_scores
@@ -0,0 +1,218 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Optional, Any, Callable
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+# Chunking of the medical knowledge base (larger chunks for medical context)
+KB_CHUNK_SIZE = int(os.getenv("KB_CHUNK_SIZE", "800"))
+KB_CHUNK_OVERLAP = int(os.getenv("KB_CHUNK_OVERLAP", "100"))
+KB_SEPARATORS = ["\n\n", "\n", ".", "!", "?", ",", " ", ""]
+# Chunks embedded / written to Chroma per call
+KB_BATCH_SIZE = int(os.getenv("KB_BATCH_SIZE", "64"))
+
+MANIFEST_NAME = "kb_manifest.json"
+COLLECTION_PREFIX = "medichain_kb_"
+# Collection written by Chroma.from_documents before indexes were versioned
+LEGACY_COLLECTION = "langchain"
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def index_version(hashes) -> str:
+    """Version of an index: a fingerprint of the set of chunks it holds."""
+    return hashlib.sha256("\n".join(sorted(hashes)).encode('utf-8')).hexdigest()[:16]
+
+
+class KnowledgeBaseIndex:
+    """Versioned Chroma collections of the medical knowledge base, keyed by chunk content hash.
+
+    Every ingestion builds a complete new collection next to the one being
+    queried: chunks whose text is already indexed are copied over with their
+    stored embeddings, only new or changed chunks are embedded, and chunks no
+    longer in the source are left behind. The manifest naming the current
+    collection is then replaced atomically. The previous collection is kept
+    until the next ingestion so queries still running against it can finish.
+    Other processes serving the same directory pick up the new collection
+    with ``current_if_changed``.
+    """
+
+    def __init__(self, persist_directory, embeddings, chroma_cls, splitter_cls):
+        self.persist_directory = Path(persist_directory)
+        self.persist_directory.mkdir(parents=True, exist_ok=True)
+        self.embeddings = embeddings
+        self._chroma = chroma_cls
+        self._splitter = splitter_cls(chunk_size=KB_CHUNK_SIZE, chunk_overlap=KB_CHUNK_OVERLAP,
+                                      separators=KB_SEPARATORS)
+        self.manifest_path = self.persist_directory / MANIFEST_NAME
+        self._manifest_stamp = None
+
+    @property
+    def manifest(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, collection_name: str):
+        return self._chroma(collection_name=collection_name, persist_directory=str(self.persist_directory),
+                            embedding_function=self.embeddings)
+
+    def open_current(self):
+        """The vector store the manifest points at, or None before the first ingestion."""
+        manifest = self.manifest
+        if manifest is None:
+            return None
+        return self._store(manifest['collection'])
+
+    def current_if_changed(self, version: Optional[str]):
+        """``(store, version)`` of the current index when it is not ``version``, else None.
+
+        Only stats the manifest unless it was replaced since the last call,
+        so every server process can poll it cheaply.
+        """
+        try:
+            stat = os.stat(self.manifest_path)
+        except OSError:
+            return None
+        stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if stamp == self._manifest_stamp:
+            return None
+        manifest = self.manifest
+        if manifest is None:
+            return None
+        self._manifest_stamp = stamp
+        if manifest['version'] == version:
+            return None
+        logger.info(f"Knowledge base version {manifest['version']} became current, switching from {version}")
+        return self._store(manifest['collection']), manifest['version']
+
+    def split(self, text: str) -> Dict[str, str]:
+        """Chunks of ``text`` by content hash, in document order, without repeats."""
+        chunks = {}
+        for chunk in self._splitter.split_text(text):
+            chunks.setdefault(chunk_hash(chunk), chunk)
+        return chunks
+
+    @staticmethod
+    def _indexed(store) -> Dict[str, Any]:
+        """``{chunk hash: embedding}`` of everything in ``store``'s collection."""
+        collection = getattr(store, '_collection', None)
+        if collection is None:
+            return {}
+        rows = collection.get(include=['embeddings', 'documents'])
+        embeddings = rows.get('embeddings')
+        if embeddings is None:
+            return {}
+        # Hash the text rather than trusting ids, so unversioned collections can be reused too
+        return {chunk_hash(document): embedding for document, embedding in zip(rows['documents'], embeddings)}
+
+    def ingest(self, data_file: str, source: str, current_store=None,
+               progress: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        """Build the index for ``data_file`` and make it current.
+
+        Returns ``(store, summary)``. When the file holds exactly the chunks
+        already indexed, ``current_store`` is returned unchanged.
+        """
+        start = time.perf_counter()
+        notify = progress or (lambda event, data: None)
+        with open(data_file, 'r', encoding='utf-8') as f:
+            chunks = self.split(f.read())
+        indexed = self._indexed(current_store) if current_store is not None else {}
+        current_manifest = self.manifest
+        version = index_version(chunks)
+
+        new = [h for h in chunks if h not in indexed]
+        reused = [h for h in chunks if h in indexed]
+        removed = len(set(indexed) - set(chunks))
+        summary = {
+            'version': version,
+            'previous_version': current_manifest['version'] if current_manifest else None,
+            'chunks': len(chunks),
+            'embedded': len(new),
+            'reused': len(reused),
+            'removed': removed,
+        }
+        notify('chunked', dict(summary))
+
+        if current_manifest and current_manifest['version'] == version and current_store is not None:
+            summary.update(unchanged=True, elapsed_ms=round((time.perf_counter() - start) * 1000, 2))
+            return current_store, summary
+
+        collection_name = f"{COLLECTION_PREFIX}{version}"
+        current_name = getattr(getattr(current_store, '_collection', None), 'name', None)
+        store = self._store(collection_name)
+        if collection_name != current_name and store._collection.count():
+            # Left over from an interrupted ingestion
+            store.delete_collection()
+            store = self._store(collection_name)
+
+        for i in range(0, len(reused), KB_BATCH_SIZE):
+            batch = reused[i:i + KB_BATCH_SIZE]
+            store._collection.add(
+                ids=batch,
+                embeddings=[indexed[h] for h in batch],
+                documents=[chunks[h] for h in batch],
+                metadatas=[{'source': source, 'chunk_hash': h} for h in batch]
+            )
+
+        embed_start = time.perf_counter()
+        for i in range(0, len(new), KB_BATCH_SIZE):
+            batch = new[i:i + KB_BATCH_SIZE]
+            store._collection.add(
+                ids=batch,
+                embeddings=self.embeddings.embed_documents([chunks[h] for h in batch]),
+                documents=[chunks[h] for h in batch],
+                metadatas=[{'source': source, 'chunk_hash': h} for h in batch]
+            )
+            notify('embedding', {'done': i + len(batch), 'total': len(new)})
+        embed_ms = (time.perf_counter() - embed_start) * 1000
+        if hasattr(store, 'persist'):
+            store.persist()
+
+        self._write_manifest({
+            'collection': collection_name,
+            'version': version,
+            'chunks': len(chunks),
+            'source': source,
+            'updated_at': time.time()
+        })
+        self._drop_collections(store, keep={collection_name, current_name})
+        summary.update(unchanged=False, embed_ms=round(embed_ms, 2),
+                       elapsed_ms=round((time.perf_counter() - start) * 1000, 2))
+        logger.info(f"Knowledge base version {version}: {len(chunks)} chunks, "
+                    f"{len(new)} embedded, {len(reused)} reused, {removed} removed")
+        return store, summary
+
+    def _write_manifest(self, manifest: Dict[str, Any]):
+        """Replace the manifest in one step, so readers see the old or the new one."""
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+
+    @staticmethod
+    def _drop_collections(store, keep):
+        """Delete index collections other than ``keep`` (older versions, the legacy collection)."""
+        client = getattr(store, '_client', None)
+        if client is None:
+            return
+        try:
+            for collection in client.list_collections():
+                # Collection objects in older chromadb, names in newer
+                name = getattr(collection, 'name', collection)
+                if name not in keep and (name.startswith(COLLECTION_PREFIX) or name == LEGACY_COLLECTION):
+                    client.delete_collection(name)
+                    logger.info(f"Dropped old knowledge base collection {name}")
+        except Exception as e:
+            logger.warning(f"Could not drop old knowledge base collections: {e}")
@@ -0,0 +1,105 @@
+import logging
+from typing import List, Dict, Optional, Any
+
+import numpy as np
+
+from lab_engine import NORMAL_STATUSES
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_STATUS = 'unknown'
+
+
+class _CompiledRanges:
+    """One analyte's ranges flattened into elementary intervals.
+
+    The sorted unique bounds ``b0 < b1 < ... < bn-1`` split the number line
+    into ``2n + 1`` cells: each bound itself (odd cells) and the open gaps
+    around them (even cells). Range membership is constant inside a cell, so
+    the status of each cell is decided once, with the same first-match rule
+    as ``analyze_lab_values``, and classifying a value is a single binary
+    search.
+    """
+
+    def __init__(self, ranges: List[tuple], status_codes: Dict[str, int]):
+        self.bounds = np.unique(np.array(
+            [bound for min_val, max_val, _ in ranges for bound in (min_val, max_val)], dtype=np.float64
+        ))
+        cell_codes = [self._first_match(ranges, value, status_codes) for value in self._representatives()]
+        self.cell_codes = np.array(cell_codes, dtype=np.int16)
+
+    def _representatives(self) -> List[Optional[float]]:
+        """A value inside each cell; None for the (empty) cell above an infinite bound."""
+        bounds = self.bounds.tolist()
+        if not bounds:
+            return [None]
+        values = [bounds[0] - 1.0]
+        for i, bound in enumerate(bounds):
+            values.append(bound)
+            if i + 1 < len(bounds) and np.isfinite(bounds[i + 1]):
+                values.append((bound + bounds[i + 1]) / 2)
+            else:
+                values.append(bound + 1.0 if np.isfinite(bound) else None)
+        return values
+
+    @staticmethod
+    def _first_match(ranges: List[tuple], value: Optional[float], status_codes: Dict[str, int]) -> int:
+        if value is not None:
+            for min_val, max_val, range_status in ranges:
+                if min_val <= value <= max_val:
+                    return status_codes[range_status]
+        return status_codes[UNKNOWN_STATUS]
+
+    def classify(self, values: np.ndarray) -> np.ndarray:
+        index = np.searchsorted(self.bounds, values, side='left')
+        on_bound = index < len(self.bounds)
+        on_bound[on_bound] = self.bounds[index[on_bound]] == values[on_bound]
+        cells = 2 * index + on_bound
+        codes = self.cell_codes[cells]
+        # NaN (missing values) sort past every bound; they match no range
+        codes[np.isnan(values)] = 0
+        return codes
+
+
+class CohortLabClassifier:
+    """Classifies columns of lab values for many patients at once.
+
+    Statuses are returned as small integer codes into ``status_names``
+    (code 0 is ``unknown``) together with an ``abnormal`` flag, matching
+    ``MedicalReportAnalyzer.analyze_lab_values`` value for value.
+    """
+
+    def __init__(self, lab_ranges: Dict[str, Dict[str, Any]], normal_statuses=NORMAL_STATUSES):
+        self.status_names = [UNKNOWN_STATUS]
+        for lab_info in lab_ranges.values():
+            for _, _, range_status in lab_info['ranges']:
+                if range_status not in self.status_names:
+                    self.status_names.append(range_status)
+        status_codes = {name: code for code, name in enumerate(self.status_names)}
+
+        self.compiled = {
+            lab_name: _CompiledRanges(lab_info['ranges'], status_codes)
+            for lab_name, lab_info in lab_ranges.items()
+        }
+        self.normal_codes = np.array([name in normal_statuses for name in self.status_names])
+        logger.info(f"Compiled cohort classifier for {len(self.compiled)} analytes")
+
+    def classify(self, lab_name: str, values) -> tuple:
+        """Return (status_codes, abnormal) arrays for one analyte's values.
+
+        Missing values may be given as NaN (or None in a list) and classify
+        as ``unknown``. Raises KeyError for an analyte without rules.
+        """
+        compiled = self.compiled[lab_name]
+        values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+        codes = compiled.classify(values)
+        return codes, ~self.normal_codes[codes]
+
+    def classify_columns(self, columns: Dict[str, Any]) -> Dict[str, tuple]:
+        """Classify several analytes given as ``{lab_name: values}``."""
+        return {lab_name: self.classify(lab_name, values) for lab_name, values in columns.items()}
+
+    def status_counts(self, codes: np.ndarray) -> Dict[str, int]:
+        """Number of values per status name (statuses that occur only)."""
+        counts = np.bincount(codes, minlength=len(self.status_names))
+        return {self.status_names[code]: int(count) for code, count in enumerate(counts) if count}
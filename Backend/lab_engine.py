@@ -0,0 +1,229 @@
+import re
+import json
+import logging
+from pathlib import Path
+from typing import List, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LAB_RULES_FILE = Path(__file__).parent / 'rules' / 'lab_rules.json'
+
+# Characters either side of a match searched for unit hints
+UNIT_CONTEXT_CHARS = 50
+
+# Range statuses that count as a normal result
+NORMAL_STATUSES = ('normal', 'optimal', 'good', 'normal_female', 'normal_male')
+
+
+def load_lab_rules(path=DEFAULT_LAB_RULES_FILE) -> Dict[str, Dict[str, Any]]:
+    """Load lab rule tables from JSON into the ``lab_ranges`` structure.
+
+    Ranges are stored as ``[min, max, status]`` with ``null`` meaning an open
+    upper bound; they are returned as ``(min, max, status)`` tuples with
+    ``float('inf')`` in its place.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        raw = json.load(f)
+
+    lab_ranges = {}
+    for lab_name, lab_info in raw.items():
+        lab_info = dict(lab_info)
+        lab_info['ranges'] = [
+            (min_val, float('inf') if max_val is None else max_val, range_status)
+            for min_val, max_val, range_status in lab_info['ranges']
+        ]
+        lab_ranges[lab_name] = lab_info
+    logger.info(f"Loaded {len(lab_ranges)} lab rules from {path}")
+    return lab_ranges
+
+
+def _has_top_level_alternation(pattern: str) -> bool:
+    """Whether ``pattern`` has a ``|`` outside any group or character class."""
+    depth = 0
+    in_class = False
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            i += 2
+            continue
+        if in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+            # A ']' straight after '[' or '[^' is a literal
+            if pattern[i + 1:i + 2] == '^':
+                i += 1
+            if pattern[i + 1:i + 2] == ']':
+                i += 1
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == '|' and depth == 0:
+            return True
+        i += 1
+    return False
+
+
+def _literal_lead(pattern: str) -> str:
+    """Return the literal text every match of ``pattern`` must start with (lowercased).
+
+    Empty when matches need not share a literal start (a top-level ``|``, or
+    a pattern opening with a group, class or inline flag); such rules are
+    always tried.
+    """
+    if _has_top_level_alternation(pattern):
+        return ''
+    lead = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\' and i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+            char, step = pattern[i + 1], 2
+        elif char.isalnum() or char in ' -/%:':
+            step = 1
+        else:
+            break
+        # A quantifier makes the preceding character optional or repeatable
+        if i + step < len(pattern) and pattern[i + step] in '*?{+':
+            break
+        lead.append(char.lower())
+        i += step
+    return "".join(lead)
+
+
+def _trie_regex(words: List[str]) -> str:
+    """Build a prefix-factored alternation matching any of ``words``."""
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def emit(node):
+        optional = '' in node
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if optional:
+            body = '(?:' + body + ')?'
+        return body
+
+    return emit(trie)
+
+
+class _Rule:
+    __slots__ = ('lab_name', 'priority', 'pattern', 'order', 'lead')
+
+    def __init__(self, lab_name: str, priority: int, pattern: str, order: int):
+        self.lab_name = lab_name
+        self.priority = priority
+        self.pattern = re.compile(pattern, re.IGNORECASE)
+        self.order = order
+        self.lead = _literal_lead(pattern)
+
+
+class LabExtractionEngine:
+    """Finds every analyte in one scan of the report text.
+
+    The literal lead of every pattern (``glucose``, ``blood``, ``hba1c`` ...)
+    is compiled once into a single prefix-factored trigger regex. One scan
+    with it yields each position where some analyte can start; only the rules
+    whose lead sits at that position are then tried there. Results match the
+    per-pattern loop it replaces: for each lab the earliest match of its
+    highest-priority (first listed) matching pattern wins.
+    """
+
+    def __init__(self, lab_ranges: Dict[str, Dict[str, Any]]):
+        self.rules: List[_Rule] = []
+        self.unit_conversions: Dict[str, Dict[str, float]] = {}
+        self._lab_order = {lab_name: i for i, lab_name in enumerate(lab_ranges)}
+
+        for lab_name, lab_info in lab_ranges.items():
+            for priority, pattern in enumerate(lab_info['patterns']):
+                self.rules.append(_Rule(lab_name, priority, pattern, len(self.rules)))
+            if lab_info.get('unit_conversions'):
+                self.unit_conversions[lab_name] = lab_info['unit_conversions']
+
+        # Rules without a literal lead cannot be triggered and are searched on their own
+        self._untriggered = [rule for rule in self.rules if not rule.lead]
+        self._rules_by_lead: Dict[str, List[_Rule]] = {}
+        for rule in self.rules:
+            if rule.lead:
+                self._rules_by_lead.setdefault(rule.lead, []).append(rule)
+        self._lead_lengths = sorted({len(lead) for lead in self._rules_by_lead})
+        self.trigger = re.compile(_trie_regex(list(self._rules_by_lead)), re.IGNORECASE) \
+            if self._rules_by_lead else None
+
+    def _convert_units(self, lab_name: str, context: str, value: float) -> float:
+        """Apply the first configured unit conversion whose unit appears in the match context."""
+        for unit, conversion_factor in self.unit_conversions.get(lab_name, {}).items():
+            if unit in context:
+                return value * conversion_factor
+        return value
+
+    def _offer(self, best: Dict[str, tuple], rule: _Rule, match) -> bool:
+        """Record ``match`` for ``rule`` if it beats the lab's current value."""
+        current = best.get(rule.lab_name)
+        if current is not None and current[0] <= rule.priority:
+            return False
+        try:
+            # With a top-level '|' each alternative captures the value in its own group
+            value = float(next((group for group in match.groups() if group is not None), None))
+        except (TypeError, ValueError, IndexError) as e:
+            logger.debug(f"Error parsing value for {rule.lab_name}: {e}")
+            return False
+        best[rule.lab_name] = (rule.priority, value, match.span())
+        return True
+
+    def extract(self, text: str) -> Dict[str, float]:
+        """Extract ``{lab_name: value}`` from ``text``."""
+        best: Dict[str, tuple] = {}
+        # Labs holding a match of their first pattern; a lab reaches priority 0 at most once
+        exact = 0
+
+        for rule in self._untriggered:
+            for match in rule.pattern.finditer(text):
+                if self._offer(best, rule, match):
+                    exact += rule.priority == 0
+                    break
+
+        position = 0
+        while self.trigger is not None:
+            hit = self.trigger.search(text, position)
+            if hit is None:
+                break
+            position = hit.start()
+            candidates = []
+            for length in self._lead_lengths:
+                candidates.extend(self._rules_by_lead.get(text[position:position + length].lower(), ()))
+            for rule in sorted(candidates, key=lambda r: r.order):
+                current = best.get(rule.lab_name)
+                if current is not None and current[0] <= rule.priority:
+                    continue
+                # A pattern's first match is at the first trigger position where it matches
+                match = rule.pattern.match(text, position)
+                while match is not None:
+                    if self._offer(best, rule, match):
+                        exact += rule.priority == 0
+                        break
+                    match = rule.pattern.search(text, match.end() or position + 1)
+
+            # Nothing can improve once every lab matched its first pattern
+            if exact == len(self._lab_order):
+                break
+            # Leads may overlap, so resume one character later rather than after the hit
+            position += 1
+
+        extracted_values = {}
+        for lab_name in sorted(best, key=self._lab_order.get):
+            _, value, (start, end) = best[lab_name]
+            if lab_name in self.unit_conversions:
+                context = text[max(0, start - UNIT_CONTEXT_CHARS):end + UNIT_CONTEXT_CHARS].lower()
+                value = self._convert_units(lab_name, context, value)
+            extracted_values[lab_name] = value
+            logger.debug(f"Found {lab_name}: {value}")
+        return extracted_values
@@ -0,0 +1,157 @@
+import os
+import re
+import logging
+import threading
+from typing import List, Dict, Optional, Any
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+LAB_TRENDS_ENABLED = os.getenv("LAB_TRENDS_ENABLED", "true").lower() in ("1", "true", "yes")
+LAB_TRENDS_PATH = os.getenv("LAB_TRENDS_PATH", "cache/lab_trends")
+# Default number of points in the rolling window
+LAB_TRENDS_WINDOW = int(os.getenv("LAB_TRENDS_WINDOW", "3"))
+
+# One fixed-size record per observation; files are plain arrays of these
+RECORD_DTYPE = np.dtype([('observed_at', '<f8'), ('value', '<f8'), ('report', '<u8')])
+
+# Patient ids and lab names become path components
+_SAFE_NAME = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+
+_SECONDS_PER_YEAR = 365.25 * 24 * 3600
+
+
+def report_key(content_hash: str) -> int:
+    """64-bit report identifier taken from the report's SHA-256."""
+    return int(content_hash[:16], 16)
+
+
+class LabTrendStore:
+    """Append-only columnar time series of lab values, one file per patient and analyte.
+
+    ``<root>/<patient_id>/<lab_name>.bin`` holds ``RECORD_DTYPE`` records in
+    arrival order. Appends are a single ``write`` of a few records, and a
+    patient's whole history of one analyte is read back with one
+    ``np.fromfile``, so trend queries stay in the millisecond range for
+    hundreds of reports. Observations are sorted by time at read time, as
+    reports can be uploaded out of order.
+    """
+
+    def __init__(self, root: str = LAB_TRENDS_PATH):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def check_name(kind: str, name: str):
+        """Raise ValueError unless ``name`` is safe to use as a file name."""
+        if not _SAFE_NAME.match(name or '') or name in ('.', '..'):
+            raise ValueError(f"Invalid {kind} '{name}': use 1-64 letters, digits, '_', '-' or '.'")
+
+    def _path(self, patient_id: str, lab_name: str) -> str:
+        return os.path.join(self.root, patient_id, f"{lab_name}.bin")
+
+    def _read(self, path: str) -> np.ndarray:
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        # Ignore a partially written trailing record
+        return np.fromfile(path, dtype=RECORD_DTYPE, count=size // RECORD_DTYPE.itemsize)
+
+    def append(self, patient_id: str, lab_values: Dict[str, float], observed_at: float,
+               content_hash: str) -> int:
+        """Record one report's lab values; returns the number of new observations.
+
+        A report already recorded for the patient (same content hash) is
+        skipped, so re-uploading or re-analyzing it does not add points.
+        """
+        self.check_name("patient id", patient_id)
+        key = report_key(content_hash)
+        added = 0
+        with self._lock:
+            os.makedirs(os.path.join(self.root, patient_id), exist_ok=True)
+            for lab_name, value in lab_values.items():
+                self.check_name("lab name", lab_name)
+                path = self._path(patient_id, lab_name)
+                if np.any(self._read(path)['report'] == key):
+                    continue
+                record = np.array([(observed_at, value, key)], dtype=RECORD_DTYPE)
+                with open(path, 'ab') as f:
+                    f.write(record.tobytes())
+                added += 1
+        return added
+
+    def labs(self, patient_id: str) -> List[str]:
+        """Analytes with at least one observation for the patient."""
+        self.check_name("patient id", patient_id)
+        directory = os.path.join(self.root, patient_id)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-4] for name in os.listdir(directory) if name.endswith('.bin'))
+
+    def series(self, patient_id: str, lab_name: str, since: Optional[float] = None,
+               until: Optional[float] = None) -> tuple:
+        """Return (observed_at, values) arrays in time order, optionally limited to [since, until)."""
+        self.check_name("patient id", patient_id)
+        self.check_name("lab name", lab_name)
+        records = self._read(self._path(patient_id, lab_name))
+        records = records[np.argsort(records['observed_at'], kind='stable')]
+        times = records['observed_at']
+        start = 0 if since is None else np.searchsorted(times, since, side='left')
+        end = len(times) if until is None else np.searchsorted(times, until, side='left')
+        return times[start:end], records['value'][start:end]
+
+    def trend(self, patient_id: str, lab_name: str, window: Optional[int] = None,
+              since: Optional[float] = None, until: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Series, rolling statistics and latest value of one analyte, or None without observations.
+
+        Rolling mean/min/max are over the last ``window`` observations and
+        are None until the window is full. ``slope_per_year`` is a least
+        squares fit over the selected points.
+        """
+        times, values = self.series(patient_id, lab_name, since, until)
+        if len(values) == 0:
+            return None
+        window = max(1, min(window or LAB_TRENDS_WINDOW, len(values)))
+
+        sums = np.cumsum(np.concatenate(([0.0], values)))
+        rolling_mean = (sums[window:] - sums[:-window]) / window
+        windows = np.lib.stride_tricks.sliding_window_view(values, window)
+        padding = [None] * (window - 1)
+
+        slope = None
+        if len(values) > 1 and times[-1] > times[0]:
+            slope = float(np.polyfit((times - times[0]) / _SECONDS_PER_YEAR, values, 1)[0])
+
+        return {
+            'observed_at': times.tolist(),
+            'values': values.tolist(),
+            'window': window,
+            'rolling_mean': padding + rolling_mean.tolist(),
+            'rolling_min': padding + windows.min(axis=1).tolist(),
+            'rolling_max': padding + windows.max(axis=1).tolist(),
+            'latest': {
+                'observed_at': float(times[-1]),
+                'value': float(values[-1]),
+                'change': float(values[-1] - values[-2]) if len(values) > 1 else None,
+            },
+            'count': len(values),
+            'min': float(values.min()),
+            'max': float(values.max()),
+            'mean': float(values.mean()),
+            'slope_per_year': slope,
+        }
+
+
+def create_store() -> Optional[LabTrendStore]:
+    """Create the lab trend store, or return None when disabled or unavailable."""
+    if not LAB_TRENDS_ENABLED:
+        return None
+    try:
+        return LabTrendStore()
+    except Exception as e:
+        logger.warning(f"Could not initialize lab trend store: {e}")
+        return None
@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import random
+import asyncio
+import contextlib
+import logging
+from typing import List, Dict, Optional, Any, AsyncIterator
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+# OpenAI-compatible chat completions endpoint; point it at llm_stub.py for local testing
+LLM_API_URL = os.getenv("LLM_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+LLM_API_KEY = os.getenv("LLM_API_KEY") or os.getenv("GROQ_API_KEY")
+LLM_MODEL = os.getenv("LLM_MODEL", "llama3-70b-8192")
+# Completions in flight at once (further callers wait), and keep-alive connections kept open
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+LLM_POOL_CONNECTIONS = int(os.getenv("LLM_POOL_CONNECTIONS", str(LLM_MAX_IN_FLIGHT)))
+# Per-request timeouts in seconds (total per attempt, and for opening a connection)
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+# Retries on 429/5xx and connection errors, with full-jitter exponential backoff
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "8"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """A completion that failed for good (after retries, or with a non-retryable status)."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, attempts: int = 1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.attempts = attempts
+
+
+class AsyncLLMClient:
+    """Non-blocking client for an OpenAI-compatible chat completions API.
+
+    One ``httpx.AsyncClient`` (and its keep-alive connection pool) is shared
+    by all requests. A semaphore caps the requests in flight; a request being
+    retried keeps its slot, so a struggling upstream is not hit harder.
+    """
+
+    def __init__(self, url: str = LLM_API_URL, api_key: Optional[str] = LLM_API_KEY,
+                 model: str = LLM_MODEL, max_in_flight: int = LLM_MAX_IN_FLIGHT,
+                 pool_connections: int = LLM_POOL_CONNECTIONS, timeout: float = LLM_TIMEOUT_SECONDS,
+                 connect_timeout: float = LLM_CONNECT_TIMEOUT_SECONDS, max_retries: int = LLM_MAX_RETRIES,
+                 backoff_base: float = LLM_BACKOFF_BASE_SECONDS, backoff_max: float = LLM_BACKOFF_MAX_SECONDS):
+        self.url = url
+        self.api_key = api_key
+        self.model = model
+        self.max_in_flight = max_in_flight
+        self.pool_connections = pool_connections
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.stats = {'requests': 0, 'retries': 0, 'failures': 0, 'in_flight': 0, 'waiting': 0}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            headers = {"Content-Type": "application/json"}
+            if self.api_key:
+                headers["Authorization"] = f"Bearer {self.api_key}"
+            self._client = httpx.AsyncClient(
+                headers=headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.pool_connections,
+                                    max_keepalive_connections=self.pool_connections)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._client
+
+    def start(self):
+        """Create the connection pool now rather than on the first request (building the SSL context is slow)."""
+        self._get_client()
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter delay before retry ``attempt`` (0-based), at least the server's Retry-After."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        try:
+            return float(response.headers.get('retry-after'))
+        except (TypeError, ValueError):
+            return None
+
+    @contextlib.asynccontextmanager
+    async def _slot(self):
+        """Hold one of the ``max_in_flight`` request slots, counted as waiting until it is granted.
+
+        The counters are restored however the request ends, including when
+        it is cancelled while still waiting.
+        """
+        self.stats['waiting'] += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.stats['waiting'] -= 1
+        self.stats['in_flight'] += 1
+        self.stats['requests'] += 1
+        try:
+            yield
+        finally:
+            self.stats['in_flight'] -= 1
+            self._semaphore.release()
+
+    async def post(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """POST ``payload`` with retries and return the decoded JSON response.
+
+        Raises LLMError when every attempt failed or the API rejected the
+        request (4xx other than 429).
+        """
+        client = self._get_client()
+        async with self._slot():
+            try:
+                return await self._post_with_retries(client, payload, timeout)
+            except LLMError:
+                self.stats['failures'] += 1
+                raise
+
+    async def _post_with_retries(self, client: httpx.AsyncClient, payload: Dict[str, Any],
+                                 timeout: Optional[float]) -> Dict[str, Any]:
+        request_timeout = httpx.Timeout(timeout, connect=self.timeout.connect) if timeout else self.timeout
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            start = time.perf_counter()
+            try:
+                response = await client.post(self.url, json=payload, timeout=request_timeout)
+            except httpx.TransportError as e:
+                # Timeouts, refused/reset connections
+                error = LLMError(f"{type(e).__name__}: {e}", attempts=attempt + 1)
+            else:
+                if response.status_code in RETRY_STATUSES:
+                    retry_after = self._retry_after(response)
+                    error = LLMError(f"HTTP {response.status_code}", response.status_code, attempt + 1)
+                elif response.is_error:
+                    raise LLMError(f"HTTP {response.status_code}: {response.text[:200]}",
+                                   response.status_code, attempt + 1)
+                else:
+                    return response.json()
+
+            if attempt == self.max_retries:
+                raise error
+            delay = self.backoff(attempt, retry_after)
+            self.stats['retries'] += 1
+            logger.warning(f"LLM request attempt {attempt + 1} failed after "
+                           f"{(time.perf_counter() - start) * 1000:.0f} ms ({error}), retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def chat_completion(self, messages: List[Dict[str, str]], model: Optional[str] = None,
+                              temperature: float = 0.3, max_tokens: int = 1500,
+                              timeout: Optional[float] = None) -> str:
+        """Return the assistant message content of one chat completion."""
+        payload = {
+            "model": model or self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        result = await self.post(payload, timeout=timeout)
+        try:
+            return result["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            raise LLMError(f"Unexpected completion response: {str(result)[:200]}")
+
+    async def stream_chat_completion(self, messages: List[Dict[str, str]], model: Optional[str] = None,
+                                     temperature: float = 0.3, max_tokens: int = 1500,
+                                     timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Yield the assistant message content in pieces as the API streams them.
+
+        Opening the stream is retried like ``post``; once content has started
+        arriving a failure raises LLMError instead, since it can't be replayed.
+        ``timeout`` bounds the wait for each chunk, not the whole completion.
+        """
+        payload = {
+            "model": model or self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True
+        }
+        client = self._get_client()
+        request_timeout = httpx.Timeout(timeout, connect=self.timeout.connect) if timeout else self.timeout
+        async with self._slot():
+            try:
+                for attempt in range(self.max_retries + 1):
+                    request = client.build_request("POST", self.url, json=payload, timeout=request_timeout)
+                    retry_after = None
+                    try:
+                        response = await client.send(request, stream=True)
+                    except httpx.TransportError as e:
+                        error = LLMError(f"{type(e).__name__}: {e}", attempts=attempt + 1)
+                    else:
+                        if response.status_code in RETRY_STATUSES:
+                            retry_after = self._retry_after(response)
+                            error = LLMError(f"HTTP {response.status_code}", response.status_code, attempt + 1)
+                            await response.aclose()
+                        elif response.is_error:
+                            await response.aread()
+                            await response.aclose()
+                            raise LLMError(f"HTTP {response.status_code}: {response.text[:200]}",
+                                           response.status_code, attempt + 1)
+                        else:
+                            break
+                    if attempt == self.max_retries:
+                        raise error
+                    delay = self.backoff(attempt, retry_after)
+                    self.stats['retries'] += 1
+                    logger.warning(f"LLM stream attempt {attempt + 1} failed ({error}), retrying in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+
+                try:
+                    async for line in response.aiter_lines():
+                        # Server-Sent Events: "data: {json chunk}" lines, ending with "data: [DONE]"
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            break
+                        chunk = json.loads(data)
+                        choices = chunk.get("choices") or [{}]
+                        content = (choices[0].get("delta") or {}).get("content")
+                        if content:
+                            yield content
+                except (httpx.TransportError, json.JSONDecodeError) as e:
+                    raise LLMError(f"Stream interrupted: {type(e).__name__}: {e}")
+                finally:
+                    await response.aclose()
+            except LLMError:
+                self.stats['failures'] += 1
+                raise
+
+    async def aclose(self):
+        """Close the pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,99 @@
+"""Local stand-in for the OpenAI-compatible chat completions API, for testing the chatbot offline.
+
+Usage:
+    uvicorn llm_stub:app --port 9000
+    LLM_API_URL=http://127.0.0.1:9000/v1/chat/completions python chatbot.py
+
+Environment:
+    STUB_LATENCY_MS      simulated completion time (default 500)
+    STUB_FIRST_TOKEN_MS  with "stream": true, delay before the first token (default 200)
+    STUB_TOKEN_MS        with "stream": true, delay between tokens (default 20)
+    STUB_FAIL_RATE       fraction of requests answered with 429 or 503 (default 0)
+"""
+import os
+import time
+import random
+import json
+import asyncio
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+STUB_LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "500"))
+STUB_FIRST_TOKEN_MS = float(os.getenv("STUB_FIRST_TOKEN_MS", "200"))
+STUB_TOKEN_MS = float(os.getenv("STUB_TOKEN_MS", "20"))
+STUB_FAIL_RATE = float(os.getenv("STUB_FAIL_RATE", "0"))
+
+app = FastAPI(title="LLM completions stub")
+
+stats = {'requests': 0, 'failed': 0, 'in_flight': 0, 'max_in_flight': 0}
+
+
+def completion_text(messages) -> str:
+    question = next((m['content'] for m in reversed(messages) if m.get('role') == 'user'), '')
+    return (f"Stub assessment for: {question.strip()[:120]}\n"
+            "Urgency level: Low. Please consult a healthcare professional for a diagnosis.")
+
+
+async def stream_completion(payload):
+    """OpenAI-style ``chat.completion.chunk`` events, one word per chunk."""
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    stats['in_flight'] += 1
+    stats['max_in_flight'] = max(stats['max_in_flight'], stats['in_flight'])
+    try:
+        await asyncio.sleep(STUB_FIRST_TOKEN_MS / 1000)
+        words = completion_text(payload.get('messages', [])).split(' ')
+        for i, word in enumerate(words):
+            chunk = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': payload.get('model', 'stub'),
+                'choices': [{'index': 0, 'delta': {'content': word if i == 0 else ' ' + word},
+                             'finish_reason': None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(STUB_TOKEN_MS / 1000)
+        yield "data: [DONE]\n\n"
+    finally:
+        stats['in_flight'] -= 1
+
+
+@app.post("/v1/chat/completions")
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    payload = await request.json()
+    stats['requests'] += 1
+    if random.random() < STUB_FAIL_RATE:
+        stats['failed'] += 1
+        status_code = random.choice([429, 503])
+        headers = {'Retry-After': '0.1'} if status_code == 429 else {}
+        return JSONResponse(status_code=status_code, content={'error': {'message': 'stub failure'}},
+                            headers=headers)
+
+    if payload.get('stream'):
+        return StreamingResponse(stream_completion(payload), media_type="text/event-stream")
+
+    stats['in_flight'] += 1
+    stats['max_in_flight'] = max(stats['max_in_flight'], stats['in_flight'])
+    try:
+        await asyncio.sleep(STUB_LATENCY_MS / 1000)
+    finally:
+        stats['in_flight'] -= 1
+    return {
+        'id': f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': payload.get('model', 'stub'),
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': completion_text(payload.get('messages', []))},
+            'finish_reason': 'stop'
+        }],
+    }
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
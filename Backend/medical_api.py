@@ -1,14 +1,10 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-import torch
-import torch.nn as nn
-import torchvision.transforms as transforms
 from PIL import Image
 import numpy as np
-import cv2
-from transformers import pipeline
 import io
+import sys
 import json
 from datetime import datetime
 import warnings
@@ -34,9 +30,10 @@ class MedicalImageAnalyzer:
     def __init__(self):
         """Initialize the medical image analyzer with multiple pre-trained models."""
         
-        # Initialize device
-        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        print(f"Using device: {self.device}")
+        # torch/torchvision are imported on first use, not at startup
+        self._device = None
+        self._chest_transform = None
+        self._brain_transform = None
         
         # Initialize multiple specialized models
         self.models = {}
@@ -59,20 +56,40 @@ class MedicalImageAnalyzer:
             'Normal', 'Fracture', 'Arthritis', 'Osteoporosis', 'Dislocation',
             'Osteomyelitis', 'Bone Tumor', 'Joint Degeneration'
         ]
-        
-        # Image preprocessing transforms
-        self.chest_transform = transforms.Compose([
-            transforms.Resize((224, 224)),
-            transforms.Grayscale(num_output_channels=3),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-        ])
-        
-        self.brain_transform = transforms.Compose([
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-        ])
+
+    @property
+    def device(self):
+        """Torch device, resolved (and torch imported) on first access."""
+        if self._device is None:
+            import torch
+            self._device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+            print(f"Using device: {self._device}")
+        return self._device
+
+    @property
+    def chest_transform(self):
+        """Chest X-ray preprocessing transform, built on first access."""
+        if self._chest_transform is None:
+            import torchvision.transforms as transforms
+            self._chest_transform = transforms.Compose([
+                transforms.Resize((224, 224)),
+                transforms.Grayscale(num_output_channels=3),
+                transforms.ToTensor(),
+                transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+            ])
+        return self._chest_transform
+
+    @property
+    def brain_transform(self):
+        """Brain MRI preprocessing transform, built on first access."""
+        if self._brain_transform is None:
+            import torchvision.transforms as transforms
+            self._brain_transform = transforms.Compose([
+                transforms.Resize((224, 224)),
+                transforms.ToTensor(),
+                transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+            ])
+        return self._brain_transform
 
     def load_models(self):
         """Load pre-trained medical imaging models."""
@@ -81,10 +98,11 @@ class MedicalImageAnalyzer:
             # For demo purposes, we'll simulate model loading
             # In production, uncomment these lines to load actual models
             
+            # from transformers import pipeline  # imported here so startup stays light
             # self.models['chest_xray'] = pipeline(
             #     "image-classification",
             #     model="nickmccomb/chest-xray-classification",
-            #     device=0 if torch.cuda.is_available() else -1
+            #     device=0 if self.device.type == 'cuda' else -1
             # )
             
             # For now, we'll use mock models
@@ -258,11 +276,21 @@ async def health_check():
     """Health check endpoint."""
     return {
         "status": "healthy",
-        "device": str(analyzer.device),
+        "device": str(analyzer._device) if analyzer._device is not None else "not_loaded",
         "models_loaded": len(analyzer.models),
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness endpoint reporting which models and heavy dependencies are loaded."""
+    return {
+        "ready": True,
+        "models": {name: str(model) for name, model in analyzer.models.items()},
+        "device": str(analyzer._device) if analyzer._device is not None else "not_loaded",
+        "loaded_modules": [name for name in ('torch', 'torchvision', 'transformers', 'cv2', 'numpy') if name in sys.modules]
+    }
+
 @app.post("/analyze")
 async def analyze_medical_image(file: UploadFile = File(...)):
     """
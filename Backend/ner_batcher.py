@@ -0,0 +1,198 @@
+import os
+import re
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Any, Callable
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+# Report text is split into chunks of at most this many characters (well under
+# the 512-token limit of BERT-style NER models)
+NER_CHUNK_CHARS = int(os.getenv("NER_CHUNK_CHARS", "1000"))
+# Chunks from concurrent requests are grouped into one forward pass of up to
+# NER_MAX_BATCH chunks, waiting at most NER_MAX_WAIT_MS for the batch to fill
+NER_MAX_BATCH = int(os.getenv("NER_MAX_BATCH", "16"))
+NER_MAX_WAIT_MS = float(os.getenv("NER_MAX_WAIT_MS", "5"))
+
+# Preferred places to end a chunk, best first
+CHUNK_BREAKS = [re.compile(r'\n'), re.compile(r'[.;!?]\s'), re.compile(r'\s')]
+
+
+def chunk_text(text: str, max_chars: int = NER_CHUNK_CHARS) -> List[tuple]:
+    """Split ``text`` into (offset, chunk) pairs of at most ``max_chars`` characters.
+
+    Chunks end at a line break, sentence end or whitespace when one exists in
+    the second half of the window, so entities are rarely cut in two.
+    """
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + max_chars, len(text))
+        if end < len(text):
+            window = text[start:end]
+            for pattern in CHUNK_BREAKS:
+                breaks = [m.end() for m in pattern.finditer(window, max_chars // 2)]
+                if breaks:
+                    end = start + breaks[-1]
+                    break
+        chunk = text[start:end]
+        if chunk.strip():
+            chunks.append((start, chunk))
+        start = end
+    return chunks
+
+
+def sub_with_offsets(pattern, repl: str, text: str, offsets: List[int], flags: int = 0) -> tuple:
+    """``re.sub`` that also returns, for each output character, its position in the original text.
+
+    ``offsets`` maps ``text`` to the original the same way, so substitutions
+    can be chained. Characters of a replacement point into the span they
+    replaced.
+    """
+    parts, new_offsets, last = [], [], 0
+    for match in re.finditer(pattern, text, flags):
+        parts.append(text[last:match.start()])
+        new_offsets.extend(offsets[last:match.start()])
+        replacement = match.expand(repl)
+        span = offsets[match.start():match.end()] or offsets[match.start():match.start() + 1] or offsets[-1:]
+        parts.append(replacement)
+        new_offsets.extend(span[min(i, len(span) - 1)] for i in range(len(replacement)))
+        last = match.end()
+    parts.append(text[last:])
+    new_offsets.extend(offsets[last:])
+    return ''.join(parts), new_offsets
+
+
+def map_entity_offsets(entities: List[Dict[str, Any]], offsets: List[int]) -> List[Dict[str, Any]]:
+    """Move entity ``start``/``end`` from a cleaned text back to the original via its ``offsets``."""
+    return [{**entity, 'start': offsets[entity['start']], 'end': offsets[entity['end'] - 1] + 1}
+            for entity in entities if entity['end'] > entity['start']]
+
+
+def _entity_from_prediction(prediction: Dict[str, Any], text: str, offset: int) -> Dict[str, Any]:
+    """Convert one aggregated pipeline prediction into a document-level entity."""
+    start = int(prediction['start']) + offset
+    end = int(prediction['end']) + offset
+    return {
+        'text': text[start:end],
+        'label': prediction.get('entity_group', prediction.get('entity')),
+        'score': round(float(prediction['score']), 4),
+        'start': start,
+        'end': end
+    }
+
+
+class NERMicroBatcher:
+    """Runs NER for concurrent requests in shared micro-batches.
+
+    Each request's chunks are queued; a single consumer task takes the first
+    queued chunk, keeps collecting for up to ``max_wait_ms`` (or until
+    ``max_batch`` chunks) and runs them through the pipeline as one batch on
+    a dedicated inference thread. Predictions are routed back to the waiting
+    request and their offsets shifted to the position of the chunk in the
+    original text.
+    """
+
+    def __init__(self, get_pipeline: Callable[[], Any], max_batch: int = NER_MAX_BATCH,
+                 max_wait_ms: float = NER_MAX_WAIT_MS, chunk_chars: int = NER_CHUNK_CHARS):
+        self.get_pipeline = get_pipeline
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self.chunk_chars = chunk_chars
+        # One inference thread: batches run one after another, never interleaved
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ner")
+        self._queue: Optional[asyncio.Queue] = None
+        self._consumer: Optional[asyncio.Task] = None
+        self.stats = {'requests': 0, 'chunks': 0, 'batches': 0, 'inference_ms': 0.0}
+
+    def _ensure_started(self):
+        # Created on first use so the batcher binds to the running event loop
+        if self._consumer is None or self._consumer.done():
+            self._queue = asyncio.Queue()
+            self._consumer = asyncio.create_task(self._run())
+
+    async def extract(self, text: str) -> List[Dict[str, Any]]:
+        """Return the entities found in ``text`` with offsets into ``text``."""
+        chunks = chunk_text(text, self.chunk_chars)
+        if not chunks:
+            return []
+        self._ensure_started()
+        self.stats['requests'] += 1
+
+        loop = asyncio.get_running_loop()
+        futures = []
+        for _, chunk in chunks:
+            future = loop.create_future()
+            self._queue.put_nowait((chunk, future))
+            futures.append(future)
+
+        predictions = await asyncio.gather(*futures)
+        entities = []
+        for (offset, _), chunk_predictions in zip(chunks, predictions):
+            entities.extend(_entity_from_prediction(p, text, offset) for p in chunk_predictions)
+        return entities
+
+    async def _collect_batch(self) -> List[tuple]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        # Whatever else is already waiting rides along without extra delay
+        while len(batch) < self.max_batch and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    def _infer(self, texts: List[str]) -> List[List[Dict[str, Any]]]:
+        pipeline = self.get_pipeline()
+        if pipeline is None:
+            raise RuntimeError("NER model is not available")
+        outputs = pipeline(texts, batch_size=len(texts))
+        # A single input may come back unwrapped
+        if outputs and isinstance(outputs[0], dict):
+            outputs = [outputs]
+        return outputs
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+            texts = [chunk for chunk, _ in batch]
+            start = time.perf_counter()
+            try:
+                outputs = await loop.run_in_executor(self._executor, self._infer, texts)
+            except Exception as e:
+                logger.warning(f"NER batch of {len(batch)} chunks failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.stats['batches'] += 1
+            self.stats['chunks'] += len(batch)
+            self.stats['inference_ms'] += (time.perf_counter() - start) * 1000
+            for (_, future), output in zip(batch, outputs):
+                if not future.done():
+                    future.set_result(output)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters plus the average batch size so far."""
+        batches = self.stats['batches']
+        return {
+            **self.stats,
+            'inference_ms': round(self.stats['inference_ms'], 1),
+            'avg_batch_size': round(self.stats['chunks'] / batches, 2) if batches else 0.0
+        }
+
+    def shutdown(self):
+        if self._consumer is not None:
+            self._consumer.cancel()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,217 @@
+import os
+import shlex
+import logging
+import importlib.util
+from typing import List, Dict, Optional, Any
+
+import pytesseract
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+# "tesserocr" keeps initialized Tesseract API handles alive in each OCR worker,
+# "pytesseract" runs the tesseract binary per call, "auto" prefers tesserocr when installed
+OCR_ENGINE = os.getenv("OCR_ENGINE", "auto").lower()
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+# tessdata directory for tesserocr; the library's built-in default is used when unset
+OCR_TESSDATA_PATH = os.getenv("OCR_TESSDATA_PATH") or os.getenv("TESSDATA_PREFIX")
+
+DATA_KEYS = ('text', 'conf', 'block_num', 'par_num', 'line_num')
+
+_engine = None
+
+
+class PytesseractEngine:
+    """Spawns the ``tesseract`` binary for every call (the original behaviour)."""
+
+    name = 'pytesseract'
+
+    def __init__(self, lang: str = OCR_LANG):
+        self.lang = lang
+
+    def image_to_string(self, image, config: str = '', lang: Optional[str] = None) -> str:
+        return pytesseract.image_to_string(image, lang=lang or self.lang, config=config)
+
+    def image_to_data(self, image, config: str = '', lang: Optional[str] = None) -> Dict[str, List]:
+        return pytesseract.image_to_data(image, lang=lang or self.lang, config=config,
+                                         output_type=pytesseract.Output.DICT)
+
+    def detect_orientation_script(self, image) -> Optional[Dict[str, Any]]:
+        """Orientation and script detection (needs osd.traineddata)."""
+        osd = pytesseract.image_to_osd(image, output_type=pytesseract.Output.DICT)
+        return {
+            'rotate': int(osd['rotate']),
+            'orientation_confidence': float(osd['orientation_conf']),
+            'script': osd['script'],
+            'script_confidence': float(osd['script_conf'])
+        }
+
+
+class TesserocrEngine:
+    """Keeps one initialized ``PyTessBaseAPI`` per config alive for the life of the process.
+
+    Traineddata is loaded once per handle (one per config and language set)
+    instead of once per call and no temp files or subprocesses are involved.
+    Handles are not thread-safe, so each OCR worker process owns its own
+    engine. Configs with options the
+    API can't express are passed on to pytesseract.
+    """
+
+    name = 'tesserocr'
+
+    def __init__(self, lang: str = OCR_LANG, tessdata_path: Optional[str] = OCR_TESSDATA_PATH):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self.lang = lang
+        self.tessdata_path = tessdata_path
+        self._handles: Dict[tuple, Any] = {}
+        self._osd = None
+        self._fallback = PytesseractEngine(lang=lang)
+
+    @staticmethod
+    def parse_config(config: str) -> tuple:
+        """Split a tesseract command-line config into (psm, oem, variables)."""
+        psm, oem, variables = None, None, {}
+        tokens = shlex.split(config or '')
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if token in ('--psm', '--oem', '-c') and i + 1 < len(tokens):
+                value = tokens[i + 1]
+                if token == '--psm':
+                    psm = int(value)
+                elif token == '--oem':
+                    oem = int(value)
+                else:
+                    key, _, variable = value.partition('=')
+                    variables[key] = variable
+                i += 2
+            else:
+                raise ValueError(f"Unsupported tesseract option for tesserocr: {token}")
+        return psm, oem, variables
+
+    def _handle(self, config: str, lang: Optional[str] = None):
+        handle_key = (config, lang or self.lang)
+        handle = self._handles.get(handle_key)
+        if handle is None:
+            tesserocr = self._tesserocr
+            psm, oem, variables = self.parse_config(config)
+            kwargs = {'lang': handle_key[1]}
+            if self.tessdata_path:
+                kwargs['path'] = self.tessdata_path
+            if psm is not None:
+                kwargs['psm'] = psm
+            if oem is not None:
+                kwargs['oem'] = oem
+            handle = tesserocr.PyTessBaseAPI(**kwargs)
+            for key, value in variables.items():
+                handle.SetVariable(key, value)
+            self._handles[handle_key] = handle
+            logger.debug(f"Initialized tesserocr handle for config {config!r}, lang {handle_key[1]}")
+        return handle
+
+    def image_to_string(self, image, config: str = '', lang: Optional[str] = None) -> str:
+        try:
+            handle = self._handle(config, lang)
+        except ValueError:
+            return self._fallback.image_to_string(image, config, lang)
+        handle.SetImage(image)
+        try:
+            return handle.GetUTF8Text()
+        finally:
+            handle.Clear()
+
+    def image_to_data(self, image, config: str = '', lang: Optional[str] = None) -> Dict[str, List]:
+        """Word-level results in the same layout as ``pytesseract.Output.DICT``."""
+        RIL = self._tesserocr.RIL
+        try:
+            handle = self._handle(config, lang)
+        except ValueError:
+            return self._fallback.image_to_data(image, config, lang)
+        data: Dict[str, List] = {key: [] for key in DATA_KEYS}
+        handle.SetImage(image)
+        try:
+            handle.Recognize()
+            iterator = handle.GetIterator()
+            if iterator is None:
+                return data
+            block = paragraph = line = 0
+            for word in self._tesserocr.iterate_level(iterator, RIL.WORD):
+                if word.IsAtBeginningOf(RIL.BLOCK):
+                    block, paragraph, line = block + 1, 0, 0
+                if word.IsAtBeginningOf(RIL.PARA):
+                    paragraph, line = paragraph + 1, 0
+                if word.IsAtBeginningOf(RIL.TEXTLINE):
+                    line += 1
+                data['text'].append(word.GetUTF8Text(RIL.WORD) or '')
+                data['conf'].append(word.Confidence(RIL.WORD))
+                data['block_num'].append(block)
+                data['par_num'].append(paragraph)
+                data['line_num'].append(line)
+            return data
+        finally:
+            handle.Clear()
+
+    def detect_orientation_script(self, image) -> Optional[Dict[str, Any]]:
+        """Orientation and script detection with a persistent OSD-only handle."""
+        if self._osd is None:
+            kwargs = {'lang': 'osd', 'psm': self._tesserocr.PSM.OSD_ONLY}
+            if self.tessdata_path:
+                kwargs['path'] = self.tessdata_path
+            self._osd = self._tesserocr.PyTessBaseAPI(**kwargs)
+        self._osd.SetImage(image)
+        try:
+            result = self._osd.DetectOrientationScript()
+        finally:
+            self._osd.Clear()
+        if not result:
+            return None
+        return {
+            # Same convention as tesseract's "Rotate:": clockwise degrees that make the page upright
+            'rotate': (360 - result['orient_deg']) % 360,
+            'orientation_confidence': float(result['orient_conf']),
+            'script': result['script_name'],
+            'script_confidence': float(result['script_conf'])
+        }
+
+    def close(self):
+        for handle in self._handles.values():
+            handle.End()
+        self._handles.clear()
+        if self._osd is not None:
+            self._osd.End()
+            self._osd = None
+
+
+def resolve_backend(requested: str = OCR_ENGINE) -> str:
+    """Name of the backend ``requested`` maps to here, without importing it."""
+    if requested == 'pytesseract':
+        return 'pytesseract'
+    if importlib.util.find_spec('tesserocr') is not None:
+        return 'tesserocr'
+    return 'pytesseract'
+
+
+def create_engine(requested: str = OCR_ENGINE, lang: str = OCR_LANG):
+    """Build the requested engine, falling back to pytesseract if tesserocr can't start."""
+    backend = resolve_backend(requested)
+    if requested == 'tesserocr' and backend != 'tesserocr':
+        logger.warning("OCR_ENGINE=tesserocr but tesserocr is not installed, falling back to pytesseract")
+    if backend == 'tesserocr':
+        try:
+            engine = TesserocrEngine(lang=lang)
+            # Load traineddata now rather than on the first request
+            engine._handle('')
+            return engine
+        except Exception as e:
+            logger.warning(f"Could not initialize tesserocr ({e}), falling back to pytesseract")
+    return PytesseractEngine(lang=lang)
+
+
+def get_engine():
+    """Return this process's OCR engine, creating it on first use."""
+    global _engine
+    if _engine is None:
+        _engine = create_engine()
+        logger.info(f"OCR engine: {_engine.name}")
+    return _engine
@@ -0,0 +1,143 @@
+import os
+import time
+import logging
+from typing import List, Dict, Optional, Any
+
+import ocr_engine
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+# Traineddata that reports may need, '+'-separated; OCRing with all of them at once is the slow baseline
+OCR_LANGUAGES = os.getenv("OCR_LANGUAGES", ocr_engine.OCR_LANG)
+# "auto" runs script/orientation detection only when more than one language is configured
+OCR_SCRIPT_ROUTING = os.getenv("OCR_SCRIPT_ROUTING", "auto").lower()
+# Longest side of the downscaled copy used for detection
+OCR_OSD_MAX_SIDE = int(os.getenv("OCR_OSD_MAX_SIDE", "1800"))
+# Below these Tesseract confidences the detected script / orientation is not trusted
+OCR_OSD_MIN_SCRIPT_CONF = float(os.getenv("OCR_OSD_MIN_SCRIPT_CONF", "1.0"))
+OCR_OSD_MIN_ORIENTATION_CONF = float(os.getenv("OCR_OSD_MIN_ORIENTATION_CONF", "2.0"))
+# Also OCR every Nth page with all languages, when it is routed, to measure the time saved (0 = never)
+OCR_LANG_BASELINE_EVERY = int(os.getenv("OCR_LANG_BASELINE_EVERY", "50"))
+
+# Tesseract OSD script names and the traineddata that can read them
+SCRIPT_LANGUAGES = {
+    'Latin': ['eng', 'fra', 'deu', 'spa', 'por', 'ita'],
+    'Devanagari': ['hin', 'mar', 'nep', 'san'],
+    'Bengali': ['ben', 'asm'],
+    'Gujarati': ['guj'],
+    'Gurmukhi': ['pan'],
+    'Oriya': ['ori'],
+    'Tamil': ['tam'],
+    'Telugu': ['tel'],
+    'Kannada': ['kan'],
+    'Malayalam': ['mal'],
+    'Arabic': ['urd', 'ara', 'fas'],
+    'Cyrillic': ['rus', 'ukr'],
+    'Greek': ['ell'],
+    'Han': ['chi_sim', 'chi_tra'],
+    'Japanese': ['jpn'],
+    'Hangul': ['kor'],
+    'Thai': ['tha'],
+    'Hebrew': ['heb'],
+}
+# Lab names and units are printed in English on most non-English reports too
+SHARED_LANGUAGE = 'eng'
+
+# Routed vs all-languages OCR time of the measured pages. Pool workers only time
+# pages; sampling and these totals live in the process that dispatches them
+baseline_stats = {'pages': 0, 'routed_ms': 0.0, 'all_languages_ms': 0.0}
+_dispatched_pages = 0
+
+
+def candidate_languages() -> List[str]:
+    return [lang for lang in OCR_LANGUAGES.split('+') if lang]
+
+
+def routing_enabled() -> bool:
+    if OCR_SCRIPT_ROUTING == 'auto':
+        return len(candidate_languages()) > 1
+    return OCR_SCRIPT_ROUTING in ('1', 'true', 'yes')
+
+
+def languages_for_script(script: str, candidates: List[str]) -> List[str]:
+    """Configured languages that read ``script``, plus English when it is configured."""
+    readers = SCRIPT_LANGUAGES.get(script, []) + [f"script/{script}"]
+    langs = [lang for lang in candidates if lang in readers]
+    if langs and SHARED_LANGUAGE in candidates and SHARED_LANGUAGE not in langs:
+        langs.append(SHARED_LANGUAGE)
+    return langs
+
+
+def route_page(image) -> Dict[str, Any]:
+    """Detect script and orientation on a downscaled copy and pick the traineddata for the page.
+
+    Returns the language metadata reported per page: ``lang`` (the '+'-joined
+    traineddata to use), ``routed`` (False when detection failed or was not
+    confident, in which case every configured language is used), the
+    detection results and ``rotate``, the clockwise rotation that makes the
+    page upright (0 unless the orientation is confident).
+    """
+    candidates = candidate_languages()
+    start = time.perf_counter()
+    small = image.copy()
+    small.thumbnail((OCR_OSD_MAX_SIDE, OCR_OSD_MAX_SIDE))
+    language = {'lang': '+'.join(candidates), 'routed': False, 'rotate': 0}
+    try:
+        osd = ocr_engine.get_engine().detect_orientation_script(small)
+    except Exception as e:
+        # Raised for pages with too little text as well as for a missing osd.traineddata
+        osd = None
+        language['error'] = str(e).strip()[:200]
+    language['osd_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    if not osd:
+        return language
+
+    language.update(script=osd['script'], script_confidence=osd['script_confidence'],
+                    orientation_confidence=osd['orientation_confidence'])
+    if osd['orientation_confidence'] >= OCR_OSD_MIN_ORIENTATION_CONF:
+        language['rotate'] = osd['rotate'] % 360
+    if osd['script_confidence'] >= OCR_OSD_MIN_SCRIPT_CONF:
+        langs = languages_for_script(osd['script'], candidates)
+        if langs:
+            language['lang'] = '+'.join(langs)
+            language['routed'] = True
+    return language
+
+
+def upright(image, language: Dict[str, Any]):
+    """Rotate the page by the detected orientation (PIL rotates counter-clockwise)."""
+    if not language.get('rotate'):
+        return image
+    return image.rotate(-language['rotate'], expand=True, fillcolor=255 if image.mode == 'L' else None)
+
+
+def take_baseline_sample() -> bool:
+    """Whether the page being dispatched should also be OCRed with every language if it is routed."""
+    global _dispatched_pages
+    _dispatched_pages += 1
+    return OCR_LANG_BASELINE_EVERY > 0 and _dispatched_pages % OCR_LANG_BASELINE_EVERY == 0
+
+
+def record_savings(language: Dict[str, Any], ocr_ms: float, all_languages_ms: Optional[float] = None):
+    """Add the time saved versus one all-languages pass to a page's language metadata.
+
+    Measured when ``all_languages_ms`` is given, otherwise estimated from the
+    routed/all-languages ratio of the pages measured so far (None before any).
+    """
+    language['ocr_ms'] = round(ocr_ms, 2)
+    if not language['routed']:
+        # Every language was used anyway; detection only cost time
+        language['saved_ms'] = -language['osd_ms']
+        return
+    if all_languages_ms is not None:
+        baseline_stats['pages'] += 1
+        baseline_stats['routed_ms'] += ocr_ms
+        baseline_stats['all_languages_ms'] += all_languages_ms
+        language['all_languages_ms'] = round(all_languages_ms, 2)
+        language['saved_ms'] = round(all_languages_ms - ocr_ms - language['osd_ms'], 2)
+    elif baseline_stats['routed_ms'] > 0:
+        ratio = baseline_stats['all_languages_ms'] / baseline_stats['routed_ms']
+        language['estimated_saved_ms'] = round(ocr_ms * (ratio - 1) - language['osd_ms'], 2)
+    else:
+        language['estimated_saved_ms'] = None
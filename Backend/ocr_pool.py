@@ -0,0 +1,519 @@
+import os
+import time
+import asyncio
+import shutil
+import logging
+import subprocess
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import List, Dict, Optional, Any
+
+import pytesseract
+import pdf2image
+
+import image_preprocess
+import ocr_engine
+import ocr_languages
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+# 0 runs OCR inline in the calling process (for tools whose own workers are already processes)
+OCR_POOL_WORKERS = int(os.getenv("OCR_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+OCR_FIRST_GOOD = os.getenv("OCR_FIRST_GOOD", "false").lower() in ("1", "true", "yes")
+OCR_MIN_GOOD_CHARS = int(os.getenv("OCR_MIN_GOOD_CHARS", "200"))
+# "parallel" always runs every PSM variant, "adaptive" escalates only on low confidence
+OCR_MODE = os.getenv("OCR_MODE", "parallel").lower()
+OCR_CONFIDENCE_THRESHOLD = float(os.getenv("OCR_CONFIDENCE_THRESHOLD", "70"))
+OCR_COVERAGE_THRESHOLD = float(os.getenv("OCR_COVERAGE_THRESHOLD", "0.6"))
+# Words below this Tesseract confidence do not count towards coverage
+OCR_WORD_CONFIDENCE_FLOOR = float(os.getenv("OCR_WORD_CONFIDENCE_FLOOR", "50"))
+
+# Page segmentation modes tried for every image
+PSM_CONFIGS = [
+    '--psm 6',  # Uniform block of text
+    '--psm 4',  # Single column of text
+    '--psm 3'   # Fully automatic page segmentation
+]
+
+_pool: Optional[Executor] = None
+
+# Which path adaptive OCR took, for measuring how often escalation is needed
+ocr_stats = {'single_pass': 0, 'escalated': 0, 'passes': 0}
+
+
+def _init_worker(tesseract_cmd: str):
+    """Point each worker at the same Tesseract binary and start its OCR engine."""
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    ocr_engine.get_engine()
+
+
+class InlineExecutor(Executor):
+    """Runs each task to completion in the calling thread when it is submitted."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def get_pool() -> Executor:
+    """Return the shared OCR process pool, creating it on first use."""
+    global _pool
+    if _pool is None and OCR_POOL_WORKERS <= 0:
+        ocr_engine.get_engine()
+        _pool = InlineExecutor()
+    elif _pool is None:
+        logger.info(f"Starting OCR process pool with {OCR_POOL_WORKERS} workers")
+        _pool = ProcessPoolExecutor(
+            max_workers=OCR_POOL_WORKERS,
+            initializer=_init_worker,
+            initargs=(pytesseract.pytesseract.tesseract_cmd,)
+        )
+    return _pool
+
+
+def is_started() -> bool:
+    """Whether the OCR worker processes have been spawned yet."""
+    return _pool is not None
+
+
+def shutdown_pool():
+    """Stop the OCR process pool if it was started."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def ocr_variant(image, config: str, lang: Optional[str] = None) -> Dict[str, Any]:
+    """Run one Tesseract pass inside a worker and time it."""
+    engine = ocr_engine.get_engine()
+    start = time.perf_counter()
+    text = engine.image_to_string(image, config=config, lang=lang)
+    return {
+        'config': config,
+        'engine': engine.name,
+        'text': text,
+        'elapsed_ms': (time.perf_counter() - start) * 1000
+    }
+
+
+def _text_from_data(data: Dict[str, List]) -> str:
+    """Rebuild page text from ``image_to_data`` output, one line per OCR line."""
+    lines: Dict[tuple, List[str]] = {}
+    for i, word in enumerate(data['text']):
+        if not word or not word.strip():
+            continue
+        key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+        lines.setdefault(key, []).append(word)
+    return "\n".join(" ".join(words) for _, words in sorted(lines.items()))
+
+
+def score_ocr_data(data: Dict[str, List]) -> Dict[str, float]:
+    """Compute mean word confidence and confident-word coverage from ``image_to_data``."""
+    confidences = []
+    for word, conf in zip(data['text'], data['conf']):
+        try:
+            conf = float(conf)
+        except (TypeError, ValueError):
+            continue
+        if conf < 0 or not word or not word.strip():
+            continue
+        confidences.append(conf)
+
+    if not confidences:
+        return {'mean_confidence': 0.0, 'coverage': 0.0, 'words': 0}
+
+    confident = sum(1 for conf in confidences if conf >= OCR_WORD_CONFIDENCE_FLOOR)
+    return {
+        'mean_confidence': round(sum(confidences) / len(confidences), 2),
+        'coverage': round(confident / len(confidences), 3),
+        'words': len(confidences)
+    }
+
+
+def ocr_data_variant(image, config: str, lang: Optional[str] = None) -> Dict[str, Any]:
+    """Run one Tesseract pass with word confidences inside a worker and time it."""
+    engine = ocr_engine.get_engine()
+    start = time.perf_counter()
+    data = engine.image_to_data(image, config=config, lang=lang)
+    result = {
+        'config': config,
+        'engine': engine.name,
+        'text': _text_from_data(data),
+        'elapsed_ms': (time.perf_counter() - start) * 1000
+    }
+    result.update(score_ocr_data(data))
+    return result
+
+
+def is_confident(result: Dict[str, Any]) -> bool:
+    """Check whether a scored OCR pass clears the adaptive thresholds."""
+    return (
+        result.get('words', 0) > 0
+        and result['mean_confidence'] >= OCR_CONFIDENCE_THRESHOLD
+        and result['coverage'] >= OCR_COVERAGE_THRESHOLD
+    )
+
+
+def preprocess_pdf_page(image, dpi: int) -> tuple:
+    """Deskew/binarize/crop a rendered PDF page; its resolution is already set by the render DPI."""
+    steps = [step for step in image_preprocess.OCR_PREPROCESS_STEPS if step != 'resize']
+    return image_preprocess.preprocess(image, steps=steps, source_dpi=dpi)
+
+
+def ocr_pdf_page_adaptive_dpi(pdf_path: str, page_number: int, image, dpi: int,
+                               max_dpi: int, dpi_step: int, language: Optional[Dict[str, Any]] = None) -> tuple:
+    """OCR one PDF page rendered at ``dpi``, re-rendering it at higher DPI while confidence is poor.
+
+    Returns (result, page_metadata) where ``result`` is the best scored pass
+    and ``page_metadata`` records the DPI that produced it plus every attempt.
+    Re-rendered pages get the same rotation and languages as ``language``.
+    """
+    lang = language['lang'] if language else None
+    result = ocr_data_variant(image.convert('L'), '', lang)
+    chosen_dpi = dpi
+    attempts = [{'dpi': dpi, 'mean_confidence': result['mean_confidence'], 'coverage': result['coverage']}]
+
+    while not is_confident(result) and dpi < max_dpi and dpi_step > 0:
+        dpi = min(dpi + dpi_step, max_dpi)
+        logger.debug(f"Page {page_number} below confidence threshold, re-rendering at {dpi} DPI")
+        page = pdf2image.convert_from_path(pdf_path, dpi=dpi, first_page=page_number, last_page=page_number)[0]
+        page, _ = preprocess_pdf_page(page.convert('L'), dpi)
+        if language:
+            page = ocr_languages.upright(page, language)
+        candidate = ocr_data_variant(page, '', lang)
+        attempts.append({'dpi': dpi, 'mean_confidence': candidate['mean_confidence'], 'coverage': candidate['coverage']})
+        if candidate['mean_confidence'] >= result['mean_confidence']:
+            result = candidate
+            chosen_dpi = dpi
+
+    page_metadata = {
+        'page': page_number,
+        'dpi': chosen_dpi,
+        'mean_confidence': result['mean_confidence'],
+        'coverage': result['coverage'],
+        'attempts': attempts
+    }
+    return result, page_metadata
+
+
+def pdf_page_count(pdf_path: str) -> int:
+    """Read the page count from the PDF without rasterizing anything."""
+    return int(pdf2image.pdfinfo_from_path(pdf_path)['Pages'])
+
+
+def extract_text_layer(pdf_path: str, page_count: int) -> List[str]:
+    """Read the embedded text of every page with poppler's ``pdftotext``.
+
+    Returns one string per page (empty for pages without a text layer), or an
+    empty list when ``pdftotext`` is not installed or fails.
+    """
+    pdftotext = shutil.which('pdftotext')
+    if not pdftotext:
+        return []
+    try:
+        output = subprocess.run(
+            [pdftotext, '-layout', '-enc', 'UTF-8', pdf_path, '-'],
+            capture_output=True, check=True, timeout=60
+        ).stdout.decode('utf-8', errors='replace')
+    except (subprocess.SubprocessError, OSError) as e:
+        logger.debug(f"pdftotext failed for {pdf_path}: {e}")
+        return []
+    # pdftotext separates pages with form feeds
+    pages = output.split('\f')[:page_count]
+    return pages + [''] * (page_count - len(pages))
+
+
+def is_usable_text_layer(text: str, min_chars: int) -> bool:
+    """Check that a page's embedded text is long enough and not encoding garbage."""
+    stripped = "".join(text.split())
+    if len(stripped) < min_chars:
+        return False
+    readable = sum(1 for ch in stripped if ch.isalnum() or ch in '.,:;/%()-+<>=')
+    return readable / len(stripped) >= 0.8
+
+
+def ocr_pdf_page(pdf_path: str, page_number: int, dpi_mode: str, dpi: int,
+                 low_dpi: int, max_dpi: int, dpi_step: int, baseline: bool = False) -> Dict[str, Any]:
+    """Render a single PDF page in memory and OCR it inside a worker.
+
+    Only this one page is ever rasterized, so a worker holds at most one page
+    image at a time regardless of the document length. With ``baseline`` a
+    routed page is OCRed with every language as well; the timings are left in
+    ``page['language']`` for the dispatching process to record.
+    """
+    start = time.perf_counter()
+    render_dpi = low_dpi if dpi_mode == 'adaptive' else dpi
+    image = pdf2image.convert_from_path(
+        pdf_path, dpi=render_dpi, first_page=page_number, last_page=page_number, grayscale=True
+    )[0]
+    image, preprocess_metadata = preprocess_pdf_page(image, render_dpi)
+
+    language = None
+    if ocr_languages.routing_enabled():
+        language = ocr_languages.route_page(image)
+        image = ocr_languages.upright(image, language)
+    lang = language['lang'] if language else None
+
+    if dpi_mode == 'adaptive':
+        result, page = ocr_pdf_page_adaptive_dpi(pdf_path, page_number, image, low_dpi, max_dpi,
+                                                 dpi_step, language)
+        text, ocr_ms = result['text'], result['elapsed_ms']
+    else:
+        ocr_start = time.perf_counter()
+        text = ocr_engine.get_engine().image_to_string(image, lang=lang)
+        ocr_ms = (time.perf_counter() - ocr_start) * 1000
+        page = {'page': page_number, 'dpi': dpi}
+
+    if language:
+        language['ocr_ms'] = ocr_ms
+        if language['routed'] and baseline:
+            language['all_languages_ms'] = ocr_variant(image, '', ocr_languages.OCR_LANGUAGES)['elapsed_ms']
+        page['language'] = language
+    page['preprocess'] = preprocess_metadata
+    page['text'] = text
+    page['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return page
+
+
+async def iter_pdf_pages(pdf_path: str, page_numbers: List[int], window: int, dpi_mode: str,
+                         dpi: int, low_dpi: int, max_dpi: int, dpi_step: int):
+    """Yield OCR results for ``page_numbers``, in order, keeping at most ``window`` pages in flight.
+
+    Pages that finish early are buffered (text only) until the pages before
+    them have been yielded.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+    window = max(1, window)
+    in_flight: Dict[asyncio.Future, int] = {}
+    finished: Dict[int, Dict[str, Any]] = {}
+    next_submit = 0
+    next_yield = 0
+
+    try:
+        while next_yield < len(page_numbers):
+            while next_submit < len(page_numbers) and len(in_flight) + len(finished) < window:
+                baseline = ocr_languages.routing_enabled() and ocr_languages.take_baseline_sample()
+                future = loop.run_in_executor(
+                    pool, ocr_pdf_page, pdf_path, page_numbers[next_submit],
+                    dpi_mode, dpi, low_dpi, max_dpi, dpi_step, baseline
+                )
+                in_flight[future] = page_numbers[next_submit]
+                next_submit += 1
+
+            if page_numbers[next_yield] in finished:
+                yield finished.pop(page_numbers[next_yield])
+                next_yield += 1
+                continue
+
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                page = future.result()
+                language = page.get('language')
+                if language:
+                    # Workers only time the page; the savings statistics are kept here
+                    ocr_languages.record_savings(language, language['ocr_ms'], language.pop('all_languages_ms', None))
+                finished[in_flight.pop(future)] = page
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+
+def _variant_timing(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Summarize a finished variant for the OCR metadata."""
+    timing = {
+        'status': 'ok',
+        'engine': result.get('engine'),
+        'elapsed_ms': round(result['elapsed_ms'], 2),
+        'chars': len(result['text'].strip())
+    }
+    if 'mean_confidence' in result:
+        timing['mean_confidence'] = result['mean_confidence']
+        timing['coverage'] = result['coverage']
+    return timing
+
+
+async def _run_variants(image, configs: List[str], worker, accept=None, lang: Optional[str] = None) -> tuple:
+    """Submit one pool task per config and collect (results, timings, winner).
+
+    ``accept`` is an optional predicate; the first result satisfying it wins
+    and the variants still pending are cancelled.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+
+    futures = {
+        asyncio.ensure_future(loop.run_in_executor(pool, worker, image, config, lang)): config
+        for config in configs
+    }
+    results: Dict[str, Dict[str, Any]] = {}
+    timings: Dict[str, Dict[str, Any]] = {}
+    winner = None
+    pending = set(futures)
+
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                config = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.debug(f"OCR config {config} failed: {e}")
+                    timings[config] = {'status': 'failed', 'error': str(e)}
+                    continue
+
+                results[config] = result
+                timings[config] = _variant_timing(result)
+                if accept and winner is None and accept(result):
+                    winner = config
+
+            if winner is not None:
+                break
+    finally:
+        for future in pending:
+            future.cancel()
+            timings[futures[future]] = {'status': 'cancelled'}
+
+    ocr_stats['passes'] += len(results)
+    return results, timings, winner
+
+
+async def _fallback_ocr(image, timings: Dict[str, Dict[str, Any]], lang: Optional[str] = None) -> str:
+    """Run Tesseract with its default settings when every variant came back empty."""
+    loop = asyncio.get_running_loop()
+    fallback = await loop.run_in_executor(get_pool(), ocr_variant, image, '', lang)
+    ocr_stats['passes'] += 1
+    timings['default'] = _variant_timing(fallback)
+    return fallback['text']
+
+
+async def run_psm_variants(image, configs: Optional[List[str]] = None,
+                           first_good: Optional[bool] = None,
+                           min_good_chars: Optional[int] = None, lang: Optional[str] = None) -> tuple:
+    """Run the PSM variants concurrently and return (best_text, metadata).
+
+    With ``first_good`` enabled the first variant that yields at least
+    ``min_good_chars`` characters wins and the remaining variants are cancelled.
+    Otherwise every variant runs and the longest text wins, earlier configs
+    taking precedence on ties.
+    """
+    configs = configs or PSM_CONFIGS
+    first_good = OCR_FIRST_GOOD if first_good is None else first_good
+    min_good_chars = OCR_MIN_GOOD_CHARS if min_good_chars is None else min_good_chars
+    start = time.perf_counter()
+
+    accept = (lambda result: len(result['text'].strip()) >= min_good_chars) if first_good else None
+    results, timings, winner = await _run_variants(image, configs, ocr_variant, accept, lang)
+
+    if winner is not None:
+        best_text = results[winner]['text']
+    else:
+        best_text = ""
+        for config in configs:
+            text = results.get(config, {}).get('text', "")
+            if len(text.strip()) > len(best_text.strip()):
+                best_text = text
+                winner = config
+
+    if not best_text.strip():
+        best_text = await _fallback_ocr(image, timings, lang)
+        winner = 'default'
+
+    metadata = {
+        'mode': 'first_good' if first_good else 'all',
+        'selected_config': winner,
+        'variants': timings,
+        'wall_ms': round((time.perf_counter() - start) * 1000, 2)
+    }
+    return best_text, metadata
+
+
+async def run_adaptive(image, configs: Optional[List[str]] = None, lang: Optional[str] = None) -> tuple:
+    """Run one scored pass and escalate to the other PSM configs only on low confidence.
+
+    Returns (best_text, metadata); ``metadata['path']`` is ``single_pass`` when
+    the first config was good enough and ``escalated`` otherwise.
+    """
+    configs = configs or PSM_CONFIGS
+    start = time.perf_counter()
+
+    results, timings, _ = await _run_variants(image, configs[:1], ocr_data_variant, lang=lang)
+    first = results.get(configs[0])
+
+    if first is not None and is_confident(first):
+        path = 'single_pass'
+        winner = configs[0]
+    else:
+        path = 'escalated'
+        more_results, more_timings, _ = await _run_variants(image, configs[1:], ocr_data_variant, lang=lang)
+        results.update(more_results)
+        timings.update(more_timings)
+        # Highest mean confidence wins, longer text breaks ties
+        winner = None
+        for config in configs:
+            result = results.get(config)
+            if result is None or not result['text'].strip():
+                continue
+            if winner is None or (result['mean_confidence'], len(result['text'].strip())) > \
+                    (results[winner]['mean_confidence'], len(results[winner]['text'].strip())):
+                winner = config
+    ocr_stats[path] += 1
+
+    best_text = results[winner]['text'] if winner else ""
+    if not best_text.strip():
+        best_text = await _fallback_ocr(image, timings, lang)
+        winner = 'default'
+
+    metadata = {
+        'mode': 'adaptive',
+        'path': path,
+        'selected_config': winner,
+        'first_pass': timings.get(configs[0]),
+        'thresholds': {
+            'mean_confidence': OCR_CONFIDENCE_THRESHOLD,
+            'coverage': OCR_COVERAGE_THRESHOLD
+        },
+        'variants': timings,
+        'wall_ms': round((time.perf_counter() - start) * 1000, 2)
+    }
+    return best_text, metadata
+
+
+async def run_ocr(image) -> tuple:
+    """Run OCR on an image using the configured ``OCR_MODE``.
+
+    With script routing enabled, orientation and script are detected first
+    (in the pool); the page is turned upright and every pass uses only the
+    languages chosen for it, reported in ``metadata['language']``.
+    """
+    language = None
+    if ocr_languages.routing_enabled():
+        loop = asyncio.get_running_loop()
+        language = await loop.run_in_executor(get_pool(), ocr_languages.route_page, image)
+        image = ocr_languages.upright(image, language)
+    lang = language['lang'] if language else None
+
+    if OCR_MODE == 'adaptive':
+        text, metadata = await run_adaptive(image, lang=lang)
+    else:
+        text, metadata = await run_psm_variants(image, lang=lang)
+
+    if language:
+        selected = metadata['variants'].get(metadata['selected_config'], {})
+        ocr_ms = selected.get('elapsed_ms', 0.0)
+        all_languages_ms = None
+        sample = ocr_languages.take_baseline_sample()
+        if language['routed'] and sample:
+            config = metadata['selected_config'] if metadata['selected_config'] != 'default' else ''
+            baseline = await loop.run_in_executor(get_pool(), ocr_variant, image, config,
+                                                  ocr_languages.OCR_LANGUAGES)
+            all_languages_ms = baseline['elapsed_ms']
+        ocr_languages.record_savings(language, ocr_ms, all_languages_ms)
+        metadata['language'] = language
+    return text, metadata
@@ -0,0 +1,104 @@
+"""Re-run report analysis over the archived OCR text after rule tables change.
+
+Usage:
+    python reanalyze.py                        # recompute analyses from older rules
+    python reanalyze.py --workers 8 --batch-size 500
+    python reanalyze.py --all                  # recompute every stored report
+    python reanalyze.py --dry-run              # only report how many are stale
+    python reanalyze.py --entities             # also re-run NER (otherwise entities are kept)
+
+Only text stored by the API is used; nothing is re-uploaded or re-OCRed.
+Each analysis is saved with the rules version it was computed under, so an
+interrupted run simply resumes with the reports that are still stale.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger("reanalyze")
+
+_loop = None
+
+
+def _init_worker():
+    """Import the analyzer once per worker and give it a long-lived event loop."""
+    global _loop
+    import app  # noqa: F401
+    # Per-report INFO logs from thousands of analyses are just noise here
+    logging.getLogger().setLevel(logging.WARNING)
+    _loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_loop)
+
+
+def reanalyze_report(item: dict) -> tuple:
+    """Analyze one stored report; returns (content_sha256, result or None, error or None)."""
+    import app
+    try:
+        results = _loop.run_until_complete(app.analyzer.analyze_medical_report(item['text']))
+        previous = item['previous_result']
+        if previous and results.get('entities_status') == 'disabled':
+            # NER does not depend on the rule tables; keep the entities found before
+            results['entities'] = previous.get('entities', [])
+            results['entities_status'] = previous.get('entities_status')
+        result = app.build_analysis_result(results, item['filename'], item['text'],
+                                           item['ocr_metadata'], item['content_sha256'])
+        return item['content_sha256'], result.model_dump(exclude={'filename', 'cache'}), None
+    except Exception as e:
+        detail = getattr(e, 'detail', None) or str(e)
+        return item['content_sha256'], None, detail
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--batch-size', type=int, default=200, help='reports read and saved per batch')
+    parser.add_argument('--all', action='store_true', help='recompute reports that are already current')
+    parser.add_argument('--entities', action='store_true', help='re-run the NER model as well')
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    # Configure the analyzer before it is imported (workers inherit the environment)
+    os.environ['MODEL_LOADING'] = 'lazy' if args.entities else 'off'
+    os.environ['CACHE_ENABLED'] = 'false'
+    logging.basicConfig(level=logging.INFO)
+    import app
+
+    store = app.report_store
+    if store is None or app.analyzer is None:
+        sys.exit("Report store or analyzer unavailable (is REPORT_STORE_ENABLED set?)")
+    rules_version = app.analyzer.rules_version
+    total = store.stats()['reports'] if args.all else store.count_stale(rules_version)
+    print(f"Rules version {rules_version}: {total} of {store.stats()['reports']} stored reports to analyze")
+    if args.dry_run or total == 0:
+        return
+
+    start = time.perf_counter()
+    done = failed = 0
+    # Spawned rather than forked: the parent holds sqlite connections and threads that must not be copied
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             mp_context=multiprocessing.get_context('spawn')) as pool:
+        for batch in store.iter_stale(rules_version, args.batch_size, include_current=args.all):
+            chunksize = max(1, len(batch) // (args.workers * 4))
+            analyses = []
+            for content_hash, result, error in pool.map(reanalyze_report, batch, chunksize=chunksize):
+                if error is not None:
+                    failed += 1
+                    logger.warning(f"Re-analysis of {content_hash[:12]} failed: {error}")
+                else:
+                    analyses.append((content_hash, rules_version, result))
+            store.save_analyses(analyses)
+            done += len(batch)
+            elapsed = time.perf_counter() - start
+            print(f"  {done}/{total} reports  {done / elapsed:.1f} reports/s  {failed} failed")
+
+    print(f"Re-analyzed {done - failed} reports in {time.perf_counter() - start:.1f}s "
+          f"with {args.workers} workers ({failed} failed)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", "cache/report_cache.sqlite3")
+CACHE_MEMORY_ENTRIES = int(os.getenv("CACHE_MEMORY_ENTRIES", "256"))
+CACHE_DISK_ENTRIES = int(os.getenv("CACHE_DISK_ENTRIES", "10000"))
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+
+class ReportCache:
+    """Two-tier (in-memory LRU + sqlite) cache for OCR text and analysis results.
+
+    Entries live in separate namespaces (``text`` keyed by the SHA-256 of the
+    uploaded bytes, ``analysis`` keyed by that hash plus the rules version), so
+    changing the rule tables invalidates analyses without forcing a re-OCR.
+    """
+
+    def __init__(self, db_path: str = CACHE_DB_PATH, memory_entries: int = CACHE_MEMORY_ENTRIES,
+                 disk_entries: int = CACHE_DISK_ENTRIES, ttl_seconds: int = CACHE_TTL_SECONDS):
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache_entries (accessed_at)")
+        self._db.commit()
+
+    def _count(self, namespace: str, counter: str):
+        stats = self._stats.setdefault(namespace, {'memory_hits': 0, 'disk_hits': 0, 'misses': 0})
+        stats[counter] += 1
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Return a cached value, checking memory first and then disk."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get((namespace, key))
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end((namespace, key))
+                    self._count(namespace, 'memory_hits')
+                    return value
+                del self._memory[(namespace, key)]
+
+            row = self._db.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                self._count(namespace, 'misses')
+                return None
+
+            self._db.execute(
+                "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, key)
+            )
+            self._db.commit()
+            value = json.loads(row[0])
+            self._remember(namespace, key, row[1], value)
+            self._count(namespace, 'disk_hits')
+            return value
+
+    def set(self, namespace: str, key: str, value: Any):
+        """Store a JSON-serializable value in both tiers."""
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            self._remember(namespace, key, expires_at, value)
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), expires_at, now)
+            )
+            self._evict_disk(now)
+            self._db.commit()
+
+    def _remember(self, namespace: str, key: str, expires_at: float, value: Any):
+        self._memory[(namespace, key)] = (expires_at, value)
+        self._memory.move_to_end((namespace, key))
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now: float):
+        """Drop expired rows, then the least recently used rows above the size limit."""
+        self._db.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,))
+        self._db.execute("""
+            DELETE FROM cache_entries WHERE rowid IN (
+                SELECT rowid FROM cache_entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.disk_entries,))
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters per namespace plus current tier sizes."""
+        with self._lock:
+            disk_entries = self._db.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+            return {
+                'memory_entries': len(self._memory),
+                'disk_entries': disk_entries,
+                'namespaces': {namespace: dict(counts) for namespace, counts in self._stats.items()}
+            }
+
+
+def create_cache() -> Optional[ReportCache]:
+    """Create the report cache, or return None when disabled or unavailable."""
+    if not CACHE_ENABLED:
+        return None
+    try:
+        return ReportCache()
+    except Exception as e:
+        logger.warning(f"Could not initialize report cache: {e}")
+        return None
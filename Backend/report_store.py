@@ -0,0 +1,370 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import List, Dict, Optional, Any, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+REPORT_STORE_ENABLED = os.getenv("REPORT_STORE_ENABLED", "true").lower() in ("1", "true", "yes")
+REPORT_STORE_PATH = os.getenv("REPORT_STORE_PATH", "cache/reports.sqlite3")
+# Page size limits for report queries
+REPORT_QUERY_DEFAULT_LIMIT = 50
+REPORT_QUERY_MAX_LIMIT = 500
+
+
+class ReportStore:
+    """Durable archive of extracted report text and the latest analysis of each report.
+
+    Text and analysis are kept in separate tables, both keyed by the SHA-256
+    of the uploaded bytes. The text never expires (unlike the report cache),
+    so rule changes can be applied by re-running the analysis over stored
+    text; each analysis records the rules version it was computed with.
+
+    For querying, the text is indexed with FTS5 (when sqlite has it) and
+    each analysis is flattened into indexed ``report_conditions`` and
+    ``report_lab_values`` rows, written in the same transaction.
+    """
+
+    def __init__(self, db_path: str = REPORT_STORE_PATH):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS report_texts (
+                content_sha256 TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                text TEXT NOT NULL,
+                ocr_metadata TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS report_analyses (
+                content_sha256 TEXT PRIMARY KEY REFERENCES report_texts (content_sha256),
+                rules_version TEXT NOT NULL,
+                result TEXT NOT NULL,
+                analyzed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_report_analyses_rules ON report_analyses (rules_version);
+            CREATE INDEX IF NOT EXISTS idx_report_texts_created ON report_texts (created_at);
+            CREATE INDEX IF NOT EXISTS idx_report_analyses_analyzed ON report_analyses (analyzed_at);
+            CREATE TABLE IF NOT EXISTS report_conditions (
+                content_sha256 TEXT NOT NULL,
+                condition TEXT NOT NULL COLLATE NOCASE,
+                PRIMARY KEY (content_sha256, condition)
+            );
+            CREATE INDEX IF NOT EXISTS idx_report_conditions ON report_conditions (condition);
+            CREATE TABLE IF NOT EXISTS report_lab_values (
+                content_sha256 TEXT NOT NULL,
+                lab_name TEXT NOT NULL,
+                value REAL NOT NULL,
+                status TEXT,
+                normal INTEGER,
+                PRIMARY KEY (content_sha256, lab_name)
+            );
+            CREATE INDEX IF NOT EXISTS idx_report_lab_values ON report_lab_values (lab_name, value);
+        """)
+        self.full_text = self._create_text_index()
+        self._backfill_structured()
+        self._db.commit()
+
+    def _create_text_index(self) -> bool:
+        """Create the FTS5 index over report text; False when sqlite lacks FTS5."""
+        exists = self._db.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'report_text_fts'"
+        ).fetchone() is not None
+        try:
+            self._db.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS report_text_fts USING fts5(
+                    text, content='report_texts', content_rowid='rowid', tokenize='porter unicode61'
+                );
+                CREATE TRIGGER IF NOT EXISTS report_texts_fts_insert AFTER INSERT ON report_texts BEGIN
+                    INSERT INTO report_text_fts (rowid, text) VALUES (new.rowid, new.text);
+                END;
+                CREATE TRIGGER IF NOT EXISTS report_texts_fts_delete AFTER DELETE ON report_texts BEGIN
+                    INSERT INTO report_text_fts (report_text_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+                END;
+            """)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"FTS5 unavailable, text search falls back to LIKE: {e}")
+            return False
+        if not exists:
+            # Index text stored before the index existed
+            self._db.execute("INSERT INTO report_text_fts (report_text_fts) VALUES ('rebuild')")
+        return True
+
+    def _backfill_structured(self):
+        """Flatten analyses stored before the structured tables existed."""
+        missing = self._db.execute("""
+            SELECT a.content_sha256, a.result FROM report_analyses a
+            WHERE NOT EXISTS (SELECT 1 FROM report_lab_values l WHERE l.content_sha256 = a.content_sha256)
+              AND NOT EXISTS (SELECT 1 FROM report_conditions c WHERE c.content_sha256 = a.content_sha256)
+        """).fetchall()
+        for row in missing:
+            self._index_analysis(row['content_sha256'], json.loads(row['result']))
+        if missing:
+            logger.info(f"Indexed {len(missing)} stored analyses")
+
+    def _index_analysis(self, content_hash: str, result: Dict[str, Any]):
+        """Replace the condition and lab value rows of one report (caller holds the transaction)."""
+        self._db.execute("DELETE FROM report_conditions WHERE content_sha256 = ?", (content_hash,))
+        self._db.execute("DELETE FROM report_lab_values WHERE content_sha256 = ?", (content_hash,))
+        self._db.executemany(
+            "INSERT OR IGNORE INTO report_conditions (content_sha256, condition) VALUES (?, ?)",
+            [(content_hash, condition) for condition in result.get('conditions', [])]
+        )
+        lab_details = result.get('lab_details') or {}
+        self._db.executemany(
+            "INSERT INTO report_lab_values (content_sha256, lab_name, value, status, normal) VALUES (?, ?, ?, ?, ?)",
+            [(content_hash, lab_name, value, lab_details.get(lab_name, {}).get('status'),
+              lab_details.get(lab_name, {}).get('normal'))
+             for lab_name, value in (result.get('lab_values') or {}).items()]
+        )
+
+    def save_text(self, content_hash: str, filename: str, text: str, ocr_metadata: Optional[Dict[str, Any]]):
+        """Store extracted text; the first extraction of identical bytes is kept."""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO report_texts (content_sha256, filename, text, ocr_metadata, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (content_hash, filename, text, json.dumps(ocr_metadata), time.time())
+            )
+            self._db.commit()
+
+    def get_text(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Return ``{'filename', 'text', 'ocr_metadata'}`` for a stored report, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT filename, text, ocr_metadata FROM report_texts WHERE content_sha256 = ?",
+                (content_hash,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'filename': row['filename'], 'text': row['text'], 'ocr_metadata': json.loads(row['ocr_metadata'])}
+
+    def save_analyses(self, analyses: List[tuple]):
+        """Store ``(content_hash, rules_version, result)`` tuples and their index rows in one transaction."""
+        now = time.time()
+        with self._lock:
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO report_analyses (content_sha256, rules_version, result, analyzed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(content_hash, rules_version, json.dumps(result), now)
+                     for content_hash, rules_version, result in analyses]
+                )
+                for content_hash, _, result in analyses:
+                    self._index_analysis(content_hash, result)
+                self._db.commit()
+            except Exception:
+                self._db.rollback()
+                raise
+
+    def save_reports(self, reports: List[Dict[str, Any]]):
+        """Store many analyzed reports (text and analysis) in one transaction.
+
+        Each report is a dict with ``content_sha256``, ``filename``, ``text``,
+        ``ocr_metadata``, ``rules_version`` and ``result``.
+        """
+        now = time.time()
+        with self._lock:
+            try:
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO report_texts (content_sha256, filename, text, ocr_metadata, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(r['content_sha256'], r['filename'], r['text'], json.dumps(r['ocr_metadata']), now)
+                     for r in reports]
+                )
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO report_analyses (content_sha256, rules_version, result, analyzed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(r['content_sha256'], r['rules_version'], json.dumps(r['result']), now) for r in reports]
+                )
+                for report in reports:
+                    self._index_analysis(report['content_sha256'], report['result'])
+                self._db.commit()
+            except Exception:
+                self._db.rollback()
+                raise
+
+    def save_analysis(self, content_hash: str, rules_version: str, result: Dict[str, Any]):
+        self.save_analyses([(content_hash, rules_version, result)])
+
+    def get_analysis(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Return ``{'rules_version', 'result', 'analyzed_at'}`` for a report, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT rules_version, result, analyzed_at FROM report_analyses WHERE content_sha256 = ?",
+                (content_hash,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'rules_version': row['rules_version'], 'result': json.loads(row['result']),
+                'analyzed_at': row['analyzed_at']}
+
+    _STALE_WHERE = "a.content_sha256 IS NULL OR a.rules_version != ?"
+
+    def count_stale(self, rules_version: str) -> int:
+        """Number of stored reports without an analysis under ``rules_version``."""
+        with self._lock:
+            return self._db.execute(
+                f"SELECT COUNT(*) FROM report_texts t LEFT JOIN report_analyses a "
+                f"ON a.content_sha256 = t.content_sha256 WHERE {self._STALE_WHERE}",
+                (rules_version,)
+            ).fetchone()[0]
+
+    def iter_stale(self, rules_version: str, batch_size: int = 200,
+                   include_current: bool = False) -> Iterator[List[Dict[str, Any]]]:
+        """Yield batches of stored reports whose analysis is missing or from other rules.
+
+        Each item has the stored text and metadata plus the previous result
+        (or None). Paging is by content hash, so reports re-analyzed while
+        iterating are not revisited.
+        """
+        where = "1 = 1" if include_current else self._STALE_WHERE
+        params = () if include_current else (rules_version,)
+        after = ''
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    f"SELECT t.content_sha256, t.filename, t.text, t.ocr_metadata, a.result "
+                    f"FROM report_texts t LEFT JOIN report_analyses a ON a.content_sha256 = t.content_sha256 "
+                    f"WHERE ({where}) AND t.content_sha256 > ? ORDER BY t.content_sha256 LIMIT ?",
+                    (*params, after, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            after = rows[-1]['content_sha256']
+            yield [{
+                'content_sha256': row['content_sha256'],
+                'filename': row['filename'],
+                'text': row['text'],
+                'ocr_metadata': json.loads(row['ocr_metadata']),
+                'previous_result': json.loads(row['result']) if row['result'] else None
+            } for row in rows]
+
+    @staticmethod
+    def _match_expression(text: str) -> str:
+        """Quote every search term so user input can't be read as FTS5 query syntax."""
+        return " ".join('"' + term.replace('"', '""') + '"' for term in text.split())
+
+    def query(self, text: Optional[str] = None, condition: Optional[str] = None,
+              lab_name: Optional[str] = None, min_value: Optional[float] = None,
+              max_value: Optional[float] = None, lab_status: Optional[str] = None,
+              abnormal: Optional[bool] = None, since: Optional[float] = None,
+              until: Optional[float] = None, limit: int = REPORT_QUERY_DEFAULT_LIMIT,
+              cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Find stored reports, newest first, returning ``{'items', 'next_cursor'}``.
+
+        Filters combine with AND: ``text`` (all terms must occur),
+        ``condition``, one lab with an inclusive value range, status or
+        abnormal flag, and an upload time window (epoch seconds). Pass the
+        returned ``next_cursor`` back to get the following page.
+        """
+        limit = max(1, min(limit, REPORT_QUERY_MAX_LIMIT))
+        where, params = [], []
+        if text and text.split():
+            if self.full_text:
+                where.append("t.rowid IN (SELECT rowid FROM report_text_fts WHERE report_text_fts MATCH ?)")
+                params.append(self._match_expression(text))
+            else:
+                for term in text.split():
+                    where.append("t.text LIKE ?")
+                    params.append(f"%{term}%")
+        if condition:
+            where.append("t.content_sha256 IN (SELECT content_sha256 FROM report_conditions WHERE condition = ?)")
+            params.append(condition)
+        if lab_name or min_value is not None or max_value is not None or lab_status or abnormal is not None:
+            if not lab_name:
+                raise ValueError("Lab value filters need a lab name")
+            lab_where, lab_params = ["lab_name = ?"], [lab_name]
+            if min_value is not None:
+                lab_where.append("value >= ?")
+                lab_params.append(min_value)
+            if max_value is not None:
+                lab_where.append("value <= ?")
+                lab_params.append(max_value)
+            if lab_status:
+                lab_where.append("status = ?")
+                lab_params.append(lab_status)
+            if abnormal is not None:
+                lab_where.append("normal = ?")
+                lab_params.append(0 if abnormal else 1)
+            where.append(f"t.content_sha256 IN (SELECT content_sha256 FROM report_lab_values "
+                         f"WHERE {' AND '.join(lab_where)})")
+            params.extend(lab_params)
+        if since is not None:
+            where.append("t.created_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("t.created_at < ?")
+            params.append(until)
+        if cursor:
+            try:
+                created_at, content_hash = cursor.split(':', 1)
+                params.extend([float(created_at), float(created_at), content_hash])
+            except ValueError:
+                raise ValueError("Invalid cursor")
+            where.append("(t.created_at < ? OR (t.created_at = ? AND t.content_sha256 < ?))")
+
+        sql = (
+            "SELECT t.rowid, t.content_sha256, t.filename, t.created_at, "
+            "a.rules_version, a.analyzed_at, a.result "
+            "FROM report_texts t LEFT JOIN report_analyses a ON a.content_sha256 = t.content_sha256 "
+            f"WHERE {' AND '.join(where) if where else '1 = 1'} "
+            "ORDER BY t.created_at DESC, t.content_sha256 DESC LIMIT ?"
+        )
+        with self._lock:
+            rows = self._db.execute(sql, (*params, limit + 1)).fetchall()
+            snippets = {}
+            if text and text.split() and self.full_text and rows:
+                snippet_rows = self._db.execute(
+                    "SELECT rowid, snippet(report_text_fts, 0, '[', ']', '...', 12) FROM report_text_fts "
+                    f"WHERE report_text_fts MATCH ? AND rowid IN ({','.join('?' * len(rows[:limit]))})",
+                    (self._match_expression(text), *[row['rowid'] for row in rows[:limit]])
+                ).fetchall()
+                snippets = {row[0]: row[1] for row in snippet_rows}
+
+        items = []
+        for row in rows[:limit]:
+            result = json.loads(row['result']) if row['result'] else {}
+            items.append({
+                'content_sha256': row['content_sha256'],
+                'filename': row['filename'],
+                'created_at': row['created_at'],
+                'analyzed_at': row['analyzed_at'],
+                'rules_version': row['rules_version'],
+                'conditions': result.get('conditions', []),
+                'lab_values': result.get('lab_values', {}),
+                'summary': result.get('summary'),
+                'snippet': snippets.get(row['rowid'])
+            })
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = f"{last['created_at']!r}:{last['content_sha256']}"
+        return {'items': items, 'next_cursor': next_cursor}
+
+    def stats(self) -> Dict[str, Any]:
+        """Stored report and analysis counts (see ``count_stale`` for outdated analyses)."""
+        with self._lock:
+            texts = self._db.execute("SELECT COUNT(*) FROM report_texts").fetchone()[0]
+            analyses = self._db.execute("SELECT COUNT(*) FROM report_analyses").fetchone()[0]
+        return {'reports': texts, 'analyses': analyses, 'full_text_index': self.full_text}
+
+
+def create_store() -> Optional[ReportStore]:
+    """Create the report store, or return None when disabled or unavailable."""
+    if not REPORT_STORE_ENABLED:
+        return None
+    try:
+        return ReportStore()
+    except Exception as e:
+        logger.warning(f"Could not initialize report store: {e}")
+        return None
@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Any, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Cosine similarity a new question needs with a cached one to reuse its answer.
+# all-MiniLM-L6-v2 puts rephrasings of one question around 0.9+, while questions
+# about related conditions ("type 1" vs "type 2 diabetes") can also score high,
+# so keep this strict
+RESPONSE_CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.92"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+# Upper bound on answer text plus embeddings held in memory
+RESPONSE_CACHE_MAX_MB = float(os.getenv("RESPONSE_CACHE_MAX_MB", "32"))
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", str(24 * 3600)))
+
+
+class SemanticResponseCache:
+    """In-memory cache of chatbot answers, looked up by query embedding.
+
+    Embeddings live in one preallocated matrix (one row per slot), so a lookup
+    is a single matrix-vector product over at most ``max_entries`` rows. A hit
+    needs the same language, the same knowledge-base version and a cosine
+    similarity of at least ``threshold``; entries are evicted least recently
+    used first, when expired, or when the memory bound is reached.
+    """
+
+    def __init__(self, threshold: float = RESPONSE_CACHE_THRESHOLD, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 max_bytes: int = int(RESPONSE_CACHE_MAX_MB * 1024 * 1024),
+                 ttl_seconds: int = RESPONSE_CACHE_TTL_SECONDS):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.kb_version: Optional[str] = None
+        self._vectors: Optional[np.ndarray] = None
+        # Language id per slot, -1 for free slots
+        self._slot_language = np.full(max_entries, -1, dtype=np.int32)
+        self._language_ids: Dict[str, int] = {}
+        # slot -> entry, least recently used first
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._free = list(range(max_entries - 1, -1, -1))
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'lookups': 0, 'hits': 0, 'misses': 0, 'inserts': 0, 'lru_evictions': 0,
+                       'size_evictions': 0, 'expired': 0, 'invalidated': 0, 'stale_inserts': 0}
+        self._languages: Dict[str, Dict[str, int]] = {}
+        self._hit_similarity = 0.0
+
+    def _normalize(self, embedding) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        if not norm or (self._vectors is not None and vector.shape[0] != self._vectors.shape[1]):
+            return None
+        return vector / norm
+
+    def _remove(self, slot: int):
+        entry = self._entries.pop(slot)
+        self._slot_language[slot] = -1
+        self._vectors[slot] = 0
+        self._free.append(slot)
+        self._bytes -= entry['nbytes']
+
+    def _check_version(self, kb_version: str):
+        """Drop every entry when the knowledge base changed since the last lookup."""
+        if kb_version == self.kb_version:
+            return
+        if self._entries:
+            logger.info(f"Knowledge base version changed, dropping {len(self._entries)} cached responses")
+            self._stats['invalidated'] += len(self._entries)
+            for slot in list(self._entries):
+                self._remove(slot)
+        self.kb_version = kb_version
+
+    def _count(self, language: str, counter: str):
+        self._stats[counter] += 1
+        stats = self._languages.setdefault(language, {'hits': 0, 'misses': 0})
+        stats[counter] += 1
+
+    def lookup(self, embedding, language: str, kb_version: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Return ``(value, similarity)`` of the closest cached answer, or None below the threshold."""
+        query = self._normalize(embedding)
+        now = time.time()
+        with self._lock:
+            self._stats['lookups'] += 1
+            self._check_version(kb_version)
+            language_id = self._language_ids.get(language)
+            if query is None or language_id is None or not self._entries:
+                self._count(language, 'misses')
+                return None
+
+            similarities = self._vectors @ query
+            similarities[self._slot_language != language_id] = -np.inf
+            slot = int(np.argmax(similarities))
+            similarity = float(similarities[slot])
+            if similarity < self.threshold:
+                self._count(language, 'misses')
+                return None
+            entry = self._entries[slot]
+            if entry['expires_at'] <= now:
+                self._remove(slot)
+                self._stats['expired'] += 1
+                self._count(language, 'misses')
+                return None
+
+            self._entries.move_to_end(slot)
+            entry['hits'] += 1
+            self._hit_similarity += similarity
+            self._count(language, 'hits')
+            return entry['value'], similarity
+
+    def put(self, embedding, language: str, kb_version: str, value: Dict[str, Any]):
+        """Cache a JSON-serializable answer for a query embedding.
+
+        Answers generated against an older knowledge base (one that changed
+        while the answer was being generated) are not stored.
+        """
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+        nbytes = len(json.dumps(value)) + vector.nbytes
+        now = time.time()
+        with self._lock:
+            if kb_version != self.kb_version:
+                self._stats['stale_inserts'] += 1
+                return
+            if nbytes > self.max_bytes:
+                return
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+
+            # Expired entries at the cold end go first (others are dropped when a lookup finds them),
+            # then the least recently used
+            while self._entries and next(iter(self._entries.values()))['expires_at'] <= now:
+                self._remove(next(iter(self._entries)))
+                self._stats['expired'] += 1
+            while self._entries and not self._free:
+                self._remove(next(iter(self._entries)))
+                self._stats['lru_evictions'] += 1
+            while self._entries and self._bytes + nbytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats['size_evictions'] += 1
+
+            slot = self._free.pop()
+            self._vectors[slot] = vector
+            self._slot_language[slot] = self._language_ids.setdefault(language, len(self._language_ids))
+            self._entries[slot] = {'value': value, 'expires_at': now + self.ttl_seconds,
+                                   'nbytes': nbytes, 'hits': 0}
+            self._bytes += nbytes
+            self._stats['inserts'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters (overall and per language), evictions and memory use."""
+        with self._lock:
+            lookups = self._stats['lookups']
+            return {
+                **self._stats,
+                'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else None,
+                'mean_hit_similarity': round(self._hit_similarity / self._stats['hits'], 4)
+                if self._stats['hits'] else None,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'threshold': self.threshold,
+                'kb_version': self.kb_version,
+                'languages': {language: dict(counts) for language, counts in self._languages.items()}
+            }
+
+
+def create_cache() -> Optional[SemanticResponseCache]:
+    """Create the chatbot response cache, or return None when disabled."""
+    if not RESPONSE_CACHE_ENABLED or RESPONSE_CACHE_MAX_ENTRIES <= 0:
+        return None
+    return SemanticResponseCache()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Backend modules are flat, imported by name as app.py does
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,45 @@
+import pytest
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    cache = tmp_path_factory.mktemp("cache")
+    with pytest.MonkeyPatch.context() as env:
+        # The app reads its configuration at import
+        env.setenv("MODEL_LOADING", "off")
+        env.setenv("CACHE_ENABLED", "false")
+        env.setenv("REPORT_STORE_ENABLED", "false")
+        env.setenv("KEYWORD_AUTOMATON_CACHE", str(cache / "keyword_automaton.json"))
+        env.setenv("JOBS_DB_PATH", str(cache / "jobs.sqlite3"))
+        env.setenv("JOBS_UPLOAD_DIR", str(cache / "job_uploads"))
+        env.setenv("LAB_TRENDS_PATH", str(cache / "lab_trends"))
+        testclient = pytest.importorskip("fastapi.testclient")
+        app = pytest.importorskip("app")
+    # Without the context manager startup hooks (job runners, model warm-up) don't run
+    return app, testclient.TestClient(app.app)
+
+
+@pytest.mark.parametrize("path", ["/patients/p1/lab-trends", "/reports", "/reports/" + "0" * 64])
+def test_patient_data_needs_a_configured_key(client, monkeypatch, path):
+    app, http = client
+    monkeypatch.setattr(app, 'REPORTS_API_KEY', None)
+    assert http.get(path, headers={"X-API-Key": "anything"}).status_code == 503
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-API-Key": "wrong"}])
+def test_lab_trends_reject_missing_or_wrong_key(client, monkeypatch, headers):
+    app, http = client
+    monkeypatch.setattr(app, 'REPORTS_API_KEY', "secret")
+    response = http.get("/patients/p1/lab-trends", headers=headers)
+    assert response.status_code == 401
+    assert response.headers["WWW-Authenticate"] == "X-API-Key"
+
+
+def test_lab_trends_accept_the_key(client, monkeypatch):
+    app, http = client
+    monkeypatch.setattr(app, 'REPORTS_API_KEY', "secret")
+    monkeypatch.setattr(app, 'get_lab_trend_store', lambda: None)
+    response = http.get("/patients/p1/lab-trends", headers={"X-API-Key": "secret"})
+    # Past the key check: the (disabled) store answers
+    assert response.status_code == 503
+    assert response.json()["detail"] == "Lab trend store is disabled"
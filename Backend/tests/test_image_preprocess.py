@@ -0,0 +1,31 @@
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+pytest.importorskip("cv2")
+
+import image_preprocess  # noqa: E402
+
+
+def blank_page(size, dpi=None):
+    image = Image.new('L', size, 255)
+    if dpi:
+        image.info['dpi'] = (dpi, dpi)
+    return image
+
+
+def test_tagged_image_is_resized_to_the_target_dpi():
+    _, metadata = image_preprocess.preprocess(blank_page((1240, 1754), dpi=150), steps=['resize'])
+    assert metadata['scale'] == 2.0
+    assert metadata['output_size'] == [2480, 3508]
+
+
+def test_untagged_small_image_is_not_blown_up():
+    # An A4 guess would scale this screenshot about 4.5x
+    _, metadata = image_preprocess.preprocess(blank_page((600, 800)), steps=['resize'])
+    assert metadata['scale'] == image_preprocess.MAX_GUESSED_UPSCALE
+    assert metadata['output_size'] == [900, 1200]
+
+
+def test_untagged_large_image_is_still_downscaled():
+    _, metadata = image_preprocess.preprocess(blank_page((3000, 7020)), steps=['resize'])
+    assert metadata['scale'] == 0.5
@@ -0,0 +1,122 @@
+import os
+import hashlib
+import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from import_reports import ImportCheckpoint, check_file, flush, import_checked, list_files
+
+
+def allowed_file(name):
+    return name.lower().endswith(('.pdf', '.png'))
+
+
+class FakeStore:
+    def __init__(self, analyses=None):
+        self.analyses = analyses or {}
+        self.saved = []
+
+    def get_analysis(self, content_hash):
+        return self.analyses.get(content_hash)
+
+    def save_reports(self, reports):
+        self.saved.extend(reports)
+
+
+def make_tree(tmp_path):
+    root = tmp_path / "archive"
+    (root / "2023").mkdir(parents=True)
+    (root / "2023" / "a.pdf").write_bytes(b"report a")
+    (root / "b.png").write_bytes(b"report bb")
+    (root / "notes.txt").write_bytes(b"skip me")
+    return root
+
+
+def test_list_files_from_directory_and_zip(tmp_path):
+    root = make_tree(tmp_path)
+    expected = [("2023/a.pdf", 8), ("b.png", 9)]
+    assert list_files(str(root), allowed_file) == expected
+
+    archive = tmp_path / "archive.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        for path, _ in expected:
+            zf.write(root / path, path)
+        zf.writestr("notes.txt", "skip me")
+    assert list_files(str(archive), allowed_file) == expected
+
+
+def test_check_file_skips_reports_analyzed_under_current_rules(tmp_path):
+    root = make_tree(tmp_path)
+    content_hash = hashlib.sha256(b"report a").hexdigest()
+
+    store = FakeStore({content_hash: {'rules_version': 'v1'}})
+    outcome, content = check_file(str(root), "2023/a.pdf", 8, store, 'v1', 1024)
+    assert (outcome['status'], outcome['content_sha256'], content) == ('duplicate', content_hash, None)
+
+    # Analyzed under older rules: needs the worker again
+    outcome, content = check_file(str(root), "2023/a.pdf", 8, store, 'v2', 1024)
+    assert content == b"report a"
+    assert outcome['content_sha256'] == content_hash
+
+
+def test_check_file_failures_never_reach_a_worker(tmp_path):
+    root = make_tree(tmp_path)
+    outcome, content = check_file(str(root), "b.png", 9, FakeStore(), 'v1', 4)
+    assert content is None
+    assert outcome['status'] == 'failed' and 'maximum allowed size' in outcome['error']
+
+    outcome, content = check_file(str(root), "missing.pdf", 1, FakeStore(), 'v1', 1024)
+    assert content is None
+    assert outcome['status'] == 'failed' and outcome['error']
+
+
+def test_flush_saves_reports_then_checkpoints_every_file(tmp_path):
+    checkpoint = ImportCheckpoint(str(tmp_path / "checkpoint.sqlite3"), "/data/archive")
+    store = FakeStore()
+    report = {'content_sha256': 'h1'}
+    flush(store, checkpoint, [
+        {'path': 'a.pdf', 'size': 8, 'status': 'done', 'content_sha256': 'h1', 'error': None, 'report': report},
+        {'path': 'b.pdf', 'size': 9, 'status': 'duplicate', 'content_sha256': 'h2', 'error': None},
+        {'path': 'c.pdf', 'size': 3, 'status': 'failed', 'content_sha256': None, 'error': 'boom'},
+    ])
+    assert store.saved == [report]
+    assert checkpoint.finished(retry_failed=False) == {'a.pdf': 8, 'b.pdf': 9, 'c.pdf': 3}
+    assert checkpoint.finished(retry_failed=True) == {'a.pdf': 8, 'b.pdf': 9}
+    # Checkpoints are per source
+    assert ImportCheckpoint(str(tmp_path / "checkpoint.sqlite3"), "/other").finished(False) == {}
+
+
+
+def fake_import(outcome, content):
+    if content == b"crash":
+        os._exit(1)
+    if content == b"raise":
+        raise RuntimeError("unpicklable result")
+    outcome['status'] = 'done'
+    return outcome
+
+
+def checked(contents):
+    for i, content in enumerate(contents):
+        outcome = {'path': f"{i}.pdf", 'size': len(content or b""), 'status': 'failed',
+                   'content_sha256': None, 'error': None if content else 'unreadable'}
+        yield outcome, content
+
+
+def test_import_checked_survives_a_crashing_file():
+    pools = []
+
+    def make_pool():
+        pools.append(ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('fork')))
+        return pools[-1]
+
+    contents = [b"ok", b"ok", b"crash", None, b"ok", b"raise", b"ok"]
+    outcomes = {o['path']: o for o in import_checked(checked(contents), 2, make_pool, work=fake_import)}
+
+    assert sorted(outcomes) == [f"{i}.pdf" for i in range(len(contents))]
+    assert outcomes['2.pdf']['status'] == 'failed' and 'crashed' in outcomes['2.pdf']['error']
+    assert outcomes['3.pdf']['error'] == 'unreadable'
+    assert outcomes['5.pdf']['error'] == 'unpicklable result'
+    # Files in flight with the crashing one were rerun, not failed
+    assert sorted(path for path, o in outcomes.items() if o['status'] == 'done') == ['0.pdf', '1.pdf', '4.pdf', '6.pdf']
+    assert len(pools) >= 2
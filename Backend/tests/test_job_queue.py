@@ -0,0 +1,132 @@
+import time
+import asyncio
+from pathlib import Path
+
+import job_queue
+
+
+def make_queue(tmp_path, **kwargs):
+    return job_queue.JobQueue(str(tmp_path / "jobs.sqlite3"), str(tmp_path / "uploads"), **kwargs)
+
+
+def expire_lease(queue, job_id):
+    queue._db.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time() - queue.lease_seconds - 1, job_id))
+
+
+def test_claim_runs_jobs_in_submission_order(tmp_path):
+    queue = make_queue(tmp_path)
+    first = queue.submit("a.pdf", b"a")
+    second = queue.submit("b.pdf", b"b")
+
+    assert queue.claim()['id'] == first
+    assert queue.claim()['id'] == second
+    assert queue.claim() is None
+    assert queue.get(first)['attempts'] == 1
+    assert queue.stats() == {'running': 2}
+
+
+def test_complete_stores_result_and_removes_upload(tmp_path):
+    queue = make_queue(tmp_path)
+    job_id = queue.submit("a.pdf", b"a")
+    job = queue.claim()
+    queue.complete(job_id, {'ok': True})
+
+    stored = queue.get(job_id)
+    assert stored['status'] == 'done'
+    assert stored['result'] == {'ok': True}
+    assert not Path(job['content_path']).exists()
+    assert [event['event'] for event in queue.events_since(job_id)] == ['queued', 'done']
+
+
+def test_live_jobs_are_not_requeued(tmp_path):
+    queue = make_queue(tmp_path)
+    job_id = queue.submit("a.pdf", b"a")
+    queue.claim()
+
+    # Another process starting up must leave the job alone
+    assert make_queue(tmp_path).requeue_interrupted() == 0
+    assert queue.get(job_id)['status'] == 'running'
+
+
+def test_expired_lease_is_requeued(tmp_path):
+    queue = make_queue(tmp_path)
+    job_id = queue.submit("a.pdf", b"a")
+    queue.claim()
+    expire_lease(queue, job_id)
+
+    assert queue.requeue_interrupted() == 1
+    assert queue.get(job_id)['status'] == 'queued'
+    assert queue.claim()['id'] == job_id
+    assert queue.get(job_id)['attempts'] == 2
+
+
+def test_heartbeat_renews_lease(tmp_path):
+    queue = make_queue(tmp_path)
+    job_id = queue.submit("a.pdf", b"a")
+    queue.claim()
+    expire_lease(queue, job_id)
+    queue.heartbeat(job_id)
+
+    assert queue.requeue_interrupted() == 0
+    assert queue.get(job_id)['status'] == 'running'
+
+
+def test_hold_lease_heartbeats_until_cancelled(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=0.03)
+    job_id = queue.submit("a.pdf", b"a")
+    queue.claim()
+
+    async def run():
+        lease = asyncio.create_task(queue.hold_lease(job_id))
+        await asyncio.sleep(0.1)
+        assert queue.requeue_interrupted() == 0
+        lease.cancel()
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert queue.requeue_interrupted() == 1
+
+
+def test_job_fails_after_max_attempts(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=2)
+    job_id = queue.submit("a.pdf", b"a")
+    for _ in range(2):
+        job = queue.claim()
+        assert job['id'] == job_id
+        expire_lease(queue, job_id)
+        queue.requeue_interrupted()
+
+    stored = queue.get(job_id)
+    assert stored['status'] == 'failed'
+    assert stored['attempts'] == 2
+    assert "interrupted 2 times" in stored['error']
+    assert queue.claim() is None
+    assert queue.events_since(job_id)[-1]['event'] == 'failed'
+    assert list((tmp_path / "uploads").iterdir()) == []
+
+
+def test_queue_without_heartbeat_column_is_migrated(tmp_path):
+    queue = make_queue(tmp_path)
+    job_id = queue.submit("a.pdf", b"a")
+    queue.claim()
+    queue._db.execute("ALTER TABLE jobs DROP COLUMN heartbeat_at")
+    queue._db.execute("UPDATE jobs SET started_at = ?", (time.time() - queue.lease_seconds - 1,))
+    queue._db.close()
+
+    # Jobs running under the old schema only have started_at to go by
+    reopened = make_queue(tmp_path)
+    assert reopened.requeue_interrupted() == 1
+    assert reopened.get(job_id)['status'] == 'queued'
+
+
+def test_exclusive_claim_waits_for_the_running_job(tmp_path):
+    queue = make_queue(tmp_path)
+    first = queue.submit("a.txt", b"a")
+    second = queue.submit("b.txt", b"b")
+    assert queue.claim(exclusive=True)['id'] == first
+
+    # Another process sharing the queue
+    other = make_queue(tmp_path)
+    assert other.claim(exclusive=True) is None
+    queue.complete(first, {})
+    assert other.claim(exclusive=True)['id'] == second
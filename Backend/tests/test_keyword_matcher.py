@@ -0,0 +1,72 @@
+import re
+import json
+import random
+
+import pytest
+
+from keyword_matcher import AhoCorasick, DiseaseMatcher, load_disease_rules
+
+DISEASE_RULES = load_disease_rules()
+
+
+def legacy_keyword_match(disease_patterns, text):
+    """The per-keyword loop DiseaseMatcher replaced."""
+    detected_diseases = []
+    confidence_scores = {}
+    for disease, disease_info in disease_patterns.items():
+        score = 0
+        for keyword in disease_info['keywords']:
+            if keyword.lower() in text.lower():
+                score += 1
+        for pattern in disease_info['patterns']:
+            score += len(re.findall(pattern, text, re.IGNORECASE)) * 2
+        if score > 0:
+            detected_diseases.append(disease)
+            confidence_scores[disease] = min(score / 3.0, 1.0)
+    return detected_diseases, confidence_scores
+
+
+def test_automaton_finds_overlapping_keywords():
+    keywords = ['he', 'she', 'his', 'hers']
+    automaton = AhoCorasick(keywords)
+    assert {keywords[i] for i in automaton.find_ids('ushers')} == {'he', 'she', 'hers'}
+
+
+@pytest.mark.parametrize('seed', range(100))
+def test_matcher_matches_legacy_loop(seed):
+    rng = random.Random(seed)
+    words = [keyword for info in DISEASE_RULES.values() for keyword in info['keywords']]
+    words += ['patient', 'stable', 'Blood sugar 180', 'BP 150/95', 'report', 'DM', 'hb low']
+    text = " ".join(rng.choice([str.upper, str.lower, str.title])(rng.choice(words))
+                    for _ in range(rng.randint(0, 15)))
+    assert DiseaseMatcher(DISEASE_RULES).match(text) == legacy_keyword_match(DISEASE_RULES, text)
+
+
+def test_cached_automaton_is_reused(tmp_path):
+    cache_path = str(tmp_path / 'automaton.json')
+    built = DiseaseMatcher(DISEASE_RULES, cache_path)
+    with open(cache_path, 'r', encoding='utf-8') as f:
+        assert 'tables' in json.load(f)
+    loaded = DiseaseMatcher(DISEASE_RULES, cache_path)
+    assert loaded.automaton.goto == built.automaton.goto
+    text = "Known diabetic with hypertension and low hemoglobin"
+    assert loaded.match(text) == built.match(text)
+
+
+def test_inconsistent_cache_is_rebuilt(tmp_path):
+    cache_path = tmp_path / 'automaton.json'
+    DiseaseMatcher(DISEASE_RULES, str(cache_path))
+    cached = json.loads(cache_path.read_text(encoding='utf-8'))
+    cached['tables']['goto'][0] = {'d': 10 ** 6}
+    cache_path.write_text(json.dumps(cached), encoding='utf-8')
+
+    matcher = DiseaseMatcher(DISEASE_RULES, str(cache_path))
+    text = "History of diabetes"
+    assert matcher.match(text) == legacy_keyword_match(DISEASE_RULES, text)
+
+
+def test_pickle_cache_is_not_loaded(tmp_path):
+    cache_path = tmp_path / 'automaton.json'
+    cache_path.write_bytes(b'\x80\x04\x95not json')
+    matcher = DiseaseMatcher(DISEASE_RULES, str(cache_path))
+    assert matcher.match("diabetic")[0] == legacy_keyword_match(DISEASE_RULES, "diabetic")[0]
@@ -0,0 +1,132 @@
+import pytest
+
+import knowledge_base
+from knowledge_base import KnowledgeBaseIndex, chunk_hash
+
+
+class FakeCollection:
+    def __init__(self, client, name):
+        self.name = name
+        self.rows = client.collections.setdefault(name, {})
+
+    def count(self):
+        return len(self.rows)
+
+    def add(self, ids, embeddings, documents, metadatas):
+        for row in zip(ids, embeddings, documents, metadatas):
+            self.rows[row[0]] = row[1:]
+
+    def get(self, include):
+        rows = list(self.rows.values())
+        return {'ids': list(self.rows), 'embeddings': [row[0] for row in rows],
+                'documents': [row[1] for row in rows], 'metadatas': [row[2] for row in rows]}
+
+
+class FakeClient:
+    """Collections shared by every store opened on one directory, like a persistent Chroma."""
+
+    def __init__(self):
+        self.collections = {}
+
+    def list_collections(self):
+        return list(self.collections)
+
+    def delete_collection(self, name):
+        del self.collections[name]
+
+
+def fake_chroma(client):
+    class FakeChroma:
+        def __init__(self, collection_name=knowledge_base.LEGACY_COLLECTION, persist_directory=None,
+                     embedding_function=None):
+            self._client = client
+            self._collection = FakeCollection(client, collection_name)
+
+        def delete_collection(self):
+            client.delete_collection(self._collection.name)
+    return FakeChroma
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text))] for text in texts]
+
+
+class ParagraphSplitter:
+    def __init__(self, **kwargs):
+        pass
+
+    def split_text(self, text):
+        return [paragraph for paragraph in text.split("\n\n") if paragraph]
+
+
+@pytest.fixture
+def kb(tmp_path):
+    client = FakeClient()
+    embeddings = FakeEmbeddings()
+    index = KnowledgeBaseIndex(tmp_path / "chroma", embeddings, fake_chroma(client), ParagraphSplitter)
+    data_file = tmp_path / "health.txt"
+
+    def ingest(text, store=None):
+        data_file.write_text(text, encoding='utf-8')
+        return index.ingest(str(data_file), 'health.txt', store)
+    return index, client, embeddings, ingest
+
+
+def test_split_keys_chunks_by_hash_in_order_without_repeats(kb):
+    index = kb[0]
+    chunks = index.split("b\n\na\n\nb\n\nc")
+    assert list(chunks.values()) == ['b', 'a', 'c']
+    assert list(chunks) == [chunk_hash(text) for text in ('b', 'a', 'c')]
+
+
+def test_incremental_ingest_only_embeds_new_chunks(kb):
+    index, client, embeddings, ingest = kb
+    store, summary = ingest("p1\n\np2\n\np3")
+    assert (summary['embedded'], summary['reused'], summary['unchanged']) == (3, 0, False)
+
+    same_store, summary = ingest("p1\n\np2\n\np3", store)
+    assert same_store is store and summary['unchanged']
+
+    new_store, summary = ingest("p1\n\np2 edited\n\np4", store)
+    assert (summary['embedded'], summary['reused'], summary['removed']) == (2, 1, 2)
+    assert embeddings.embedded == ['p1', 'p2', 'p3', 'p2 edited', 'p4']
+    assert sorted(row[1] for row in new_store._collection.rows.values()) == ['p1', 'p2 edited', 'p4']
+    # Same result as building the index from scratch
+    assert summary['version'] == knowledge_base.index_version(index.split("p4\n\np1\n\np2 edited"))
+
+
+def test_ingest_reuses_legacy_collection_and_drops_old_versions(kb):
+    index, client, embeddings, ingest = kb
+    legacy = fake_chroma(client)()
+    legacy._collection.add(['x', 'y'], [[1.0], [1.0]], ['p1', 'p1'], [{}, {}])
+
+    first, _ = ingest("p1\n\np2", legacy)
+    assert embeddings.embedded == ['p2']
+    # The store being replaced is kept until the next update
+    assert knowledge_base.LEGACY_COLLECTION in client.collections
+
+    second, _ = ingest("p3", first)
+    assert sorted(client.collections) == sorted({first._collection.name, second._collection.name})
+    assert index.manifest['collection'] == second._collection.name
+
+
+def test_other_processes_follow_the_manifest(kb, tmp_path):
+    index, client, embeddings, ingest = kb
+    follower = KnowledgeBaseIndex(tmp_path / "chroma", embeddings, fake_chroma(client), ParagraphSplitter)
+    assert follower.current_if_changed(None) is None
+
+    store, summary = ingest("p1\n\np2")
+    reopened, version = follower.current_if_changed(None)
+    assert version == summary['version']
+    assert reopened._collection.name == store._collection.name
+    # Nothing changed since the last poll
+    assert follower.current_if_changed(None) is None
+
+    _, summary = ingest("p3", store)
+    assert follower.current_if_changed(summary['version']) is None
+    assert follower.current_if_changed(summary['version']) is None
@@ -0,0 +1,69 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from lab_cohort import CohortLabClassifier
+from lab_engine import NORMAL_STATUSES, load_lab_rules
+
+LAB_RULES = load_lab_rules()
+CLASSIFIER = CohortLabClassifier(LAB_RULES)
+
+
+def legacy_status(ranges, value):
+    """The first-match loop of MedicalReportAnalyzer.analyze_lab_values."""
+    for min_val, max_val, range_status in ranges:
+        if min_val <= value <= max_val:
+            return range_status
+    return 'unknown'
+
+
+def probe_values(ranges, rng):
+    """Every bound, values just either side of it, midpoints and random values."""
+    bounds = sorted({bound for min_val, max_val, _ in ranges for bound in (min_val, max_val) if math.isfinite(bound)})
+    values = []
+    for bound in bounds:
+        values.extend([bound, np.nextafter(bound, -np.inf), np.nextafter(bound, np.inf), bound - 0.5, bound + 0.5])
+    values.extend((low + high) / 2 for low, high in zip(bounds, bounds[1:]))
+    values.extend(rng.uniform(-10, (bounds[-1] if bounds else 100) * 2) for _ in range(200))
+    values.extend([-1e9, 1e9, np.inf])
+    return values
+
+
+@pytest.mark.parametrize("lab_name", sorted(LAB_RULES))
+def test_matches_scalar_loop_for_every_rule(lab_name):
+    ranges = LAB_RULES[lab_name]['ranges']
+    values = probe_values(ranges, random.Random(lab_name))
+
+    codes, abnormal = CLASSIFIER.classify(lab_name, values)
+    statuses = [CLASSIFIER.status_names[code] for code in codes]
+    expected = [legacy_status(ranges, value) for value in values]
+    assert statuses == expected
+    assert abnormal.tolist() == [status not in NORMAL_STATUSES for status in expected]
+
+
+def test_missing_values_are_unknown():
+    lab_name = next(iter(LAB_RULES))
+    codes, abnormal = CLASSIFIER.classify(lab_name, [None, float('nan')])
+    assert [CLASSIFIER.status_names[code] for code in codes] == ['unknown', 'unknown']
+    assert abnormal.all()
+
+
+def test_overlapping_ranges_use_the_first_match():
+    classifier = CohortLabClassifier({'x': {'ranges': [(0, 10, 'normal'), (5, 20, 'high'), (20, float('inf'), 'critical')]}})
+    codes, abnormal = classifier.classify('x', [-1, 0, 5, 10, 10.5, 20, 1e6])
+    assert [classifier.status_names[code] for code in codes] == \
+        ['unknown', 'normal', 'normal', 'normal', 'high', 'high', 'critical']
+    assert abnormal.tolist() == [True, False, False, False, True, True, True]
+
+
+def test_classify_columns_and_status_counts():
+    classifier = CohortLabClassifier({'x': {'ranges': [(0, 10, 'normal'), (10.01, 50, 'high')]}})
+    (codes, _), = classifier.classify_columns({'x': np.array([1, 2, 30, 100])}).values()
+    assert classifier.status_counts(codes) == {'unknown': 1, 'normal': 2, 'high': 1}
+
+
+def test_unknown_analyte_raises():
+    with pytest.raises(KeyError):
+        CLASSIFIER.classify('not_a_lab', [1.0])
@@ -0,0 +1,94 @@
+import re
+import random
+
+import pytest
+
+from lab_engine import LabExtractionEngine, load_lab_rules, _literal_lead
+
+LAB_RULES = load_lab_rules()
+
+
+def legacy_extract_lab_values(lab_ranges, text):
+    """The per-lab/per-pattern loop LabExtractionEngine replaced."""
+    extracted_values = {}
+    for lab_name, lab_info in lab_ranges.items():
+        for pattern in lab_info['patterns']:
+            for match in re.finditer(pattern, text, re.IGNORECASE):
+                try:
+                    value = float(match.group(1))
+                    if 'unit_conversions' in lab_info:
+                        context = text[max(0, match.start() - 50):match.end() + 50].lower()
+                        for unit, conversion_factor in lab_info['unit_conversions'].items():
+                            if unit in context:
+                                value *= conversion_factor
+                                break
+                    extracted_values[lab_name] = value
+                    break
+                except (ValueError, IndexError):
+                    continue
+            if lab_name in extracted_values:
+                break
+    return extracted_values
+
+
+def instantiate(pattern, rng):
+    """A line of report text matched by one of the rule patterns."""
+    text = pattern
+    text = text.replace(r'(\d+\.?\d*)', f"{rng.uniform(1, 300):.1f}")
+    text = text.replace(r'(\d+)', str(rng.randint(60, 180))).replace(r'\d+', str(rng.randint(40, 110)))
+    text = text.replace(r'[:\s]*', rng.choice([': ', ' ', ':'])).replace(r'[:\s]', rng.choice([':', ' ']))
+    text = text.replace(r'\s+', ' ').replace(r'\/', '/')
+    assert re.search(pattern, text, re.IGNORECASE), (pattern, text)
+    return rng.choice([str.upper, str.title, str.lower])(text)
+
+
+def report_lines(rng):
+    lines = [instantiate(pattern, rng) for lab_info in LAB_RULES.values() for pattern in lab_info['patterns']]
+    lines += ["Patient reports fatigue.", "Units mmol/l unless stated", "Reviewed by lab", "---"]
+    return lines
+
+
+@pytest.mark.parametrize('lab_name,pattern', [
+    (lab_name, pattern) for lab_name, lab_info in LAB_RULES.items() for pattern in lab_info['patterns']
+])
+def test_every_rule_is_found_on_its_own(lab_name, pattern):
+    engine = LabExtractionEngine(LAB_RULES)
+    text = "Result summary\n" + instantiate(pattern, random.Random(pattern)) + "\nEnd of report"
+    assert engine.extract(text) == legacy_extract_lab_values(LAB_RULES, text)
+    assert lab_name in engine.extract(text)
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_engine_matches_legacy_loop_on_mixed_reports(seed):
+    rng = random.Random(seed)
+    lines = report_lines(rng)
+    text = "\n".join(rng.sample(lines, rng.randint(1, len(lines))))
+    assert LabExtractionEngine(LAB_RULES).extract(text) == legacy_extract_lab_values(LAB_RULES, text)
+
+
+def test_leads_stop_at_alternation_groups_and_flags():
+    assert _literal_lead(r'total\s+cholesterol[:\s](\d+)') == 'total'
+    assert _literal_lead(r'hgb[:\s]*(\d+\.?\d*)|hemoglobin[:\s]*(\d+\.?\d*)') == ''
+    assert _literal_lead(r'(?:hb|hgb)[:\s](\d+)') == ''
+    assert _literal_lead(r'(?i)hgb[:\s](\d+)') == ''
+    # Alternation inside a group or a class does not affect the literal start
+    assert _literal_lead(r'hb(?:a|b)[:\s](\d+)') == 'hb'
+    assert _literal_lead(r'hb[|:](\d+)') == 'hb'
+
+
+def test_rule_with_top_level_alternation_is_always_tried():
+    lab_ranges = {
+        'hemoglobin': {
+            'ranges': [(12, 17, 'normal')],
+            'patterns': [r'hgb[:\s]*(\d+\.?\d*)|hemoglobin[:\s]*(\d+\.?\d*)'],
+        }
+    }
+    engine = LabExtractionEngine(lab_ranges)
+    assert engine.extract("Hemoglobin: 13.5 g/dL") == {'hemoglobin': 13.5}
+    assert engine.extract("HGB 14.1") == {'hemoglobin': 14.1}
+
+
+def test_unit_conversion_uses_the_winning_match_context():
+    engine = LabExtractionEngine(LAB_RULES)
+    text = "Glucose:5.5 mmol/l"
+    assert engine.extract(text) == legacy_extract_lab_values(LAB_RULES, text) == {'glucose': 5.5 * 18.0}
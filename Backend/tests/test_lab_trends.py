@@ -0,0 +1,95 @@
+import os
+import random
+
+import pytest
+
+from lab_trends import LabTrendStore, RECORD_DTYPE
+
+DAY = 24 * 3600.0
+
+
+def content_hash(i):
+    return f"{i:016x}" + "0" * 48
+
+
+def make_store(tmp_path, observations, patient_id='p1', lab_name='glucose'):
+    store = LabTrendStore(str(tmp_path / "trends"))
+    for i, (observed_at, value) in enumerate(observations):
+        store.append(patient_id, {lab_name: value}, observed_at, content_hash(i))
+    return store
+
+
+def naive_rolling(values, window):
+    """Rolling mean/min/max with explicit slices, None until the window is full."""
+    stats = {'rolling_mean': [], 'rolling_min': [], 'rolling_max': []}
+    for i in range(len(values)):
+        if i + 1 < window:
+            for column in stats.values():
+                column.append(None)
+            continue
+        chunk = values[i + 1 - window:i + 1]
+        stats['rolling_mean'].append(sum(chunk) / window)
+        stats['rolling_min'].append(min(chunk))
+        stats['rolling_max'].append(max(chunk))
+    return stats
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("window", [1, 3, 7])
+def test_rolling_statistics_match_naive_loop(tmp_path, seed, window):
+    rng = random.Random(seed)
+    observations = [(rng.uniform(0, 1000) * DAY, rng.uniform(70, 200)) for _ in range(25)]
+    trend = make_store(tmp_path, observations).trend('p1', 'glucose', window=window)
+
+    ordered = sorted(observations, key=lambda observation: observation[0])
+    values = [value for _, value in ordered]
+    assert trend['observed_at'] == [observed_at for observed_at, _ in ordered]
+    assert trend['values'] == values
+    for name, expected in naive_rolling(values, window).items():
+        assert trend[name] == pytest.approx(expected)
+    assert trend['latest']['value'] == values[-1]
+    assert trend['latest']['change'] == pytest.approx(values[-1] - values[-2])
+    assert (trend['count'], trend['min'], trend['max']) == (25, min(values), max(values))
+
+
+def test_window_is_capped_by_the_number_of_points(tmp_path):
+    trend = make_store(tmp_path, [(DAY, 1.0), (2 * DAY, 3.0)]).trend('p1', 'glucose', window=10)
+    assert trend['window'] == 2
+    assert trend['rolling_mean'] == [None, 2.0]
+
+
+def test_slope_per_year(tmp_path):
+    year = 365.25 * DAY
+    trend = make_store(tmp_path, [(0.0, 100.0), (year, 110.0), (2 * year, 120.0)]).trend('p1', 'glucose')
+    assert trend['slope_per_year'] == pytest.approx(10.0)
+
+
+def test_since_until_select_half_open_range(tmp_path):
+    store = make_store(tmp_path, [(i * DAY, float(i)) for i in range(10)])
+    times, values = store.series('p1', 'glucose', since=3 * DAY, until=6 * DAY)
+    assert values.tolist() == [3.0, 4.0, 5.0]
+    assert store.trend('p1', 'glucose', since=20 * DAY) is None
+
+
+def test_same_report_is_recorded_once(tmp_path):
+    store = LabTrendStore(str(tmp_path / "trends"))
+    assert store.append('p1', {'glucose': 100.0, 'hba1c': 6.1}, DAY, content_hash(1)) == 2
+    assert store.append('p1', {'glucose': 100.0, 'hba1c': 6.1}, DAY, content_hash(1)) == 0
+    assert store.labs('p1') == ['glucose', 'hba1c']
+    assert store.labs('unknown') == []
+
+
+def test_partial_trailing_record_is_ignored(tmp_path):
+    store = make_store(tmp_path, [(DAY, 1.0), (2 * DAY, 2.0)])
+    with open(os.path.join(store.root, 'p1', 'glucose.bin'), 'ab') as f:
+        f.write(b'\x00' * (RECORD_DTYPE.itemsize // 2))
+    assert store.trend('p1', 'glucose')['values'] == [1.0, 2.0]
+
+
+@pytest.mark.parametrize("name", ['', '..', '../etc', 'a/b', 'x' * 65])
+def test_unsafe_names_are_rejected(tmp_path, name):
+    store = LabTrendStore(str(tmp_path / "trends"))
+    with pytest.raises(ValueError):
+        store.append(name, {'glucose': 1.0}, DAY, content_hash(1))
+    with pytest.raises(ValueError):
+        store.series('p1', name)
@@ -0,0 +1,89 @@
+import json
+import asyncio
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+import llm_client  # noqa: E402
+from llm_client import AsyncLLMClient, LLMError  # noqa: E402
+
+
+def make_client(handler, **kwargs):
+    client = AsyncLLMClient(url="http://llm.test/v1/chat/completions", api_key="k",
+                            backoff_base=0, backoff_max=0, **kwargs)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client._semaphore = asyncio.Semaphore(client.max_in_flight)
+    return client
+
+
+def completion(content):
+    return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+
+def test_retries_transient_statuses():
+    responses = iter([httpx.Response(503), httpx.Response(429), completion("ok")])
+    client = make_client(lambda request: next(responses))
+    assert asyncio.run(client.chat_completion([{"role": "user", "content": "hi"}])) == "ok"
+    assert client.stats['retries'] == 2
+    assert (client.stats['in_flight'], client.stats['waiting']) == (0, 0)
+
+
+def test_client_errors_are_not_retried():
+    client = make_client(lambda request: httpx.Response(400, text="bad request"))
+    with pytest.raises(LLMError) as error:
+        asyncio.run(client.chat_completion([]))
+    assert (error.value.status_code, error.value.attempts) == (400, 1)
+    assert client.stats['failures'] == 1
+
+
+def test_stream_yields_content_deltas():
+    chunks = [{"choices": [{"delta": {"content": piece}}]} for piece in ("Hel", "lo")]
+    body = "".join(f"data: {json.dumps(chunk)}\n\n" for chunk in chunks) + "data: [DONE]\n\n"
+    client = make_client(lambda request: httpx.Response(200, text=body))
+
+    async def collect():
+        return [piece async for piece in client.stream_chat_completion([])]
+
+    assert asyncio.run(collect()) == ["Hel", "lo"]
+    assert client.stats['in_flight'] == 0
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_cancelled_waiters_release_their_counters(streaming):
+    release = None
+
+    async def handler(request):
+        await release.wait()
+        return completion("ok") if not streaming else httpx.Response(200, text="data: [DONE]\n\n")
+
+    async def call(client):
+        if streaming:
+            return [piece async for piece in client.stream_chat_completion([])]
+        return await client.chat_completion([])
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        client = make_client(handler, max_in_flight=1)
+        holder = asyncio.create_task(call(client))
+        waiters = [asyncio.create_task(call(client)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        assert (client.stats['in_flight'], client.stats['waiting']) == (1, 3)
+
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        assert client.stats['waiting'] == 0
+
+        release.set()
+        await holder
+        assert (client.stats['in_flight'], client.stats['waiting']) == (0, 0)
+        # The slot is free again
+        await asyncio.wait_for(call(client), 1)
+
+    asyncio.run(run())
+
+
+def test_api_key_falls_back_to_groq_key():
+    assert llm_client.LLM_API_KEY == (llm_client.os.getenv("LLM_API_KEY") or llm_client.os.getenv("GROQ_API_KEY"))
@@ -0,0 +1,106 @@
+import re
+import asyncio
+
+import pytest
+
+import ner_batcher
+
+# The substitutions MedicalReportAnalyzer.preprocess_text_with_offsets chains
+PREPROCESS_STEPS = [
+    (r'\b(?:patient|name|date|id|contact|address|phone|ssn)\b[:\s][^\n]*', '', re.IGNORECASE),
+    (r'\b(?:mg/dl|mg%)\b', 'mg/dL', re.IGNORECASE),
+    (r'\s+', ' ', 0),
+]
+
+REPORTS = [
+    "Patient: John Doe\nGlucose  110 mg/dl\n\nHbA1c: 6.8 %\tDiagnosis: Type 2 diabetes mellitus",
+    "  Cholesterol 240 MG%   LDL 160 mg/dl\nPhone: 555-0100\nHypertension noted. ",
+    "no substitutions here",
+    "",
+]
+
+
+def preprocess(text):
+    offsets = list(range(len(text)))
+    for pattern, repl, flags in PREPROCESS_STEPS:
+        text, offsets = ner_batcher.sub_with_offsets(pattern, repl, text, offsets, flags)
+    return text, offsets
+
+
+@pytest.mark.parametrize("report", REPORTS)
+def test_sub_with_offsets_matches_re_sub(report):
+    expected = report
+    for pattern, repl, flags in PREPROCESS_STEPS:
+        expected = re.sub(pattern, repl, expected, flags=flags)
+    cleaned, offsets = preprocess(report)
+
+    assert cleaned == expected
+    assert len(offsets) == len(cleaned)
+    assert offsets == sorted(offsets)
+
+
+@pytest.mark.parametrize("report", REPORTS)
+def test_unchanged_characters_point_at_themselves(report):
+    cleaned, offsets = preprocess(report)
+    for char, offset in zip(cleaned, offsets):
+        if not char.isspace() and char not in 'mgdL/%':
+            assert report[offset] == char
+
+
+def test_replacement_points_into_replaced_span():
+    report = "LDL 160 MG/DL high"
+    cleaned, offsets = preprocess(report)
+    start = cleaned.index('mg/dL')
+    assert [report[offset] for offset in offsets[start:start + 5]] == list("MG/DL")
+
+
+def test_entities_map_back_to_original_text():
+    report = "Patient: Jane Roe\nGlucose   high,\n\n  Type 2   diabetes mellitus confirmed"
+    cleaned, offsets = preprocess(report)
+    start = cleaned.index('diabetes mellitus')
+    entity = {'text': 'diabetes mellitus', 'label': 'Disease', 'score': 0.99,
+              'start': start, 'end': start + len('diabetes mellitus')}
+
+    mapped, = ner_batcher.map_entity_offsets([entity], offsets)
+    assert report[mapped['start']:mapped['end']] == 'diabetes mellitus'
+    assert mapped['label'] == 'Disease'
+    # The input entity is left as it was
+    assert entity['start'] == start
+
+
+def test_chunks_cover_text_with_offsets():
+    text = "Line one of the report.\n" * 200
+    chunks = ner_batcher.chunk_text(text, 100)
+    assert all(len(chunk) <= 100 for _, chunk in chunks)
+    assert ''.join(chunk for _, chunk in chunks) == text
+    assert all(text[offset:offset + len(chunk)] == chunk for offset, chunk in chunks)
+
+
+class FakePipeline:
+    """Tags every occurrence of 'diabetes', recording the batches it sees."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts, batch_size):
+        self.batches.append(len(texts))
+        return [[{'entity_group': 'Disease', 'score': 0.9, 'start': m.start(), 'end': m.end()}
+                 for m in re.finditer('diabetes', text)] for text in texts]
+
+
+def test_concurrent_requests_share_batches_and_keep_document_offsets():
+    pipeline = FakePipeline()
+    batcher = ner_batcher.NERMicroBatcher(lambda: pipeline, max_batch=8, max_wait_ms=20, chunk_chars=50)
+    texts = [f"Report {i}: history of diabetes. " * 5 for i in range(4)]
+
+    async def run():
+        try:
+            return await asyncio.gather(*(batcher.extract(text) for text in texts))
+        finally:
+            batcher.shutdown()
+
+    results = asyncio.run(run())
+    for text, entities in zip(texts, results):
+        assert len(entities) == 5
+        assert all(text[e['start']:e['end']] == e['text'] == 'diabetes' for e in entities)
+    assert max(pipeline.batches) > 1
@@ -0,0 +1,100 @@
+import pytest
+
+pytest.importorskip("pytesseract")
+
+import ocr_languages  # noqa: E402
+from ocr_languages import languages_for_script  # noqa: E402
+
+CANDIDATES = ['eng', 'hin', 'tam', 'ara']
+
+
+@pytest.mark.parametrize("script, expected", [
+    ('Devanagari', ['hin', 'eng']),
+    ('Tamil', ['tam', 'eng']),
+    ('Arabic', ['ara', 'eng']),
+    ('Latin', ['eng']),
+    # Scripts no configured language reads leave the page unrouted
+    ('Cyrillic', []),
+    ('Klingon', []),
+])
+def test_languages_for_script(script, expected):
+    assert languages_for_script(script, CANDIDATES) == expected
+
+
+def test_english_is_only_added_when_configured():
+    assert languages_for_script('Devanagari', ['hin', 'mar']) == ['hin', 'mar']
+
+
+def test_script_traineddata_is_accepted():
+    assert languages_for_script('Devanagari', ['script/Devanagari', 'eng']) == ['script/Devanagari', 'eng']
+
+
+class FakeImage:
+    mode = 'L'
+
+    def copy(self):
+        return self
+
+    def thumbnail(self, size):
+        pass
+
+
+class FakeEngine:
+    def __init__(self, osd):
+        self.osd = osd
+
+    def detect_orientation_script(self, image):
+        if isinstance(self.osd, Exception):
+            raise self.osd
+        return self.osd
+
+
+@pytest.fixture
+def configured(monkeypatch):
+    monkeypatch.setattr(ocr_languages, 'OCR_LANGUAGES', '+'.join(CANDIDATES))
+
+    def use(osd):
+        monkeypatch.setattr(ocr_languages.ocr_engine, 'get_engine', lambda: FakeEngine(osd))
+    return use
+
+
+def test_confident_detection_routes_and_rotates(configured):
+    configured({'script': 'Tamil', 'script_confidence': 5.0, 'rotate': 90, 'orientation_confidence': 9.0})
+    language = ocr_languages.route_page(FakeImage())
+    assert (language['lang'], language['routed'], language['rotate']) == ('tam+eng', True, 90)
+
+
+def test_unconfident_detection_uses_every_language(configured):
+    configured({'script': 'Tamil', 'script_confidence': 0.1, 'rotate': 180, 'orientation_confidence': 0.5})
+    language = ocr_languages.route_page(FakeImage())
+    assert (language['lang'], language['routed'], language['rotate']) == ('eng+hin+tam+ara', False, 0)
+
+
+def test_failed_detection_uses_every_language(configured):
+    configured(RuntimeError("Too few characters"))
+    language = ocr_languages.route_page(FakeImage())
+    assert language['routed'] is False
+    assert language['lang'] == 'eng+hin+tam+ara'
+    assert 'Too few characters' in language['error']
+
+
+def test_every_nth_dispatched_page_is_sampled(monkeypatch):
+    monkeypatch.setattr(ocr_languages, 'OCR_LANG_BASELINE_EVERY', 3)
+    monkeypatch.setattr(ocr_languages, '_dispatched_pages', 0)
+    assert [ocr_languages.take_baseline_sample() for _ in range(7)] == [False, False, True] * 2 + [False]
+
+
+def test_measured_pages_drive_the_estimate(monkeypatch):
+    monkeypatch.setattr(ocr_languages, 'baseline_stats', {'pages': 0, 'routed_ms': 0.0, 'all_languages_ms': 0.0})
+    unmeasured = {'routed': True, 'osd_ms': 5.0}
+    ocr_languages.record_savings(unmeasured, 100.0)
+    assert unmeasured['estimated_saved_ms'] is None
+
+    measured = {'routed': True, 'osd_ms': 5.0}
+    ocr_languages.record_savings(measured, 100.0, 300.0)
+    assert measured['saved_ms'] == 195.0
+    assert ocr_languages.baseline_stats == {'pages': 1, 'routed_ms': 100.0, 'all_languages_ms': 300.0}
+
+    estimated = {'routed': True, 'osd_ms': 5.0}
+    ocr_languages.record_savings(estimated, 50.0)
+    assert estimated['estimated_saved_ms'] == 95.0
@@ -0,0 +1,52 @@
+import time
+
+from report_cache import ReportCache
+
+
+def make_cache(tmp_path, **kwargs):
+    return ReportCache(db_path=str(tmp_path / "cache.sqlite3"), **kwargs)
+
+
+def test_memory_and_disk_hits_return_the_same_value(tmp_path):
+    cache = make_cache(tmp_path)
+    value = {'success': True, 'lab_values': {'glucose': 95.0}}
+    cache.set('analysis', 'k', value)
+
+    from_memory = cache.get('analysis', 'k')
+    # A fresh instance only has the disk tier
+    from_disk = make_cache(tmp_path).get('analysis', 'k')
+    assert from_memory == from_disk == value
+
+
+def test_namespaces_are_separate(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set('text', 'k', {'text': 'report'})
+    assert cache.get('analysis', 'k') is None
+    assert cache.get('text', 'k') == {'text': 'report'}
+
+
+def test_memory_tier_is_lru_bounded_and_falls_back_to_disk(tmp_path):
+    cache = make_cache(tmp_path, memory_entries=2)
+    for key in ('a', 'b', 'c'):
+        cache.set('text', key, {'key': key})
+    assert cache.stats()['memory_entries'] == 2
+    assert cache.get('text', 'a') == {'key': 'a'}
+    assert cache.stats()['namespaces']['text']['disk_hits'] == 1
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = make_cache(tmp_path, memory_entries=1, disk_entries=2)
+    cache.set('text', 'a', {})
+    time.sleep(0.01)
+    cache.set('text', 'b', {})
+    time.sleep(0.01)
+    cache.set('text', 'c', {})
+    assert cache.stats()['disk_entries'] == 2
+    assert make_cache(tmp_path).get('text', 'a') is None
+
+
+def test_expired_entries_miss(tmp_path):
+    cache = make_cache(tmp_path, ttl_seconds=0)
+    cache.set('text', 'k', {'text': 'old'})
+    assert cache.get('text', 'k') is None
+    assert cache.stats()['namespaces']['text']['misses'] == 1
@@ -0,0 +1,114 @@
+import pytest
+
+from report_store import ReportStore
+
+
+def make_store(tmp_path):
+    return ReportStore(str(tmp_path / "reports.sqlite3"))
+
+
+def analysis(conditions=(), lab_values=None, lab_details=None):
+    return {'conditions': list(conditions), 'lab_values': lab_values or {}, 'lab_details': lab_details or {},
+            'summary': 'summary'}
+
+
+def test_first_extraction_of_a_report_is_kept(tmp_path):
+    store = make_store(tmp_path)
+    store.save_text('h1', 'a.pdf', 'first text', {'pages': 1})
+    store.save_text('h1', 'b.pdf', 'second text', None)
+    assert store.get_text('h1') == {'filename': 'a.pdf', 'text': 'first text', 'ocr_metadata': {'pages': 1}}
+    assert store.get_text('missing') is None
+
+
+def test_stale_reports_are_missing_or_from_other_rules(tmp_path):
+    store = make_store(tmp_path)
+    for i in range(5):
+        store.save_text(f'h{i}', f'{i}.pdf', f'text {i}', None)
+    store.save_analyses([('h0', 'v2', analysis()), ('h1', 'v1', analysis(['anemia'])), ('h2', 'v2', analysis())])
+
+    assert store.count_stale('v2') == 3
+    stale = [item for batch in store.iter_stale('v2', batch_size=2) for item in batch]
+    assert [item['content_sha256'] for item in stale] == ['h1', 'h3', 'h4']
+    assert stale[0]['previous_result']['conditions'] == ['anemia']
+    assert stale[1]['previous_result'] is None
+
+    everything = [item for batch in store.iter_stale('v2', batch_size=2, include_current=True) for item in batch]
+    assert len(everything) == 5
+
+
+def test_reanalyzed_reports_stop_being_stale(tmp_path):
+    store = make_store(tmp_path)
+    store.save_text('h1', 'a.pdf', 'text', None)
+    assert store.count_stale('v1') == 1
+    store.save_analysis('h1', 'v1', analysis())
+    assert store.count_stale('v1') == 0
+    assert store.get_analysis('h1')['rules_version'] == 'v1'
+
+
+def test_stats_count_reports_and_analyses(tmp_path):
+    store = make_store(tmp_path)
+    store.save_reports([{'content_sha256': 'h1', 'filename': 'a.pdf', 'text': 'text', 'ocr_metadata': None,
+                         'rules_version': 'v1', 'result': analysis()}])
+    store.save_text('h2', 'b.pdf', 'text', None)
+    stats = store.stats()
+    assert (stats['reports'], stats['analyses']) == (2, 1)
+    assert 'stale' not in stats
+
+
+def store_with_reports(tmp_path):
+    store = make_store(tmp_path)
+    reports = [
+        ('h1', 'Fasting glucose 180 mg/dL, diabetes suspected', analysis(
+            ['diabetes'], {'glucose': 180.0}, {'glucose': {'status': 'high', 'normal': False}})),
+        ('h2', 'Glucose 90 mg/dL within range', analysis(
+            [], {'glucose': 90.0}, {'glucose': {'status': 'normal', 'normal': True}})),
+        ('h3', 'Hemoglobin 9 g/dL, anemia', analysis(
+            ['Anemia'], {'hemoglobin': 9.0}, {'hemoglobin': {'status': 'low', 'normal': False}})),
+    ]
+    for created_at, (content_hash, text, result) in enumerate(reports):
+        store.save_reports([{'content_sha256': content_hash, 'filename': f'{content_hash}.pdf', 'text': text,
+                             'ocr_metadata': None, 'rules_version': 'v1', 'result': result}])
+        store._db.execute("UPDATE report_texts SET created_at = ? WHERE content_sha256 = ?",
+                          (1000.0 + created_at, content_hash))
+    store._db.commit()
+    return store
+
+
+def hashes(page):
+    return [item['content_sha256'] for item in page['items']]
+
+
+def test_query_filters(tmp_path):
+    store = store_with_reports(tmp_path)
+    assert hashes(store.query()) == ['h3', 'h2', 'h1']
+    assert hashes(store.query(text='glucose')) == ['h2', 'h1']
+    assert hashes(store.query(condition='anemia')) == ['h3']
+    assert hashes(store.query(lab_name='glucose', min_value=100)) == ['h1']
+    assert hashes(store.query(lab_name='glucose', abnormal=False)) == ['h2']
+    assert hashes(store.query(since=1001.0, until=1002.0)) == ['h2']
+
+
+def test_query_text_is_not_fts_syntax(tmp_path):
+    store = store_with_reports(tmp_path)
+    assert hashes(store.query(text='glucose OR NOT "anemia')) == []
+    if store.full_text:
+        assert '[' in store.query(text='anemia')['items'][0]['snippet']
+
+
+def test_query_pages_with_cursor(tmp_path):
+    store = store_with_reports(tmp_path)
+    seen, cursor = [], None
+    while True:
+        page = store.query(limit=2, cursor=cursor)
+        seen.extend(hashes(page))
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert seen == ['h3', 'h2', 'h1']
+
+
+@pytest.mark.parametrize("kwargs", [{'min_value': 1.0}, {'cursor': 'not-a-cursor'}])
+def test_query_rejects_lab_filters_without_lab_and_bad_cursors(tmp_path, kwargs):
+    store = store_with_reports(tmp_path)
+    with pytest.raises(ValueError):
+        store.query(**kwargs)
@@ -0,0 +1,133 @@
+import time
+
+import numpy as np
+import pytest
+
+from response_cache import SemanticResponseCache
+
+DIMENSIONS = 16
+
+
+def unit(rng):
+    vector = rng.normal(size=DIMENSIONS)
+    return vector / np.linalg.norm(vector)
+
+
+def near(rng, vector, noise=0.05):
+    out = vector + rng.normal(scale=noise / np.sqrt(DIMENSIONS), size=DIMENSIONS)
+    return out / np.linalg.norm(out)
+
+
+def answer(text):
+    return {'text_response': text}
+
+
+def test_paraphrase_hits_and_unrelated_question_misses():
+    rng = np.random.default_rng(0)
+    cache = SemanticResponseCache(threshold=0.9, max_entries=10)
+    question = unit(rng)
+    cache.lookup(question, 'en', 'v1')
+    cache.put(question, 'en', 'v1', answer('a'))
+
+    value, similarity = cache.lookup(near(rng, question), 'en', 'v1')
+    assert value == answer('a') and similarity >= 0.9
+    assert cache.lookup(unit(rng), 'en', 'v1') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (1, 2)
+
+
+def test_lookup_matches_brute_force_best_entry():
+    rng = np.random.default_rng(1)
+    cache = SemanticResponseCache(threshold=0.0, max_entries=50)
+    vectors = [unit(rng) for _ in range(50)]
+    cache.lookup(vectors[0], 'en', 'v1')
+    for i, vector in enumerate(vectors):
+        cache.put(vector, 'en', 'v1', answer(str(i)))
+
+    for _ in range(20):
+        query = unit(rng)
+        best = max(range(50), key=lambda i: float(vectors[i] @ query))
+        value, similarity = cache.lookup(query, 'en', 'v1')
+        assert value == answer(str(best))
+        assert similarity == pytest.approx(float(vectors[best] @ query), abs=1e-5)
+
+
+def test_languages_are_kept_apart():
+    rng = np.random.default_rng(2)
+    cache = SemanticResponseCache(threshold=0.9, max_entries=10)
+    question = unit(rng)
+    cache.lookup(question, 'en', 'v1')
+    cache.put(question, 'en', 'v1', answer('english'))
+    cache.put(question, 'hi', 'v1', answer('hindi'))
+    assert cache.lookup(question, 'hi', 'v1')[0] == answer('hindi')
+    assert cache.lookup(question, 'ta', 'v1') is None
+
+
+def test_knowledge_base_change_invalidates_and_rejects_stale_answers():
+    rng = np.random.default_rng(3)
+    cache = SemanticResponseCache(threshold=0.9, max_entries=10)
+    question = unit(rng)
+    cache.lookup(question, 'en', 'v1')
+    cache.put(question, 'en', 'v1', answer('old'))
+
+    assert cache.lookup(question, 'en', 'v2') is None
+    # Generated against v1 while v2 became current
+    cache.put(question, 'en', 'v1', answer('stale'))
+    stats = cache.stats()
+    assert (stats['entries'], stats['invalidated'], stats['stale_inserts']) == (0, 1, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    rng = np.random.default_rng(4)
+    cache = SemanticResponseCache(threshold=0.99, max_entries=2)
+    first, second, third = unit(rng), unit(rng), unit(rng)
+    cache.lookup(first, 'en', 'v1')
+    cache.put(first, 'en', 'v1', answer('first'))
+    cache.put(second, 'en', 'v1', answer('second'))
+    cache.lookup(first, 'en', 'v1')
+    cache.put(third, 'en', 'v1', answer('third'))
+
+    assert cache.lookup(second, 'en', 'v1') is None
+    assert cache.lookup(first, 'en', 'v1')[0] == answer('first')
+    assert cache.lookup(third, 'en', 'v1')[0] == answer('third')
+    assert cache.stats()['lru_evictions'] == 1
+
+
+def test_memory_bound_evicts_and_oversized_answers_are_skipped():
+    rng = np.random.default_rng(5)
+    vector_bytes = DIMENSIONS * 4
+    entry_bytes = len('{"text_response": "' + 'x' * 100 + '"}') + vector_bytes
+    cache = SemanticResponseCache(threshold=0.99, max_entries=10, max_bytes=2 * entry_bytes)
+    cache.lookup(unit(rng), 'en', 'v1')
+    for _ in range(3):
+        cache.put(unit(rng), 'en', 'v1', answer('x' * 100))
+    cache.put(unit(rng), 'en', 'v1', answer('x' * 10000))
+
+    stats = cache.stats()
+    assert stats['entries'] == 2
+    assert stats['bytes'] <= stats['max_bytes']
+    assert stats['size_evictions'] == 1
+
+
+def test_expired_entries_miss(monkeypatch):
+    rng = np.random.default_rng(6)
+    cache = SemanticResponseCache(threshold=0.9, max_entries=10, ttl_seconds=60)
+    question = unit(rng)
+    cache.lookup(question, 'en', 'v1')
+    cache.put(question, 'en', 'v1', answer('a'))
+
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 61)
+    assert cache.lookup(question, 'en', 'v1') is None
+    assert cache.stats()['expired'] == 1
+
+
+def test_zero_and_wrong_sized_embeddings_are_ignored():
+    rng = np.random.default_rng(7)
+    cache = SemanticResponseCache(threshold=0.9, max_entries=10)
+    cache.lookup(unit(rng), 'en', 'v1')
+    cache.put(np.zeros(DIMENSIONS), 'en', 'v1', answer('zero'))
+    cache.put(unit(rng), 'en', 'v1', answer('a'))
+    cache.put(np.ones(DIMENSIONS + 1), 'en', 'v1', answer('wrong size'))
+    assert cache.stats()['entries'] == 1
+    assert cache.lookup(np.ones(DIMENSIONS + 1), 'en', 'v1') is None